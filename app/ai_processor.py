@@ -2,20 +2,48 @@
 """
 Handles content rewriting using a Generative AI model with API key failover.
 """
-import json
-import google.generativeai as genai
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 import re
+import threading
 import time
 from pathlib import Path 
-from typing import Any, Dict, List, Optional, Tuple
-
-from .config import AI_CONFIG, SCHEDULE_CONFIG
-from .exceptions import AIProcessorError, AllKeysFailedError
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .config import AI_CONFIG, AI_GENERATION_CONFIG, AI_MODELS, AI_REWRITE_CONFIG, AI_ROUTING_CONFIG
+from .context_cache import ContextCache
+from .exceptions import AIProcessorError
+from .gemini_client import GeminiClient, GeminiError, GeminiResponse
+from .http_client import HttpClient
+from .json_repair import repair_json
+from .json_stream import JsonFieldStream, JsonStreamError
+from .keys import KeyManager
+from .model_router import ModelRouter
+from .response_cache import ResponseCache, response_key
+from .prompt_compaction import (
+    compact_article_html,
+    restore_alt_text_keys,
+    restore_image_ids,
+    section_headings,
+    split_sections,
+)
+from .token_estimator import TokenEstimator
 
 logger = logging.getLogger(__name__)
 
+# Enforce JSON output from the model for reliable parsing; the rest comes from AI_GENERATION_CONFIG
+GENERATION_CONFIG = {
+    'responseMimeType': 'application/json',
+    'temperature': AI_GENERATION_CONFIG['temperature'],
+    'topP': AI_GENERATION_CONFIG['top_p'],
+    'maxOutputTokens': AI_GENERATION_CONFIG['max_output_tokens'],
+}
+
+# "Please retry in 17.5s" / "retry_delay { seconds: 17 }" nas mensagens de 429
+_RETRY_DELAY_RX = re.compile(r"retry[ _](?:in|delay)\D{0,20}?(\d+(?:\.\d+)?)", re.IGNORECASE)
+
 AI_SYSTEM_RULES = """
 [REGRAS OBRIGATÓRIAS — CUMPRIR 100%]
 
@@ -28,14 +56,83 @@ Somente produzir o conteúdo jornalístico reescrito do artigo principal.
 Se algum desses itens aparecer no texto de origem, exclua-os do resultado.
 """
 
-# Log the number of keys found for diagnostics at startup.
-for category, keys in AI_CONFIG.items():
-    # Filter out empty/None keys before counting
-    valid_keys_count = len([k for k in keys if k])
-    if valid_keys_count > 0:
-        logger.info(f"Found {valid_keys_count} API keys for category '{category}'.")
-    else:
-        logger.warning(f"No API keys found for category '{category}'.")
+# Acrescentado ao prompt quando o conteúdo foi compactado (app/prompt_compaction.py)
+IMAGE_IDS_NOTE = """
+
+Observação: no conteúdo original as imagens usam ids curtos no src (ex.: <img src="IMG_1">).
+Ao incluir uma imagem no conteudo_final, mantenha o src exatamente com o id correspondente.
+"""
+
+# Abre a parte variável de um pedido com vários artigos (rewrite_batch)
+BATCH_NOTE = """
+
+Este pedido contém {n} artigos, cada um na sua seção "### ARTIGO id=...".
+Reescreva cada artigo de forma independente e retorne um ARRAY JSON com {n} objetos,
+um por artigo, cada um na estrutura descrita acima e com o campo extra "id" igual ao id do artigo.
+Os ids de imagem (IMG_n) valem apenas dentro do próprio artigo.
+"""
+
+# Reescrita em partes de artigos longos (_rewrite_chunked): uma nota por parte e uma para título/meta
+CHUNK_NOTE = """
+
+ATENÇÃO — REESCRITA EM PARTES: o artigo original é longo e foi dividido em {n} partes nas seções <h2>.
+O "Conteúdo Original" acima é somente a parte {i} de {n}. Seções do artigo completo, para contexto: {sections}.
+Reescreva apenas esta parte, seguindo todas as regras do conteudo_final e mantendo os subtítulos <h2> dela.
+Retorne SOMENTE o objeto JSON {"conteudo_final": "..."}; os demais campos são gerados em outro pedido.
+"""
+CHUNK_POSITION_NOTES = {
+    "first": "Esta é a abertura do artigo: comece pelo parágrafo de introdução e não escreva conclusão.\n",
+    "middle": ("Esta parte fica no meio do artigo: não escreva introdução nem conclusão e mantenha "
+               "todas as imagens (a regra da primeira imagem vale só para a parte 1).\n"),
+    "last": ("Esta é a parte final: não escreva introdução, termine com o fechamento do artigo e mantenha "
+             "todas as imagens (a regra da primeira imagem vale só para a parte 1).\n"),
+}
+META_NOTE = """
+
+ATENÇÃO — o conteudo_final deste artigo está sendo reescrito à parte, em {n} partes.
+NÃO reescreva o conteúdo: retorne o objeto JSON com todos os demais campos (titulo_final,
+meta_description, focus_keyword, tags, yoast_meta etc.) baseados no artigo completo e com "conteudo_final": "".
+"""
+# Saída esperada do pedido de título/meta (só os campos curtos)
+META_OUTPUT_TOKENS = 1024
+
+# Campos sem os quais a resposta não serve (o resto é opcional)
+REQUIRED_FIELDS = ("titulo_final", "conteudo_final", "meta_description", "focus_keyword", "tags")
+
+# Início da seção de dados do artigo no universal_prompt.txt; o que vem antes é fixo
+PROMPT_DATA_MARKER = "DADOS PARA PROCESSAMENTO"
+
+# Campos que mudam a cada artigo (não podem ir no prefixo em cache). "tag" fica de fora: os exemplos de
+# link interno ({domain}/tag/{tag}) estão nas regras, e o prefixo já é por categoria
+ARTICLE_FIELDS = {
+    "titulo_original", "url_original", "content", "fonte_nome", "categoria",
+    "tags", "videos_list", "imagens_list",
+}
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _fill_placeholders(template: str, fields: Dict[str, Any]) -> str:
+    """
+    Manually replace placeholders. This is safer than format_map because it won't
+    try to interpret literal braces {} within the prompt's JSON structure example,
+    which was causing the unexpected AttributeError.
+    """
+    for key, value in fields.items():
+        template = template.replace(f'{{{key}}}', str(value))
+    return template
+
+
+def log_key_counts() -> None:
+    """Logs the number of API keys found per category (diagnostics at startup)."""
+    for category, keys in AI_CONFIG.items():
+        # Filter out empty/None keys before counting
+        valid_keys_count = len([k for k in keys if k])
+        if valid_keys_count > 0:
+            logger.info(f"Found {valid_keys_count} API keys for category '{category}'.")
+        else:
+            logger.warning(f"No API keys found for category '{category}'.")
 
 
 class AIProcessor:
@@ -43,13 +140,32 @@ class AIProcessor:
     Handles content rewriting using a Generative AI model with API key failover.
     """
     _prompt_template: Optional[str] = None
-
-    def __init__(self, category: str):
+    # Compartilhado entre categorias: a calibração vale para o mesmo prompt/modelo
+    _token_estimator = TokenEstimator(max_output_tokens=AI_GENERATION_CONFIG['max_output_tokens'])
+    _context_cache = ContextCache(ttl_seconds=AI_REWRITE_CONFIG['context_cache_ttl_seconds'])
+    # Latência e erros por modelo valem para todas as categorias
+    _router = ModelRouter(
+        AI_MODELS['chain'] or [AI_MODELS['primary'], AI_MODELS['fallback']],
+        light_model=AI_MODELS['light'],
+        category_models=AI_MODELS['by_category'],
+        **AI_ROUTING_CONFIG,
+    )
+    # Tokens de saída esperados por artigo num pedido em lote (média móvel das respostas)
+    _batch_output_per_article = 1500.0
+    _batch_lock = threading.Lock()
+    # Quantas respostas precisaram de reparo no JSON, por tipo (app/json_repair.py)
+    _parse_stats: Dict[str, int] = {}
+    _parse_lock = threading.Lock()
+
+    def __init__(self, category: str, http_client: Optional[HttpClient] = None,
+                 response_cache: Optional[ResponseCache] = None):
         """
         Initializes the AI processor for a specific content category.
 
         Args:
             category: The content category (e.g., 'movies', 'series').
+            http_client: Client for the Gemini calls (default: the shared one).
+            response_cache: Persistent cache consulted before any request (optional).
 
         Raises:
             AIProcessorError: If the category is invalid or has no API keys.
@@ -62,36 +178,74 @@ class AIProcessor:
         if not self.api_keys:
             raise AIProcessorError(f"No valid API keys found for category '{category}'.")
 
-        self.current_key_index = 0
-        self.model = None
-        self._configure_model()
-
-    def _configure_model(self):
-        """Configures the generative AI model with the current API key."""
-        if self.current_key_index >= len(self.api_keys):
-            raise AllKeysFailedError(f"All {len(self.api_keys)} API keys for category '{self.category}' have failed.")
-
-        api_key = self.api_keys[self.current_key_index]
-        try:
-            genai.configure(api_key=api_key)
-            # Enforce JSON output from the model for reliable parsing
-            generation_config = genai.types.GenerationConfig(
-                response_mime_type="application/json"
-            )
-            self.model = genai.GenerativeModel(
-                'gemini-1.5-flash-latest',
-                generation_config=generation_config
-            )
-            logger.info(f"Using API key index {self.current_key_index} for category '{self.category}'.")
-        except Exception as e:
-            logger.error(f"Failed to configure Gemini with API key index {self.current_key_index}: {e}")
-            self._failover_to_next_key()
-            self._configure_model()  # Retry configuration with the new key
+        # Saúde e cota das chaves ficam em api_key_status, compartilhadas entre processos
+        self.keys = KeyManager(category, self.api_keys)
+        self.http_client = http_client
+        self.response_cache = response_cache
+        self._clients: Dict[Tuple[str, str], GeminiClient] = {}
+        self._clients_lock = threading.Lock()
+
+    def _client_for(self, api_key: str, model: str) -> GeminiClient:
+        """One Gemini client per key and model, so requests on different keys can run in parallel."""
+        with self._clients_lock:
+            client = self._clients.get((api_key, model))
+            if client is None:
+                client = GeminiClient(
+                    api_key,
+                    model,
+                    generation_config=GENERATION_CONFIG,
+                    http_client=self.http_client,
+                )
+                self._clients[(api_key, model)] = client
+            return client
+
+    def _acquire_key(self, tokens: int = 0) -> Optional[str]:
+        """
+        Next key with room (RPM and TPM) for a request of `tokens`. When all
+        are busy, waits for the first one to free up, up to
+        AI_REWRITE_CONFIG['max_key_wait_seconds'].
+        """
+        deadline = time.monotonic() + AI_REWRITE_CONFIG['max_key_wait_seconds']
+        while True:
+            api_key = self.keys.acquire(tokens)
+            if api_key is not None:
+                return api_key
+            wait = self.keys.next_available_in(tokens)
+            remaining = deadline - time.monotonic()
+            if wait is None or wait > remaining:
+                return None
+            time.sleep(min(max(wait, 0.2), remaining))
+
+    def _report_key_error(self, api_key: str, error: Exception):
+        """Classifies a failed call and records it on the key's persistent state."""
+        message = str(error)
+        lowered = message.lower()
+        code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+        if 'api key not valid' in lowered or 'api_key_invalid' in lowered or code in (401, 403):
+            self.keys.report_invalid(api_key, message)
+        elif code == 429 or 'resource_exhausted' in lowered or 'quota' in lowered:
+            if 'per day' in lowered or 'perday' in lowered or 'daily' in lowered:
+                self.keys.report_quota_exhausted(api_key, message)
+            else:
+                retry_after = getattr(error, 'retry_after', None)
+                if retry_after is None and (match := _RETRY_DELAY_RX.search(message)):
+                    retry_after = float(match.group(1))
+                self.keys.report_failure(api_key, message, retry_after)
+        elif code is not None and code < 500:
+            # Pedido recusado ou resposta vazia: o problema é o conteúdo, não a chave
+            self.keys.report_success(api_key)
+        else:
+            self.keys.report_failure(api_key, message)
 
-    def _failover_to_next_key(self):
-        """Switches to the next available API key."""
-        self.current_key_index += 1
-        logger.warning(f"Failing over to next API key for category '{self.category}'.")
+    @staticmethod
+    def _model_unavailable(error: GeminiError) -> bool:
+        """Timeouts, overload and 5xx (or an unknown model): worth trying the next model of the chain."""
+        lowered = str(error).lower()
+        if error.code in (500, 502, 503, 504) or 'overloaded' in lowered:
+            return True
+        if error.code == 404 and 'model' in lowered:
+            return True
+        return error.code is None and ('timed out' in lowered or 'timeout' in lowered)
 
     @classmethod
     def _load_prompt_template(cls) -> str:
@@ -112,7 +266,173 @@ class AIProcessor:
                 raise AIProcessorError("Prompt template file not found.")
         return cls._prompt_template
 
-    def rewrite_content(
+    @staticmethod
+    def _restore_images(data: Dict[str, Any], image_ids: Dict[str, str]) -> Dict[str, Any]:
+        """Puts the real image URLs back into a response built from compacted content."""
+        if not image_ids:
+            return data
+        data = dict(data)
+        data["conteudo_final"] = restore_image_ids(data["conteudo_final"], image_ids)
+        if isinstance(data.get("image_alt_texts"), dict):
+            data["image_alt_texts"] = restore_alt_text_keys(data["image_alt_texts"], image_ids)
+        return data
+
+    @classmethod
+    def _prompt_version(cls) -> str:
+        """Hash of everything fixed in the prompt; part of the response cache key."""
+        template = cls._load_prompt_template() + IMAGE_IDS_NOTE
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+    def _compact_content(self, content_html: str, title: Optional[str]) -> Tuple[str, Dict[str, str]]:
+        """
+        Compacts the article HTML for the prompt (AI_REWRITE_CONFIG['compact_input'])
+        and logs the estimated tokens before and after.
+
+        Returns:
+            The content to send and the {image id: URL} map ({} when not compacted).
+        """
+        if not AI_REWRITE_CONFIG['compact_input'] or not content_html:
+            return content_html, {}
+        compact, image_ids = compact_article_html(content_html)
+        before = self._token_estimator.estimate(content_html)[0]
+        after = self._token_estimator.estimate(compact)[0]
+        saved = 100 * (before - after) / before if before else 0
+        logger.info(f"Prompt content for '{title}': ~{before} -> ~{after} tokens ({saved:.0f}% less).")
+        return compact, image_ids
+
+    @classmethod
+    def _prompt_parts(cls, fields: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """
+        Splits the filled prompt into a prefix that is the same for every
+        article (rules and instructions; per-article placeholders become
+        '<campo>') and the variable suffix with the article data. None if
+        the template has no data section marker.
+        """
+        template = cls._load_prompt_template()
+        marker = template.find(PROMPT_DATA_MARKER)
+        if marker == -1:
+            return None
+        # corta no início da linha "// ----" que abre a seção de dados
+        cut = template.rfind("\n", 0, template.rfind("\n", 0, marker)) + 1
+        static_fields = {k: (f"<{k}>" if k in ARTICLE_FIELDS else v) for k, v in fields.items()}
+        return _fill_placeholders(template[:cut], static_fields), _fill_placeholders(template[cut:], fields)
+
+    def _send(self, client: GeminiClient, prompt: str, parts: Optional[Tuple[str, str]],
+              on_field: Optional[Callable[[str, Any], None]] = None,
+              max_output_tokens: Optional[int] = None) -> GeminiResponse:
+        """
+        Sends the prompt, as cached prefix + suffix when context caching is
+        available. With `on_field` the response is streamed and parsed as it
+        arrives (fields reported as they close, invalid output aborted).
+        """
+        def generate(text: str, cached_content: Optional[str] = None) -> GeminiResponse:
+            if on_field is None:
+                return client.generate_content(text, cached_content=cached_content,
+                                               max_output_tokens=max_output_tokens)
+            stream = JsonFieldStream(on_field)
+
+            def feed(chunk: str) -> None:
+                if stream.failed:
+                    return
+                try:
+                    stream.feed(chunk)
+                except JsonStreamError:
+                    # com os campos obrigatórios já completos, o reparo do JSON aproveita a resposta
+                    if not all(field in stream.fields for field in REQUIRED_FIELDS):
+                        raise
+            return client.stream_generate_content(text, cached_content=cached_content, on_text=feed,
+                                                  max_output_tokens=max_output_tokens)
+
+        if parts:
+            cached_content = self._context_cache.get(client, parts[0])
+            if cached_content:
+                try:
+                    return generate(parts[1], cached_content=cached_content)
+                except GeminiError as e:
+                    if e.code not in (400, 403, 404) or 'cache' not in str(e).lower():
+                        raise
+                    # cache apagado ou expirado no servidor: descarta e manda inline
+                    logger.info(f"Gemini context cache {cached_content} rejected ({e}); sending inline.")
+                    self._context_cache.invalidate(client, parts[0])
+        return generate(prompt)
+
+    def _generate(self, prompt: str, parts: Optional[Tuple[str, str]] = None,
+                  output_tokens: Optional[int] = None,
+                  on_field: Optional[Callable[[str, Any], None]] = None,
+                  model: Optional[str] = None,
+                  max_output_tokens: Optional[int] = None,
+                  accept: Optional[Callable[[GeminiResponse], bool]] = None,
+                  ) -> Tuple[Optional[GeminiResponse], Optional[str]]:
+        """
+        Sends `prompt` on the first key with room for it, failing over to the
+        next key on errors. The estimated tokens are charged to the key's TPM
+        budget up front and replaced by the billed count from usageMetadata.
+        With `parts` (prefix, suffix) the prefix goes through the context cache.
+        `output_tokens` overrides the output estimate (batches); their
+        responses do not recalibrate the single-article output average.
+        `on_field` switches to a streamed request (see _send).
+
+        The request goes to `model` (default: the primary) and, on timeouts,
+        overload or 5xx, down the rest of the router's chain; every call's
+        latency and outcome feed the router. A response `accept` rejects
+        (unparsable JSON) uses up an attempt like an error and the request
+        goes to the next key, within the same bounded loop.
+
+        Returns:
+            The response and None, or None and the last error.
+        """
+        input_tokens, estimated_output = self._token_estimator.estimate(prompt)
+        track_output = output_tokens is None
+        output_tokens = estimated_output if track_output else output_tokens
+        charged = input_tokens + output_tokens
+        models = self._router.route(model or self._router.chain[0])
+        model_index = 0
+        last_error = "Unknown error"
+        for _ in range(len(self.api_keys) + len(models) - 1):
+            model = models[model_index]
+            api_key = self._acquire_key(charged)
+            if api_key is None:
+                wait = self.keys.next_available_in(charged)
+                last_error = (f"no key available (next in {wait:.0f}s)" if wait is not None
+                              else "no key available")
+                break
+            start = time.monotonic()
+            try:
+                logger.info(f"Sending content to AI for rewriting ({model}, key ...{api_key[-4:]}, ~{input_tokens} tokens)...")
+                response = self._send(self._client_for(api_key, model), prompt, parts, on_field, max_output_tokens)
+            except GeminiError as e:
+                last_error = str(e)
+                logger.error(f"AI content generation failed with {model}, key ...{api_key[-4:]}: {last_error}")
+                if self._model_unavailable(e):
+                    self._router.record(model, time.monotonic() - start, False)
+                    if model_index + 1 < len(models):
+                        # timeout/sobrecarga é do modelo, não da chave: estorna a reserva e desce na cadeia
+                        self.keys.release(api_key, charged)
+                        model_index += 1
+                        logger.warning(f"Falling back from {model} to {models[model_index]}.")
+                        continue
+                self._report_key_error(api_key, e)
+                continue
+            self._router.record(model, time.monotonic() - start, True)
+
+            # A chamada funcionou; uma resposta malformada não é culpa da chave
+            self.keys.report_success(api_key)
+            billed = self._token_estimator.observe(prompt, response.usage, track_output=track_output)
+            if billed is not None:
+                self.keys.record_usage(api_key, charged, billed)
+                logger.info(
+                    f"Gemini usage: {response.usage.get('promptTokenCount', 0)} input + "
+                    f"{response.usage.get('candidatesTokenCount', 0)} output tokens, "
+                    f"{response.usage.get('cachedContentTokenCount', 0)} cached "
+                    f"(estimated {input_tokens} + {output_tokens})."
+                )
+            if accept is not None and not accept(response):
+                last_error = "Failed to parse or validate AI response. See logs for details."
+                continue
+            return response, None
+        return None, last_error
+
+    def _prepare(
         self,
         title: Optional[str] = None,
         content_html: Optional[str] = None,
@@ -124,34 +444,15 @@ class AIProcessor:
         fonte_nome: Optional[str] = None,
         source_name: Optional[str] = None,
         **kwargs: Any,
-    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    ) -> Dict[str, Any]:
         """
-        Rewrites the given article content using the AI model.
-        This method is designed to be robust and backward-compatible.
-
-        Args:
-            title: The original title of the article.
-            content_html: The full HTML content of the article.
-            source_url: The original URL of the article.
-            category: The content category (e.g., 'movies'). Overrides instance category.
-            videos: A list of dictionaries of extracted YouTube videos.
-            images: A list of extracted image URLs.
-            tags: A list of extracted tags.
-            fonte_nome: The name of the source (e.g., 'ScreenRant').
-            source_name: Alternative name for the source.
-            **kwargs: Catches extra arguments like 'domain' for backward compatibility.
-
-        Returns:
-            A tuple containing a dictionary with the rewritten text and a failure
-            reason (or None if successful).
+        Builds everything a rewrite needs from the article (same arguments as
+        rewrite_content): the prompt fields, compacted content, image id map
+        and response cache key.
         """
-        class _SafeDict(dict):
-            def __missing__(self, key: str) -> str:
-                return ""
-
-        prompt_template = self._load_prompt_template()
-
         # Handle defaults and backward compatibility
+        source_url = source_url or kwargs.get("url")
+        content_html = content_html or kwargs.get("content")
         videos = videos or []
         images = images or []
         tags = tags or []
@@ -164,13 +465,16 @@ class AIProcessor:
             except Exception:
                 fonte = ""  # Fallback in case of URL parsing error
 
+        content, image_ids = self._compact_content(content_html or "", title)
         final_category = category or self.category or ""
         domain = kwargs.get("domain", "")
+        input_tokens = self._token_estimator.estimate(content)[0]
+        model = self._router.base_model(input_tokens, final_category)
 
         fields = {
             "titulo_original": title or "",
             "url_original": source_url or "",
-            "content": content_html or "",
+            "content": content,
             "domain": domain,
             "fonte_nome": fonte,
             "categoria": final_category,
@@ -183,61 +487,483 @@ class AIProcessor:
             "focus_keyword": "",
         }
 
-        # Manually replace placeholders. This is safer than format_map because it won't
-        # try to interpret literal braces {} within the prompt's JSON structure example,
-        # which was causing the unexpected AttributeError.
-        prompt = prompt_template
-        for key, value in fields.items():
-            prompt = prompt.replace(f'{{{key}}}', str(value))
+        cache_key = None
+        if self.response_cache is not None:
+            # todos os campos que entram no prompt: título e URL originais são ecoados na resposta
+            context = "|".join(f"{k}={fields[k]}" for k in sorted(fields) if k != "content")
+            cache_key = response_key(content, self._prompt_version(), model, GENERATION_CONFIG, context)
+        return {"title": title, "fields": fields, "image_ids": image_ids, "cache_key": cache_key,
+                "model": model, "input_tokens": input_tokens}
+
+    def _cached_result(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The cached rewrite of a prepared article, if any."""
+        if job["cache_key"] is None:
+            return None
+        cached = self.response_cache.get(job["cache_key"])
+        if cached is None:
+            return None
+        logger.info(f"AI response cache hit for '{job['title']}'; no request sent.")
+        return self._restore_images(cached, job["image_ids"])
 
-        last_error = "Unknown error"
-        for _ in range(len(self.api_keys)):
+    def _complete(self, job: Dict[str, Any], parsed_data: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """Stores a validated rewrite in the response cache and resolves its image ids."""
+        # guardado ainda com os ids de imagem: cópias do mesmo texto em outra CDN também acertam
+        if job["cache_key"] is not None:
+            self.response_cache.put(job["cache_key"], model, parsed_data)
+        return self._restore_images(parsed_data, job["image_ids"])
+
+    def rewrite_content(
+        self,
+        title: Optional[str] = None,
+        content_html: Optional[str] = None,
+        source_url: Optional[str] = None,
+        category: Optional[str] = None,
+        videos: Optional[List[Dict[str, str]]] = None,
+        images: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        fonte_nome: Optional[str] = None,
+        source_name: Optional[str] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        **kwargs: Any,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Rewrites the given article content using the AI model.
+        This method is designed to be robust and backward-compatible.
+
+        Args:
+            title: The original title of the article.
+            content_html: The full HTML content of the article.
+            source_url: The original URL of the article.
+            category: The content category (e.g., 'movies'). Overrides instance category.
+            videos: A list of dictionaries of extracted YouTube videos.
+            images: A list of extracted image URLs.
+            tags: A list of extracted tags.
+            fonte_nome: The name of the source (e.g., 'ScreenRant').
+            source_name: Alternative name for the source.
+            on_field: With AI_REWRITE_CONFIG['streaming'], called with (name, value)
+                as each field of the response is complete (image ids already
+                resolved), before the whole response arrives. A field may be
+                reported again if the attempt is discarded and retried.
+            **kwargs: Catches extra arguments like 'domain' for backward compatibility,
+                and the 'url'/'content' aliases of source_url/content_html.
+
+        Returns:
+            A tuple containing a dictionary with the rewritten text and a failure
+            reason (or None if successful).
+        """
+        return self._rewrite_job(self._prepare(
+            title=title, content_html=content_html, source_url=source_url, category=category,
+            videos=videos, images=images, tags=tags, fonte_nome=fonte_nome, source_name=source_name,
+            **kwargs,
+        ), on_field)
+
+    def _stream_callback(self, job: Dict[str, Any],
+                         on_field: Optional[Callable[[str, Any], None]]) -> Callable[[str, Any], None]:
+        """Wraps the caller's on_field: resolves image ids and keeps its errors out of the stream."""
+        def callback(name: str, value: Any) -> None:
+            if on_field is None:
+                return
+            if name == "conteudo_final" and isinstance(value, str):
+                value = restore_image_ids(value, job["image_ids"])
+            elif name == "image_alt_texts" and isinstance(value, dict) and job["image_ids"]:
+                value = restore_alt_text_keys(value, job["image_ids"])
             try:
-                logger.info(f"Sending content to AI for rewriting (Key index: {self.current_key_index})...")
-                response = self.model.generate_content(prompt)
+                on_field(name, value)
+            except Exception as e:
+                logger.error(f"on_field callback for '{name}' failed: {e}", exc_info=True)
+        return callback
+
+    def _build_prompt(self, fields: Dict[str, Any], image_ids: Dict[str, str],
+                      note: str = "") -> Tuple[str, Optional[Tuple[str, str]]]:
+        """Fills the template (plus `note` and the image ids note) and splits it for the context cache."""
+        extra = note + (IMAGE_IDS_NOTE if image_ids else "")
+        prompt = _fill_placeholders(self._load_prompt_template(), fields) + extra
+        parts = self._prompt_parts(fields) if AI_REWRITE_CONFIG['context_cache'] else None
+        if parts:
+            parts = (parts[0], parts[1] + extra)
+        return prompt, parts
+
+    def _request_json(
+        self,
+        prompt: str,
+        parts: Optional[Tuple[str, str]],
+        model: str,
+        parse: Callable[[str], Optional[Dict[str, Any]]],
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        output_tokens: Optional[int] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Generates until `parse` accepts the response text (a rejection with
+        "erro" counts as accepted). The retries on unparsable responses run
+        inside _generate's key/model loop, so they share its attempt budget.
+
+        Returns:
+            The parsed data, the model that produced it and None; or None, None and the last error.
+        """
+        parsed: Dict[str, Any] = {}
 
-                parsed_data = self._parse_response(response.text)
+        def accept(response: GeminiResponse) -> bool:
+            parsed["data"] = parse(response.text)
+            return bool(parsed["data"])
 
-                if not parsed_data:
-                    raise AIProcessorError("Failed to parse or validate AI response. See logs for details.")
+        response, error = self._generate(prompt, parts, output_tokens=output_tokens,
+                                         on_field=on_field, model=model, accept=accept)
+        if response is None:
+            return None, None, error
+        return parsed["data"], response.model, None
 
-                # If the AI returned a specific rejection error, handle it as a failure.
-                if "erro" in parsed_data:
-                    return None, parsed_data["erro"]
+    def _rewrite_job(self, job: Dict[str, Any],
+                     on_field: Optional[Callable[[str, Any], None]] = None
+                     ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Rewrites one prepared article with its own request (streamed if
+        configured), or in parts when it is too long for one response.
+        """
+        cached = self._cached_result(job)
+        if cached is not None:
+            return cached, None
+
+        if AI_REWRITE_CONFIG['chunked_rewrite'] and job["input_tokens"] > AI_REWRITE_CONFIG['chunk_min_tokens']:
+            chunked = self._rewrite_chunked(job)
+            if chunked is not None:
+                return chunked
+
+        prompt, parts = self._build_prompt(job["fields"], job["image_ids"])
+        stream_fields = self._stream_callback(job, on_field) if AI_REWRITE_CONFIG['streaming'] else None
+        parsed_data, model, error = self._request_json(prompt, parts, job["model"], self._parse_response,
+                                                       on_field=stream_fields)
+        if parsed_data is None:
+            final_reason = f"All API keys for category '{self.category}' failed. Last error: {error}"
+            logger.critical(f"Failed to rewrite content. {final_reason}")
+            return None, final_reason
+
+        # If the AI returned a specific rejection error, handle it as a failure.
+        if "erro" in parsed_data:
+            return None, parsed_data["erro"]
+
+        return self._complete(job, parsed_data, model), None
+
+    def _rewrite_chunked(self, job: Dict[str, Any]) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Map-reduce rewrite of a long article: the content is split at <h2>
+        sections, every part is rewritten concurrently with the same article
+        header (title, source, section list), and one more request writes
+        the title, meta description, tags and SEO fields from the whole
+        original. The parts are joined into conteudo_final.
+
+        Returns:
+            The rewrite_content result, or None if the content does not split.
+        """
+        fields = job["fields"]
+        content = fields["content"]
+        max_chars = max(int(AI_REWRITE_CONFIG['chunk_target_tokens'] * self._token_estimator.chars_per_token),
+                        len(content) // AI_REWRITE_CONFIG['chunk_max_parts'] + 1)
+        chunks = split_sections(content, max_chars)
+        if len(chunks) < 2:
+            return None
+        total = str(len(chunks))
+        sections = "; ".join(section_headings(content)) or "—"
+        logger.info(f"Rewriting '{job['title']}' (~{job['input_tokens']} tokens) in {total} parts "
+                    f"plus a title/meta pass.")
 
-                # Success: Add a delay between calls to respect rate limits
-                time.sleep(SCHEDULE_CONFIG.get('api_call_delay', 30))
+        def run(part: int) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+            try:
+                if part == 0:
+                    prompt, parts = self._build_prompt(fields, job["image_ids"], META_NOTE.replace("{n}", total))
+                    return self._request_json(prompt, parts, job["model"], self._parse_meta,
+                                              output_tokens=META_OUTPUT_TOKENS)
+                chunk = chunks[part - 1]
+                position = "first" if part == 1 else "last" if part == len(chunks) else "middle"
+                note = (CHUNK_NOTE.replace("{i}", str(part)).replace("{n}", total)
+                        .replace("{sections}", sections) + CHUNK_POSITION_NOTES[position])
+                prompt, parts = self._build_prompt(dict(fields, content=chunk), job["image_ids"], note)
+                output_tokens = int(self._token_estimator.estimate(chunk)[0] * 1.3)
+                return self._request_json(prompt, parts, job["model"], self._parse_chunk,
+                                          output_tokens=output_tokens)
+            except Exception as e:
+                logger.error(f"Part {part} of '{job['title']}' failed: {e}", exc_info=True)
+                return None, None, str(e)
+
+        results = self._run_parallel(run, list(range(len(chunks) + 1)), max_workers=len(chunks) + 1)
+        for part, (data, _, error) in enumerate(results):
+            if data is None:
+                what = "title/meta pass" if part == 0 else f"part {part}/{total}"
+                final_reason = f"Chunked rewrite failed on the {what}. Last error: {error}"
+                logger.critical(f"Failed to rewrite content. {final_reason}")
+                return None, final_reason
+            if "erro" in data:
+                return None, data["erro"]
+
+        meta, model, _ = results[0]
+        merged = dict(meta, conteudo_final="".join(data["conteudo_final"] for data, _, _ in results[1:]))
+        parsed_data = self._validate_response(merged)
+        if not parsed_data:
+            return None, "Merged chunked rewrite failed validation."
+        return self._complete(job, parsed_data, model), None
+
+    def _run_parallel(self, fn: Callable[[T], R], items: List[T], max_workers: Optional[int] = None) -> List[R]:
+        """Runs `fn` over `items` on up to one thread per key (AI_REWRITE_CONFIG['workers']), in order."""
+        workers = max_workers or AI_REWRITE_CONFIG['workers'] or len(self.api_keys)
+        workers = max(1, min(workers, len(items)))
+        if workers == 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rewrite') as pool:
+            return list(pool.map(fn, items))
+
+    def rewrite_many(
+        self, articles: List[Dict[str, Any]], max_workers: Optional[int] = None
+    ) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Rewrites several articles concurrently, one request in flight per key
+        by default; each request still waits for its key's rate limits.
 
-                return parsed_data, None
+        Args:
+            articles: Keyword arguments for rewrite_content, one dict per article.
+            max_workers: Concurrent requests (default AI_REWRITE_CONFIG['workers'], 0 = one per key).
 
+        Returns:
+            The rewrite_content results, in input order.
+        """
+        def run(article: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            try:
+                return self.rewrite_content(**article)
             except Exception as e:
-                last_error = str(e)
-                logger.error(f"AI content generation failed with key index {self.current_key_index}: {last_error}")
-                self._failover_to_next_key()
-                if self.current_key_index < len(self.api_keys):
-                    self._configure_model()
+                logger.error(f"Rewrite of '{article.get('title')}' failed: {e}", exc_info=True)
+                return None, str(e)
+
+        return self._run_parallel(run, articles, max_workers)
+
+    def _batch_groups(self, jobs: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Packs prepared short articles into batches that share the prompt
+        prefix and model and fit the per-batch article count, input and output token
+        budgets (output per article: the running average of past batches).
+        """
+        per_article_output = AIProcessor._batch_output_per_article
+        max_articles = AI_REWRITE_CONFIG['batch_max_articles']
+        max_input = AI_REWRITE_CONFIG['batch_max_input_tokens']
+        max_output = AI_REWRITE_CONFIG['batch_max_output_tokens']
+        groups: List[List[Dict[str, Any]]] = []
+        open_groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for job in jobs:
+            group = open_groups.get((job["prefix"], job["model"]))
+            if group is not None and (
+                len(group) >= max_articles
+                or sum(j["input_tokens"] for j in group) + job["input_tokens"] > max_input
+                or (len(group) + 1) * per_article_output > max_output
+            ):
+                group = None
+            if group is None:
+                group = open_groups[(job["prefix"], job["model"])] = []
+                groups.append(group)
+            group.append(job)
+        return groups
+
+    def _rewrite_group(self, group: List[Dict[str, Any]]) -> Dict[str, Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Sends one batch request and validates each element of the returned
+        array; returns the results by article id (failed elements are missing).
+        """
+        prefix = group[0]["prefix"]
+        suffix = BATCH_NOTE.replace("{n}", str(len(group))) + "".join(
+            f"\n### ARTIGO id={job['id']}\n{job['suffix']}" for job in group
+        )
+        if any(job["image_ids"] for job in group):
+            suffix += IMAGE_IDS_NOTE
+        parts = (prefix, suffix) if AI_REWRITE_CONFIG['context_cache'] else None
+        output_tokens = min(AI_REWRITE_CONFIG['batch_max_output_tokens'],
+                            int(len(group) * AIProcessor._batch_output_per_article))
+
+        logger.info(f"Sending batch of {len(group)} articles to AI: {', '.join(j['id'] for j in group)}")
+        response, error = self._generate(prefix + suffix, parts, output_tokens=output_tokens, model=group[0]["model"],
+                                         max_output_tokens=AI_REWRITE_CONFIG['batch_max_output_tokens'])
+        if response is None:
+            logger.warning(f"Batch request failed: {error}")
+            return {}
+        self._observe_batch(response, len(group))
+
+        results = {}
+        for element in self._parse_batch_response(response.text):
+            job = next((j for j in group if j["id"] == str(element.get("id", ""))), None)
+            if job is None or job["id"] in results:
+                continue
+            element = {k: v for k, v in element.items() if k != "id"}
+            parsed_data = self._validate_response(element)
+            if not parsed_data:
+                logger.warning(f"Batch element {job['id']} ('{job['title']}') failed validation.")
+            elif "erro" in parsed_data:
+                results[job["id"]] = (None, parsed_data["erro"])
+            else:
+                results[job["id"]] = (self._complete(job, parsed_data, response.model), None)
+        return results
+
+    @staticmethod
+    def _observe_batch(response: GeminiResponse, size: int) -> None:
+        """Updates the output tokens expected per batched article; grows it after a truncation."""
+        with AIProcessor._batch_lock:
+            if response.finish_reason == "MAX_TOKENS":
+                AIProcessor._batch_output_per_article *= 1.5
+            elif response.usage.get("candidatesTokenCount"):
+                observed = response.usage["candidatesTokenCount"] / size
+                AIProcessor._batch_output_per_article += 0.2 * (observed - AIProcessor._batch_output_per_article)
+
+    def rewrite_batch(
+        self, articles: List[Dict[str, Any]]
+    ) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Rewrites several articles packing the short ones into shared requests
+        (a JSON array of results keyed by article id). Long articles, lone
+        short ones and elements that come back missing or invalid are
+        rewritten individually. Batches and individual requests run in
+        parallel across keys.
+
+        Args:
+            articles: Keyword arguments for rewrite_content, one dict per article.
+
+        Returns:
+            The rewrite_content-style results, in input order.
+        """
+        jobs = [self._prepare(**article) for article in articles]
+        results: List[Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]] = [None] * len(jobs)
+        short, single = [], []
+        for index, job in enumerate(jobs):
+            cached = self._cached_result(job)
+            if cached is not None:
+                results[index] = (cached, None)
+                continue
+            job["id"] = f"a{index + 1}"
+            parts = self._prompt_parts(job["fields"])
+            if parts is None or job["input_tokens"] > AI_REWRITE_CONFIG['batch_article_max_tokens']:
+                single.append(index)
+                continue
+            job["prefix"], job["suffix"] = parts
+            short.append(job)
+
+        groups = self._batch_groups(short)
+        for group in groups:
+            if len(group) == 1:
+                single.append(int(group[0]["id"][1:]) - 1)
+        batches = [group for group in groups if len(group) > 1]
+
+        def run_group(group: List[Dict[str, Any]]) -> Dict[str, Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+            try:
+                return self._rewrite_group(group)
+            except Exception as e:
+                logger.error(f"Batch rewrite failed: {e}", exc_info=True)
+                return {}
+
+        requeued = 0
+        for group, group_results in zip(batches, self._run_parallel(run_group, batches)):
+            for job in group:
+                index = int(job["id"][1:]) - 1
+                if job["id"] in group_results:
+                    results[index] = group_results[job["id"]]
                 else:
-                    logger.critical("All API keys have failed.")
-                    break  # Exit loop if all keys are exhausted
-        
-        final_reason = f"All API keys for category '{self.category}' failed. Last error: {last_error}"
-        logger.critical(f"Failed to rewrite content. {final_reason}")
-        return None, final_reason
+                    single.append(index)
+                    requeued += 1
+        if batches:
+            logger.info(f"Batched {sum(len(g) for g in batches)} articles in {len(batches)} requests; "
+                        f"{len(single)} rewritten individually ({requeued} re-queued from batches).")
+
+        def run_single(index: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            try:
+                return self._rewrite_job(jobs[index])
+            except Exception as e:
+                logger.error(f"Rewrite of '{jobs[index]['title']}' failed: {e}", exc_info=True)
+                return None, str(e)
+
+        single.sort()
+        for index, result in zip(single, self._run_parallel(run_single, single)):
+            results[index] = result
+        return results
+
+    def close(self) -> None:
+        """Closes the key state database connection and logs how many responses needed repair."""
+        self.keys.close()
+        with AIProcessor._parse_lock:
+            stats = dict(AIProcessor._parse_stats)
+        if stats.get('repaired') or stats.get('unrecoverable'):
+            details = ", ".join(f"{k} {v}" for k, v in sorted(stats.items())
+                                if k not in ('responses', 'repaired', 'unrecoverable'))
+            logger.info(f"AI responses so far: {stats.get('responses', 0)} parsed, {stats.get('repaired', 0)} "
+                        f"repaired ({details}), {stats.get('unrecoverable', 0)} unrecoverable.")
+
+    @staticmethod
+    def _count_parse(repairs: Optional[List[str]]) -> None:
+        """Counts one parsed response and its repairs (None = unrecoverable)."""
+        with AIProcessor._parse_lock:
+            stats = AIProcessor._parse_stats
+            stats['responses'] = stats.get('responses', 0) + 1
+            if repairs is None:
+                stats['unrecoverable'] = stats.get('unrecoverable', 0) + 1
+                return
+            if repairs:
+                stats['repaired'] = stats.get('repaired', 0) + 1
+            for repair in repairs:
+                stats[repair] = stats.get(repair, 0) + 1
+
+    @staticmethod
+    def _decode(text: str, what: str = "AI response") -> Optional[Any]:
+        """Decodes the model's JSON, repairing fences, trailing commas and truncation when possible."""
+        try:
+            data, repairs = repair_json(text)
+        except ValueError as e:
+            AIProcessor._count_parse(None)
+            logger.error(f"Error decoding JSON from {what}: {e}")
+            logger.debug(f"Received text: {text[:500]}...")
+            return None
+        AIProcessor._count_parse(repairs)
+        if repairs:
+            logger.warning(f"Repaired malformed JSON in {what} ({', '.join(repairs)}).")
+        return data
 
     @staticmethod
     def _parse_response(text: str) -> Optional[Dict[str, Any]]:
         """
         Parses the JSON response from the AI and validates its structure.
+        Malformed JSON is repaired when possible; a response cut short keeps
+        its complete fields and only fails if a required one is missing.
         """
-        try:
-            clean_text = text.strip()
-            if clean_text.startswith("```json"):
-                clean_text = clean_text[7:-3].strip()
-            elif clean_text.startswith("```"):
-                clean_text = clean_text[3:-3].strip()
+        data = AIProcessor._decode(text)
+        if data is None:
+            return None
+        return AIProcessor._validate_response(data)
+
+    @staticmethod
+    def _parse_chunk(text: str) -> Optional[Dict[str, Any]]:
+        """Parses the response for one part of a chunked rewrite ({"conteudo_final": ...})."""
+        data = AIProcessor._decode(text, "AI chunk response")
+        if isinstance(data, dict) and ("erro" in data or str(data.get("conteudo_final") or "").strip()):
+            return data
+        logger.error("AI chunk response has no conteudo_final.")
+        return None
+
+    @staticmethod
+    def _parse_meta(text: str) -> Optional[Dict[str, Any]]:
+        """Parses the title/meta pass of a chunked rewrite (every required field but conteudo_final)."""
+        data = AIProcessor._decode(text, "AI title/meta response")
+        if not isinstance(data, dict):
+            return None
+        missing = [key for key in REQUIRED_FIELDS if key != "conteudo_final" and key not in data]
+        if missing and "erro" not in data:
+            logger.error(f"AI title/meta response is missing required keys: {', '.join(missing)}")
+            return None
+        return data
 
-            data = json.loads(clean_text)
+    @staticmethod
+    def _parse_batch_response(text: str) -> List[Dict[str, Any]]:
+        """Elements of a batch response (a JSON array, possibly wrapped in an object)."""
+        data = AIProcessor._decode(text, "AI batch response")
+        if isinstance(data, dict):
+            data = next((v for v in data.values() if isinstance(v, list)), [data])
+        return [element for element in data if isinstance(element, dict)] if isinstance(data, list) else []
 
+    @staticmethod
+    def _validate_response(data: Any) -> Optional[Dict[str, Any]]:
+        """
+        Validates the structure of a decoded AI response.
+        """
+        try:
             if not isinstance(data, dict):
                 logger.error(f"AI response is not a dictionary. Received type: {type(data)}")
                 return None
@@ -248,11 +974,7 @@ class AIProcessor:
                 return data  # Return the error dict to be handled by the caller
 
             # Validate the presence of all required keys for a successful rewrite
-            required_keys = [
-                "titulo_final", "conteudo_final", "meta_description",
-                "focus_keyword", "tags"
-            ]
-            missing_keys = [key for key in required_keys if key not in data]
+            missing_keys = [key for key in REQUIRED_FIELDS if key not in data]
 
             if missing_keys:
                 logger.error(f"AI response is missing required keys: {', '.join(missing_keys)}")
@@ -279,11 +1001,6 @@ class AIProcessor:
             logger.info("Successfully parsed and validated AI response.")
             return data
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decoding JSON from AI response: {e}")
-            logger.debug(f"Received text: {text[:500]}...")
-            return None
         except Exception as e:
-            logger.error(f"An unexpected error occurred while parsing AI response: {e}")
-            logger.debug(f"Received text: {text[:500]}...")
+            logger.error(f"An unexpected error occurred while validating AI response: {e}")
             return None
@@ -2,6 +2,8 @@ import logging
 import time
 from datetime import datetime, timedelta
 
+from .config import EXTRACTION_CONFIG
+from .page_archive import prune_segments
 from .store import Database
 
 logger = logging.getLogger(__name__)
@@ -29,4 +31,10 @@ class CleanupManager:
             deleted_count = self.db.cleanup_old_entries(cutoff_time)
             logger.info(f"Cleanup complete. Deleted {deleted_count} old records.")
         except Exception as e:
-            logger.error(f"An error occurred during cleanup: {e}", exc_info=True)
\ No newline at end of file
+            logger.error(f"An error occurred during cleanup: {e}", exc_info=True)
+
+        if EXTRACTION_CONFIG.get('page_archive_enabled', True):
+            try:
+                prune_segments(EXTRACTION_CONFIG.get('page_archive_path', 'data/page_archive'), cutoff_time)
+            except Exception as e:
+                logger.error(f"An error occurred while pruning the page archive: {e}", exc_info=True)
\ No newline at end of file
@@ -32,6 +32,17 @@ RSS_FEEDS = {
 
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 
+# --- Configuração HTTP (cliente compartilhado em app/http_client.py) ---
+HTTP_CONFIG = {
+    'timeout_seconds': float(os.getenv('HTTP_TIMEOUT_SECONDS', 20)),
+    'connect_timeout_seconds': float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', 10)),
+    'max_connections': int(os.getenv('HTTP_MAX_CONNECTIONS', 50)),
+    'max_connections_per_host': int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', 6)),
+    'keepalive_expiry_seconds': float(os.getenv('HTTP_KEEPALIVE_SECONDS', 30)),
+    'retries': int(os.getenv('HTTP_RETRIES', 2)),
+    'http2': os.getenv('HTTP_HTTP2', '1') == '1',  # requer o pacote opcional 'h2'
+}
+
 # --- Configuração da IA ---
 def _load_ai_keys() -> Dict[str, List[str]]:
     """Helper to load Gemini API keys from environment variables."""
@@ -54,6 +65,23 @@ PROMPT_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'
 AI_MODELS = {
     'primary': os.getenv('AI_PRIMARY_MODEL', 'gemini-1.5-flash-latest'),
     'fallback': os.getenv('AI_FALLBACK_MODEL', 'gemini-1.5-flash-latest'),
+    # Modelo mais barato para artigos curtos (vazio = usa o primary)
+    'light': os.getenv('AI_LIGHT_MODEL', ''),
+    # Cadeia completa de fallback, separada por vírgulas (vazio = primary, fallback)
+    'chain': [m.strip() for m in os.getenv('AI_MODEL_CHAIN', '').split(',') if m.strip()],
+    # Modelo fixo por categoria, ex. AI_MODEL_GAMES=gemini-1.5-pro-latest
+    'by_category': {c: os.getenv(f'AI_MODEL_{c.upper()}', '') for c in ('movies', 'series', 'games')},
+}
+
+# Escolha do modelo por artigo (app/model_router.py)
+AI_ROUTING_CONFIG = {
+    # Artigos com conteúdo estimado até este tamanho vão para o modelo 'light'
+    'light_max_tokens': int(os.getenv('AI_LIGHT_MAX_TOKENS', 1200)),
+    # Modelo com latência média ou taxa de erro acima disso vai para o fim da cadeia
+    'latency_target_seconds': float(os.getenv('AI_LATENCY_TARGET_SECONDS', 45)),
+    'max_error_rate': float(os.getenv('AI_MAX_ERROR_RATE', 0.5)),
+    'window_seconds': int(os.getenv('AI_ROUTING_WINDOW_SECONDS', 600)),
+    'min_samples': int(os.getenv('AI_ROUTING_MIN_SAMPLES', 3)),
 }
 
 AI_GENERATION_CONFIG = {
@@ -62,6 +90,85 @@ AI_GENERATION_CONFIG = {
     'max_output_tokens': 4096,
 }
 
+# Limites e cooldowns por chave do Gemini (estado persistido em api_key_status, app/keys.py)
+AI_KEY_CONFIG = {
+    'requests_per_minute': int(os.getenv('AI_KEY_RPM', 15)),
+    'requests_per_day': int(os.getenv('AI_KEY_RPD', 1500)),
+    'tokens_per_minute': int(os.getenv('AI_KEY_TPM', 1000000)),
+    'base_cooldown_seconds': int(os.getenv('AI_KEY_BASE_COOLDOWN_SECONDS', 60)),
+    'max_cooldown_seconds': int(os.getenv('AI_KEY_MAX_COOLDOWN_SECONDS', 3600)),
+    'invalid_retry_hours': int(os.getenv('AI_KEY_INVALID_RETRY_HOURS', 24)),
+    'db_path': os.getenv('AI_KEY_DB_PATH', 'data/app.db'),
+}
+
+# Chamadas ao Gemini (REST sobre o cliente HTTP compartilhado, app/gemini_client.py)
+AI_REWRITE_CONFIG = {
+    'api_url': os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta'),
+    'timeout_seconds': float(os.getenv('AI_TIMEOUT_SECONDS', 120)),
+    # Reescritas simultâneas por categoria (0 = uma por chave)
+    'workers': int(os.getenv('AI_REWRITE_WORKERS', 0)),
+    # Quanto esperar por uma chave livre (RPM/cooldown) antes de desistir do artigo
+    'max_key_wait_seconds': float(os.getenv('AI_MAX_KEY_WAIT_SECONDS', 90)),
+    # Envia o conteúdo reduzido a tags semânticas, com ids curtos no lugar das URLs de imagem
+    'compact_input': os.getenv('AI_COMPACT_INPUT', '1') == '1',
+    # Prefixo fixo do prompt como cachedContents do Gemini (exige modelo com versão fixa, ex.
+    # gemini-1.5-flash-002, e o tamanho mínimo de cache do modelo; sem isso, volta ao prompt inline)
+    'context_cache': os.getenv('AI_CONTEXT_CACHE', '0') == '1',
+    'context_cache_ttl_seconds': int(os.getenv('AI_CONTEXT_CACHE_TTL_SECONDS', 3600)),
+    # Cache persistente das respostas (mesmo texto compactado + prompt + modelo = mesma reescrita)
+    'response_cache_enabled': os.getenv('AI_RESPONSE_CACHE_ENABLED', '1') == '1',
+    'response_cache_path': os.getenv('AI_RESPONSE_CACHE_PATH', 'data/ai_cache.db'),
+    'response_cache_max_mb': int(os.getenv('AI_RESPONSE_CACHE_MAX_MB', 20)),
+    'response_cache_ttl_hours': int(os.getenv('AI_RESPONSE_CACHE_TTL_HOURS', 168)),
+    # Resposta via streamGenerateContent: campos avisados ao fechar, saída inválida abortada cedo
+    'streaming': os.getenv('AI_STREAMING', '0') == '1',
+    # Artigos longos reescritos em partes (seções <h2>) em paralelo, com título/meta num pedido à parte
+    'chunked_rewrite': os.getenv('AI_CHUNKED_REWRITE', '1') == '1',
+    'chunk_min_tokens': int(os.getenv('AI_CHUNK_MIN_TOKENS', 3000)),
+    'chunk_target_tokens': int(os.getenv('AI_CHUNK_TARGET_TOKENS', 1500)),
+    'chunk_max_parts': int(os.getenv('AI_CHUNK_MAX_PARTS', 6)),
+    # Artigos curtos agrupados num só pedido (resposta em array JSON, um objeto por artigo)
+    'batch_enabled': os.getenv('AI_BATCH_REWRITE', '0') == '1',
+    'batch_max_articles': int(os.getenv('AI_BATCH_MAX_ARTICLES', 5)),
+    # Só entra em lote o artigo cujo conteúdo estimado fica abaixo disso
+    'batch_article_max_tokens': int(os.getenv('AI_BATCH_ARTICLE_MAX_TOKENS', 1500)),
+    'batch_max_input_tokens': int(os.getenv('AI_BATCH_MAX_INPUT_TOKENS', 6000)),
+    'batch_max_output_tokens': int(os.getenv('AI_BATCH_MAX_OUTPUT_TOKENS', 8192)),
+}
+
+# --- Configuração da Extração ---
+EXTRACTION_CONFIG = {
+    # Perfis por site (app/site_profiles.py): extraem direto do DOM, sem trafilatura
+    'site_profiles': os.getenv('EXTRACTION_SITE_PROFILES', '1') == '1',
+    # Metadados (título, resumo, data, imagens) lidos primeiro do JSON-LD da página
+    'structured_data': os.getenv('EXTRACTION_STRUCTURED_DATA', '1') == '1',
+    # Processos para o parsing (BeautifulSoup/trafilatura); 0 ou 1 = sem pool. Padrão 1: com lotes do
+    # tamanho de um feed (max_articles_per_feed) o pool sai mais lento que o inline (benchmarks/bench_extraction.py)
+    'workers': int(os.getenv('EXTRACTION_WORKERS', 1)),
+    # Cache HTTP em disco das páginas de artigo (app/http_cache.py)
+    'http_cache_enabled': os.getenv('HTTP_CACHE_ENABLED', '1') == '1',
+    'http_cache_path': os.getenv('HTTP_CACHE_PATH', 'data/http_cache.db'),
+    'http_cache_max_mb': int(os.getenv('HTTP_CACHE_MAX_MB', 200)),
+    'http_cache_fresh_seconds': int(os.getenv('HTTP_CACHE_FRESH_SECONDS', 3600)),
+    # Sondagem das imagens (Range request) para filtrar/ordenar pelo tamanho real
+    'image_probe': os.getenv('EXTRACTION_IMAGE_PROBE', '1') == '1',
+    'image_min_width': int(os.getenv('EXTRACTION_IMAGE_MIN_WIDTH', 500)),
+    'image_min_height': int(os.getenv('EXTRACTION_IMAGE_MIN_HEIGHT', 250)),
+    # Largura alvo ao escolher entre variantes da mesma imagem na CDN (app/image_variants.py)
+    'image_target_width': int(os.getenv('EXTRACTION_IMAGE_TARGET_WIDTH', 1600)),
+    # Download das páginas em streaming: limite de tamanho e parada ao fechar o corpo do artigo
+    'max_html_kb': int(os.getenv('EXTRACTION_MAX_HTML_KB', 3072)),
+    'stream_early_stop': os.getenv('EXTRACTION_STREAM_EARLY_STOP', '1') == '1',
+    # Arquivo comprimido das páginas baixadas (app/page_archive.py), podado junto com o banco
+    'page_archive_enabled': os.getenv('PAGE_ARCHIVE_ENABLED', '1') == '1',
+    'page_archive_path': os.getenv('PAGE_ARCHIVE_PATH', 'data/page_archive'),
+    'page_archive_segment_mb': int(os.getenv('PAGE_ARCHIVE_SEGMENT_MB', 64)),
+    # Cache dos resultados de extração por hash do HTML (app/extraction_cache.py)
+    'result_cache_enabled': os.getenv('EXTRACTION_RESULT_CACHE_ENABLED', '1') == '1',
+    'result_cache_path': os.getenv('EXTRACTION_RESULT_CACHE_PATH', 'data/extraction_cache.db'),
+    'result_cache_max_mb': int(os.getenv('EXTRACTION_RESULT_CACHE_MAX_MB', 50)),
+}
+
 # --- Configuração do WordPress ---
 WORDPRESS_CONFIG = {
     'url': os.getenv('WORDPRESS_URL'),
@@ -73,6 +180,16 @@ WORDPRESS_CATEGORIES = {
     'Notícias': 20, 'Filmes': 24, 'Séries': 21, 'Games': 73,
 }
 
+# Cache persistente slug -> ID das tags (app/tag_cache.py), recarregado por completo a cada N horas
+WORDPRESS_TAG_CONFIG = {
+    'cache_enabled': os.getenv('WP_TAG_CACHE_ENABLED', '1') == '1',
+    'cache_path': os.getenv('WP_TAG_CACHE_PATH', 'data/wp_tags.db'),
+    'sync_hours': int(os.getenv('WP_TAG_SYNC_HOURS', 24)),
+    'sync_max_pages': int(os.getenv('WP_TAG_SYNC_MAX_PAGES', 100)),
+    # Tags novas criadas em paralelo
+    'create_workers': int(os.getenv('WP_TAG_CREATE_WORKERS', 4)),
+}
+
 # --- Configuração do Agendador e Pipeline ---
 SCHEDULE_CONFIG = {
     'check_interval_minutes': int(os.getenv('CHECK_INTERVAL_MINUTES', 15)),
@@ -0,0 +1,96 @@
+"""
+Gemini context caching for the static prompt prefix.
+
+Every rewrite sends the same AI_SYSTEM_RULES + universal_prompt.txt text
+before the article. ContextCache keeps that prefix as provider-side cached
+content (one per key and model, since caches belong to the key's project),
+refreshes its TTL before it expires, and remembers when caching is not
+available for a key/model (model without caching, prefix under the
+minimum size) so those requests go inline without retrying every time.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .gemini_client import GeminiClient, GeminiError
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str]
+
+
+class ContextCache:
+    """Provider-side cached prefixes per (key, model, prefix)."""
+
+    def __init__(self, ttl_seconds: int = 3600, refresh_margin_seconds: int = 300,
+                 unsupported_retry_seconds: int = 3600):
+        """
+        Args:
+            ttl_seconds: TTL requested for each cached content.
+            refresh_margin_seconds: Refresh a cache this long before it expires.
+            unsupported_retry_seconds: After a failed creation, go inline this long before trying again.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin_seconds
+        self.unsupported_retry = unsupported_retry_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[CacheKey, Tuple[str, float]] = {}
+        self._unsupported: Dict[CacheKey, float] = {}
+        self._locks: Dict[CacheKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(client: GeminiClient, prefix: str) -> CacheKey:
+        return (
+            hashlib.sha256(client.api_key.encode('utf-8')).hexdigest()[:16],
+            client.model,
+            hashlib.sha256(prefix.encode('utf-8')).hexdigest(),
+        )
+
+    def get(self, client: GeminiClient, prefix: str) -> Optional[str]:
+        """
+        Name of a live cached content holding `prefix` for the client's key
+        and model, creating or refreshing it as needed; None means inline.
+        """
+        key = self._key(client, prefix)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # um só thread cria/renova o cache de cada chave; os outros esperam e reaproveitam
+        with lock:
+            now = time.time()
+            if self._unsupported.get(key, 0) > now:
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry and entry[1] - self.refresh_margin > now:
+                self.hits += 1
+                return entry[0]
+            if entry:
+                try:
+                    expires = client.refresh_cached_content(entry[0], self.ttl_seconds)
+                    self._entries[key] = (entry[0], expires)
+                    self.hits += 1
+                    return entry[0]
+                except GeminiError as e:
+                    logger.info(f"Could not refresh Gemini context cache {entry[0]}: {e}")
+                    del self._entries[key]
+            try:
+                name, expires = client.create_cached_content(prefix, self.ttl_seconds)
+            except GeminiError as e:
+                logger.warning(f"Gemini context caching unavailable for {client.model}; using inline prompts: {e}")
+                self._unsupported[key] = now + self.unsupported_retry
+                self.misses += 1
+                return None
+            logger.info(f"Created Gemini context cache {name} for {client.model}.")
+            self._entries[key] = (name, expires)
+            self.misses += 1
+            return name
+
+    def invalidate(self, client: GeminiClient, prefix: str) -> None:
+        """Forgets the cache of a key/model, e.g. after the API reported it missing."""
+        with self._lock:
+            self._entries.pop(self._key(client, prefix), None)
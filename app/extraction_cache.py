@@ -0,0 +1,124 @@
+"""
+Cache of extraction results keyed by page content.
+
+The output of ContentExtractor.parse only depends on the page bytes, the
+URL (relative image links are resolved against it), the declared encoding
+and the extractor code. Results are stored in SQLite as zlib-compressed
+JSON under a hash of all of these plus EXTRACTOR_VERSION, so retries,
+duplicates across feeds and reprocessing runs skip the parsing entirely.
+Bumping EXTRACTOR_VERSION invalidates every entry.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(html: Union[bytes, str], url: str, encoding: Optional[str], version: str) -> str:
+    """Hash identifying one extraction: extractor version, URL, encoding and raw page bytes."""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    h = hashlib.sha256()
+    for part in (version, url, encoding or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(html)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """SQLite store of compressed extraction results with LRU eviction by size."""
+
+    def __init__(self, db_path: str = 'data/extraction_cache.db', max_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            db_path: Path to the SQLite file.
+            max_bytes: Maximum total size of the compressed results.
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                result BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_access ON extraction_cache(last_access)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached result for `key`, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT result FROM extraction_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE extraction_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Corrupted extraction cache entry {key[:12]}: {e}")
+            self.delete(key)
+            return None
+
+    def put(self, key: str, url: str, result: Dict[str, Any]) -> None:
+        """Stores a result and evicts old entries if needed."""
+        blob = zlib.compress(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, url, result, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, blob, len(blob), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def delete(self, key: str) -> None:
+        """Removes the entry for `key`, if any."""
+        with self._lock:
+            self.conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the total size fits. Caller holds the lock."""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self.conn.execute("SELECT key, size FROM extraction_cache ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Extraction cache evicted {evicted} entries (LRU) to stay under {self.max_bytes} bytes.")
+
+    def close(self) -> None:
+        """Closes the database connection and logs the hit rate."""
+        with self._lock:
+            if self.conn:
+                if self.hits or self.misses:
+                    logger.info(f"Extraction cache: {self.hits} hits, {self.misses} misses.")
+                self.conn.close()
+                self.conn = None
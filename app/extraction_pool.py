@@ -0,0 +1,97 @@
+"""
+Process-pool execution for the CPU-bound part of content extraction.
+
+HTML cleaning, BeautifulSoup and trafilatura are pure CPU work. The
+ExtractionExecutor runs ContentExtractor.parse in worker processes: only
+the raw HTML bytes and the URL go in, and the compact result dict comes
+out. Network I/O stays in the parent process.
+"""
+
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Extractor de cada processo worker, criado uma vez pelo initializer.
+_worker_extractor = None
+
+
+def _init_worker(use_site_profiles: Optional[bool], probe_images: bool) -> None:
+    """Initializer dos workers: cria o ContentExtractor usado para o parsing."""
+    global _worker_extractor
+    from .extractor import ContentExtractor
+    _worker_extractor = ContentExtractor(use_site_profiles=use_site_profiles, probe_images=probe_images)
+
+
+def _parse_in_worker(html: Union[bytes, str], url: str,
+                     encoding: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Executado no worker: parsing puro, sem rede."""
+    return _worker_extractor.parse(html, url, encoding)
+
+
+class ExtractionExecutor:
+    """Runs ContentExtractor.parse in a process pool sized to the machine's cores."""
+
+    def __init__(self, max_workers: Optional[int] = None, use_site_profiles: Optional[bool] = None,
+                 probe_images: bool = False):
+        """
+        Args:
+            max_workers: Number of worker processes (default: os.cpu_count()).
+            use_site_profiles: Forwarded to the workers' ContentExtractor.
+            probe_images: Forwarded to the workers' ContentExtractor; set it
+                when the parent extractor ranks images with an ImageProber.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_site_profiles = use_site_profiles
+        self.probe_images = probe_images
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Creates the pool on first use, so idle cycles don't spawn processes."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.use_site_profiles, self.probe_images),
+            )
+            logger.info(f"Extraction process pool started with {self.max_workers} workers.")
+        return self._pool
+
+    def submit(self, html: Union[bytes, str], url: str, encoding: Optional[str] = None) -> Future:
+        """Schedules the parsing of one page and returns its Future."""
+        return self._get_pool().submit(_parse_in_worker, html, url, encoding)
+
+    def parse(self, html: Union[bytes, str], url: str,
+              encoding: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Parses one page in the pool and waits for the result."""
+        return self.parse_many([(html, url, encoding)])[0]
+
+    def parse_many(self, pages: List[Tuple[Union[bytes, str], ...]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parses several pages in parallel.
+
+        Args:
+            pages: A list of (html, url) or (html, url, encoding) tuples.
+
+        Returns:
+            The results in the same order as `pages` (None for failures).
+        """
+        futures = [self.submit(*page) for page in pages]
+        results: List[Optional[Dict[str, Any]]] = []
+        for page, future in zip(pages, futures):
+            url = page[1]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Extraction worker failed for {url}: {e}")
+                results.append(None)
+        return results
+
+    def shutdown(self) -> None:
+        """Stops the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            logger.info("Extraction process pool stopped.")
@@ -1,16 +1,37 @@
+from __future__ import annotations
+
 import logging
-import trafilatura
-from bs4 import BeautifulSoup
-import requests
-from typing import Dict, Optional, Any, Set
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 from urllib.parse import urljoin, urlparse, parse_qs
+import html as html_lib
 import json
 import re
 
-from .config import USER_AGENT
+from .config import EXTRACTION_CONFIG
+from .http_client import HttpClient, get_http_client
+from .extraction_cache import ExtractionCache, result_key
+from .http_cache import HttpCache
+from .image_probe import ImageProber, rank_by_size
+from .image_variants import ImageVariantIndex, is_resizing_cdn
+from .lazy_import import lazy_import
+from .page_archive import PageArchive
+from .site_profiles import SiteProfile, get_site_profile
+
+if TYPE_CHECKING:
+    from .extraction_pool import ExtractionExecutor
 
 logger = logging.getLogger(__name__)
 
+# Só o caminho genérico usa o trafilatura (~150 ms de import); com perfil de site ele nem carrega
+trafilatura = lazy_import('trafilatura')
+# Parsers e cliente HTTP carregam no primeiro artigo, não no import (orçamento em benchmarks/bench_startup.py)
+bs4 = lazy_import('bs4')
+etree = lazy_import('lxml.etree')
+httpx = lazy_import('httpx')
+
+# Versão da saída de parse(); mude ao alterar a extração para invalidar o cache de resultados
+EXTRACTOR_VERSION = "2026.10.4"
+
 YOUTUBE_DOMAINS = (
     "youtube.com", "www.youtube.com", "m.youtube.com",
     "youtu.be", "www.youtu.be",
@@ -35,6 +56,24 @@ FORBIDDEN_LABELS: Set[str] = {
     "Producer", "Producers", "Cast"
 }
 
+# Uma única alternância pré-compilada: rótulo no início da linha da ficha, com ':' opcional e o valor.
+# Rótulos mais longos primeiro para que "Directors" não seja engolido por "Director".
+_FORBIDDEN_LABEL_RX = re.compile(
+    r"^\s*(" + "|".join(re.escape(lbl) for lbl in sorted(FORBIDDEN_LABELS, key=len, reverse=True)) + r")\b\s*(:)?\s*(.*)",
+    re.I | re.S,
+)
+_FORBIDDEN_LABEL_BITS: Dict[str, int] = {
+    lbl.lower(): 1 << i for i, lbl in enumerate(sorted(FORBIDDEN_LABELS))
+}
+_INFOBOX_CONTAINERS = ("div", "section", "aside", "ul", "ol", "dl", "table", "tbody")
+# Filhos diretos que contam como linhas da ficha ("rótulo: valor")
+_INFOBOX_ROWS = ("li", "dt", "dd", "tr", "p", "div")
+
+# Blocos copiados como estão pelo fast path dos perfis por site
+_PROFILE_BLOCK_TAGS = ("p", "h2", "h3", "h4", "ul", "ol", "blockquote", "table")
+# Mídia que mantém um bloco sem texto
+_PROFILE_MEDIA_TAGS = ("img", "picture", "figure", "iframe")
+
 JUNK_IMAGE_PATTERNS = ("placeholder", "sprite", "icon", "emoji", ".svg")
 
 # Blocos a ignorar (relacionados/sidebars/galerias etc.)
@@ -47,30 +86,37 @@ _BAD_SECTION_RX = re.compile(
 )
 
 
-def _parse_srcset(srcset: str):
-    """Retorna a URL com maior largura declarada em um srcset."""
-    best = None
-    best_w = -1
+def _srcset_entries(srcset: str) -> List[Tuple[str, int]]:
+    """[(url, largura declarada ou 0)] de um atributo srcset."""
+    entries = []
     for part in (srcset or "").split(","):
         part = part.strip()
         if not part:
             continue
         tokens = part.split()
-        url = tokens[0]
         w = 0
         if len(tokens) > 1 and tokens[1].endswith("w"):
             try:
                 w = int(tokens[1][:-1])
             except Exception:
                 w = 0
+        entries.append((tokens[0], w))
+    return entries
+
+
+def _parse_srcset(srcset: str):
+    """Retorna a URL com maior largura declarada em um srcset."""
+    best = None
+    best_w = -1
+    for url, w in _srcset_entries(srcset):
         if w >= best_w:
             best_w = w
             best = url
     return best
 
 
-def is_small(u: str) -> bool:
-    """Heurística para descartar thumbs e imagens irrelevantes."""
+def is_junk_image(u: str) -> bool:
+    """Descarta pelo nome imagens que nunca são de conteúdo (ícones, sprites, placeholders)."""
     if not u:
         return True
     low = u.lower()
@@ -82,6 +128,13 @@ def is_small(u: str) -> bool:
     # posters/avatares genéricos do Collider
     if "colliderimages.com" in low and ("/sharedimages/" in low or "poster" in low):
         return True
+    return False
+
+
+def is_small(u: str) -> bool:
+    """Heurística para descartar thumbs e imagens irrelevantes."""
+    if is_junk_image(u):
+        return True
 
     # thumbs de card (fit=crop 420x300 etc.)
     try:
@@ -114,20 +167,60 @@ def _extract_from_style(style_attr: str) -> Optional[str]:
     return m.group(2) if m else None
 
 
-def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
+_ARTICLE_BODY_SELECTOR = (
+    "[itemprop='articleBody'], .article-body, .article-content, "
+    ".entry-content, .post-content, article .content, article"
+)
+
+# Atributo (privado) onde guardamos o nó raiz já escolhido para um documento.
+_ARTICLE_ROOT_ATTR = "_article_body_root"
+
+
+def _score_nodes(soup: bs4.BeautifulSoup) -> Dict[int, int]:
+    """
+    Calcula, em UMA travessia pós-ordem, quantos <p> + <figure> descendentes
+    cada nó possui. Retorna {id(nó): contagem}.
+    Equivale a len(n.find_all("p")) + len(n.find_all("figure")) para todo nó,
+    mas em tempo linear no tamanho do documento.
+    """
+    Tag = bs4.Tag  # atributo do módulo preguiçoso resolvido uma vez, fora do laço
+    scores: Dict[int, int] = {}
+    stack: list = [(soup, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            total = 0
+            for child in node.contents:
+                if isinstance(child, Tag):
+                    total += scores[id(child)] + (1 if child.name in ("p", "figure") else 0)
+            scores[id(node)] = total
+            continue
+        stack.append((node, True))
+        for child in node.contents:
+            if isinstance(child, Tag):
+                stack.append((child, False))
+    return scores
+
+
+def _find_article_body(soup: bs4.BeautifulSoup) -> bs4.BeautifulSoup:
     """
     Tenta localizar o nó raiz do corpo do artigo.
     - Prefere seletores comuns (article body/content)
     - Evita nós com classes/ids que casem _BAD_SECTION_RX
     - Fallback: nó com mais <p> + <figure>
+    O resultado fica em cache no próprio documento: chamadas seguintes
+    (ex.: _convert_data_img_to_figure e collect_images_from_article) não
+    refazem a busca.
     """
-    candidates = soup.select(
-        "[itemprop='articleBody'], .article-body, .article-content, "
-        ".entry-content, .post-content, article .content, article"
-    )
+    cached = soup.__dict__.get(_ARTICLE_ROOT_ATTR)
+    if cached is not None and not cached.decomposed:
+        return cached
+
+    candidates = soup.select(_ARTICLE_BODY_SELECTOR)
     if not candidates:
         candidates = soup.find_all(True)
 
+    scores = _score_nodes(soup)
     best, best_score = None, -1
     for c in candidates:
         classes = " ".join(c.get("class", [])) + " " + (c.get("id") or "")
@@ -136,13 +229,69 @@ def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
         # Evita wrappers muito genéricos do site
         if c.name in ("header", "footer", "nav", "aside"):
             continue
-        score = len(c.find_all("p")) + len(c.find_all("figure"))
+        score = scores.get(id(c), 0)
         if score > best_score:
             best, best_score = c, score
-    return best or soup
+
+    root = best or soup
+    soup.__dict__[_ARTICLE_ROOT_ATTR] = root
+    return root
 
 
-def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]:
+def _row_label(row: bs4.Tag) -> int:
+    """
+    Bit do rótulo de FORBIDDEN_LABELS que abre a linha `row` seguido de um
+    valor ("Director: James Gunn", <th>Director</th><td>…</td>, <dt>/<dd>),
+    ou 0. Um rótulo sem valor ou o começo de uma frase ("Director James Gunn
+    said…") não contam.
+    """
+    text = row.get_text(" ", strip=True)
+    m = _FORBIDDEN_LABEL_RX.match(text)
+    if not m:
+        return 0
+    label, colon, value = m.groups()
+    if row.name == "dt":
+        dd = row.find_next_sibling()
+        value = dd.get_text(" ", strip=True) if dd is not None and dd.name == "dd" else ""
+    elif not colon:
+        # sem ':' o rótulo precisa ser um elemento próprio (<b>, <strong>, <th>, <span>…)
+        first = row.find(True)
+        if first is None or first.get_text(" ", strip=True).lower() != label.lower():
+            return 0
+    return _FORBIDDEN_LABEL_BITS[label.lower()] if value else 0
+
+
+def _find_infoboxes(soup: bs4.BeautifulSoup) -> list:
+    """
+    Localiza infoboxes técnicas (ficha com "Director", "Cast", ...): um
+    contêiner (div/section/aside/ul/ol/dl/table) cujos filhos diretos do tipo
+    linha (li/dt/tr/p/div) trazem "rótulo: valor" com >= 2 rótulos distintos,
+    e em que essas linhas são pelo menos metade das linhas com texto. Rótulos
+    soltos no meio da prosa não promovem o wrapper do artigo a infobox.
+    Retorna só os mais internos para não remover wrappers do corpo.
+    """
+    Tag = bs4.Tag
+    found: list = []
+    for node in soup.find_all(_INFOBOX_CONTAINERS):
+        mask, labelled, rows = 0, 0, 0
+        for child in node.children:
+            if not isinstance(child, Tag) or child.name not in _INFOBOX_ROWS:
+                continue
+            bit = _row_label(child)
+            if bit:
+                mask |= bit
+                labelled += 1
+                rows += 1
+            elif child.get_text(strip=True):
+                rows += 1
+        if bin(mask).count("1") >= 2 and labelled * 2 >= rows:
+            found.append(node)
+    # só os mais internos: descarta quem contém outra infobox
+    ancestors = {id(parent) for box in found for parent in box.parents}
+    return [box for box in found if id(box) not in ancestors]
+
+
+def collect_images_from_article(soup: bs4.BeautifulSoup, base_url: str, size_filter: bool = True) -> list[str]:
     """
     Coleta URLs de imagens relevantes SOMENTE DO CORPO DO ARTIGO.
     Fontes consideradas:
@@ -151,20 +300,36 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
       - nós com atributos data-*
       - estilos inline: background-image
       - <figure> contendo <img>
-    Aplica filtros de junk/thumb e prioriza CDNs conhecidas.
+    Aplica filtros de junk/thumb e prioriza CDNs conhecidas. Com
+    size_filter=False só o filtro de junk é aplicado: o tamanho real é
+    verificado depois pelo ImageProber.
     """
     root = _find_article_body(soup)
     urls: list[str] = []
+    widths: Dict[str, int] = {}
 
-    def _push(candidate: Optional[str]) -> None:
+    def _push(candidate: Optional[str], width: int = 0) -> None:
         if not candidate:
             return
         abs_u = _abs(candidate, base_url)
         if not abs_u:
             return
-        if is_small(abs_u):
+        if is_small(abs_u) if size_filter else is_junk_image(abs_u):
             return
-        urls.append(abs_u.rstrip("/"))
+        abs_u = abs_u.rstrip("/")
+        urls.append(abs_u)
+        if width:
+            widths[abs_u] = width
+
+    def _push_srcset(srcset: str, fallback: bool = True) -> None:
+        # CDNs de redimensionamento: todas as variantes (o índice canônico
+        # escolhe a melhor por asset); demais hosts: só a maior, se faltar candidata
+        entries = _srcset_entries(srcset)
+        variants = [(u, w) for u, w in entries if is_resizing_cdn(urlparse(_abs(u, base_url) or "").netloc)]
+        for u, w in variants:
+            _push(u, w)
+        if fallback and not variants:
+            _push(_parse_srcset(srcset))
 
     # 1) <img> tags
     for img in root.find_all("img"):
@@ -173,18 +338,18 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
             if img.get(attr):
                 cand = img.get(attr)
                 break
-        if not cand and img.get("srcset"):
-            cand = _parse_srcset(img.get("srcset"))
         _push(cand)
+        if img.get("srcset"):
+            _push_srcset(img.get("srcset"), fallback=not cand)
 
     # 2) <picture><source>
     for source in root.select("picture source[srcset]"):
-        _push(_parse_srcset(source.get("srcset", "")))
+        _push_srcset(source.get("srcset", ""))
 
     # 2.5) <noscript> com <img> (fallback de lazy-load)
     for ns in root.find_all("noscript"):
         try:
-            inner = BeautifulSoup(ns.string or "", "html.parser")
+            inner = bs4.BeautifulSoup(ns.string or "", "html.parser")
         except Exception:
             continue
         for img in inner.find_all("img"):
@@ -206,34 +371,197 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
             if img.get("src"):
                 _push(img.get("src"))
             elif img.get("srcset"):
-                _push(_parse_srcset(img.get("srcset", "")))
+                _push_srcset(img.get("srcset", ""))
 
-    # de-dup preservando preferência das CDNs
-    dedup: dict[str, int] = {}
+    return _order_images(urls, widths)
+
+
+def _order_images(urls: list[str], widths: Optional[Dict[str, int]] = None) -> list[str]:
+    """
+    De-dup por asset (variantes de CDN viram uma só, a melhor para a
+    largura alvo) preservando preferência das CDNs conhecidas.
+    """
+    index = ImageVariantIndex(EXTRACTION_CONFIG.get('image_target_width', 1600))
     for u in urls:
+        index.add(u, (widths or {}).get(u))
+    dedup: dict[str, int] = {}
+    for u in index.urls():
         host = urlparse(u).netloc
-        pref = 0 if host in PRIORITY_CDN_DOMAINS else 1
-        dedup[u] = min(dedup.get(u, pref), pref)
+        dedup[u] = 0 if host in PRIORITY_CDN_DOMAINS else 1
     ordered = sorted(dedup.items(), key=lambda kv: (kv[1], kv[0]))
     return [u for u, _ in ordered]
 
 
+_JSON_LD_ARTICLE_TYPES = {"NewsArticle", "Article", "ReportageNewsArticle", "BlogPosting", "AnalysisNewsArticle"}
+
+
+def _json_ld_images(value: Any, base_url: str) -> List[str]:
+    """URLs de um campo 'image' do JSON-LD (string, ImageObject ou lista deles)."""
+    items = value if isinstance(value, list) else [value]
+    urls = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("url") or item.get("contentUrl")
+        if isinstance(item, str) and item.strip():
+            url = urljoin(base_url, item.strip())
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+def _parse_json_ld(soup: bs4.BeautifulSoup, base_url: str) -> Dict[str, Any]:
+    """
+    Lê os blocos JSON-LD uma vez e devolve os metadados do primeiro objeto
+    de artigo: title, excerpt, published_date e images (só as chaves
+    encontradas). Blocos inválidos são ignorados.
+    """
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except (json.JSONDecodeError, TypeError):
+            continue
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get("@graph"), list):
+                items.extend(item["@graph"])
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            types = item.get("@type")
+            types = set(types) if isinstance(types, list) else {types}
+            if not types & _JSON_LD_ARTICLE_TYPES:
+                continue
+            meta: Dict[str, Any] = {}
+            if isinstance(item.get("headline"), str) and item["headline"].strip():
+                meta["title"] = html_lib.unescape(item["headline"]).strip()
+            if isinstance(item.get("description"), str) and item["description"].strip():
+                meta["excerpt"] = html_lib.unescape(item["description"]).strip()
+            if isinstance(item.get("datePublished"), str) and item["datePublished"].strip():
+                meta["published_date"] = item["datePublished"].strip()
+            if images := _json_ld_images(item.get("image"), base_url):
+                meta["images"] = images
+            return meta
+    return {}
+
+
+def _charset(content_type: Optional[str]) -> Optional[str]:
+    """Charset declarado num Content-Type (ex.: 'text/html; charset=UTF-8' -> 'utf-8')."""
+    m = re.search(r'charset=["\']?([\w.:-]+)', content_type or "", re.I)
+    return m.group(1).lower() if m else None
+
+
 class ContentExtractor:
     """Extrai e limpa conteúdo para o pipeline."""
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': USER_AGENT})
-
-    def _fetch_html(self, url: str) -> Optional[str]:
+    def __init__(self, use_site_profiles: Optional[bool] = None,
+                 executor: Optional["ExtractionExecutor"] = None,
+                 http_cache: Optional[HttpCache] = None,
+                 http_client: Optional[HttpClient] = None,
+                 page_archive: Optional[PageArchive] = None,
+                 result_cache: Optional[ExtractionCache] = None,
+                 image_prober: Optional[ImageProber] = None,
+                 probe_images: Optional[bool] = None):
+        """
+        Args:
+            image_prober: Quando presente, as imagens do artigo são filtradas e
+                ordenadas pelo tamanho real (ImageProber) em vez da heurística de URL.
+            probe_images: Força o modo de coleta sem filtro de tamanho (usado
+                pelos workers do pool, que não fazem rede); padrão: image_prober is not None.
+        """
+        self.executor = executor
+        self.image_prober = image_prober
+        self.probe_images = image_prober is not None if probe_images is None else probe_images
+        self.image_min_width = EXTRACTION_CONFIG.get('image_min_width', 500)
+        self.image_min_height = EXTRACTION_CONFIG.get('image_min_height', 250)
+        self.http_cache = http_cache
+        self.page_archive = page_archive
+        self.result_cache = result_cache
+        self._http = http_client
+        if use_site_profiles is None:
+            use_site_profiles = EXTRACTION_CONFIG.get('site_profiles', True)
+        self.use_site_profiles = use_site_profiles
+        self.use_structured_data = EXTRACTION_CONFIG.get('structured_data', True)
+        self.max_html_bytes = EXTRACTION_CONFIG.get('max_html_kb', 3072) * 1024
+        self.stream_early_stop = EXTRACTION_CONFIG.get('stream_early_stop', True)
+
+    @property
+    def http(self) -> HttpClient:
+        """Cliente HTTP; o compartilhado só é criado no primeiro download (os workers do pool não baixam nada)."""
+        if self._http is None:
+            self._http = get_http_client()
+        return self._http
+
+    def _fetch_page(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        Baixa a página em streaming; devolve (bytes crus, charset declarado
+        no Content-Type ou None), sem decodificar o texto aqui.
+        Com cache HTTP: entradas frescas não vão à rede e as demais são
+        revalidadas com request condicional (304 reaproveita o corpo salvo).
+        """
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached and cached["fresh"]:
+            logger.info(f"Serving {url} from HTTP cache.")
+            return cached["body"], _charset(cached["content_type"])
         try:
-            resp = self.session.get(url, timeout=20.0, allow_redirects=True)
-            resp.raise_for_status()
-            return resp.text
-        except requests.RequestException as e:
+            headers = self.http_cache.conditional_headers(cached) if self.http_cache else {}
+            with self.http.stream('GET', url, headers=headers) as resp:
+                if resp.status_code == 304 and cached:
+                    logger.info(f"{url} not modified; using HTTP cache.")
+                    self.http_cache.mark_revalidated(url)
+                    return cached["body"], _charset(cached["content_type"])
+                resp.raise_for_status()
+                encoding = resp.charset_encoding
+                profile = get_site_profile(url) if self.use_site_profiles else None
+                body, complete = self._read_bounded(resp.iter_bytes(), url, encoding, profile)
+            if self.http_cache:
+                self.http_cache.put(url, body, resp.headers, partial=not complete)
+            # o arquivo serve para reprocessar a página inteira: corpo cortado no fim do artigo não entra
+            if self.page_archive and complete:
+                self.page_archive.put(url, body)
+            return body, encoding
+        except httpx.HTTPError as e:
             logger.error(f"Failed to fetch HTML from {url}: {e}")
             return None
 
-    def _pre_clean_html(self, soup: BeautifulSoup):
+    def _read_bounded(self, chunks: Iterable[bytes], url: str, encoding: Optional[str],
+                      profile: Optional[SiteProfile]) -> Tuple[bytes, bool]:
+        """
+        Lê o corpo da resposta até o limite de bytes. Com perfil de site, os
+        chunks também alimentam um HTMLPullParser do lxml e a leitura para
+        assim que o container do artigo fecha (depois dele só vem
+        sidebar/relacionados/rodapé, que a extração descarta de qualquer forma).
+        Retorna (corpo, completo): completo é False se a leitura parou antes do fim.
+        """
+        max_bytes = self.max_html_bytes
+        parser = None
+        if self.stream_early_stop and profile and profile.body_markers:
+            parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        body_root, paragraphs = None, 0
+        data, size = [], 0
+        for chunk in chunks:
+            data.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                logger.warning(f"{url} exceeds {max_bytes // 1024} KB; truncating download.")
+                return b"".join(data)[:max_bytes], False
+            if parser is None:
+                continue
+            parser.feed(chunk)
+            for event, el in parser.read_events():
+                if body_root is None:
+                    if event == "start" and profile.is_body_root(el.attrib):
+                        body_root = el
+                elif event == "end" and el.tag == "p":
+                    paragraphs += 1
+                elif event == "end" and el is body_root:
+                    # markup quebrado pode fechar o container cedo demais: só
+                    # para se o corpo já tiver parágrafos suficientes
+                    if paragraphs >= profile.min_paragraphs:
+                        logger.debug(f"Article body of {url} closed at {size} bytes; stopping download.")
+                        return b"".join(data), False
+                    body_root, paragraphs = None, 0
+        return b"".join(data), True
+
+    def _pre_clean_html(self, soup: bs4.BeautifulSoup):
         """Remove widgets/ads/blocos óbvios ANTES da extração."""
         selectors_to_remove = [
             # metadados/ratings
@@ -270,7 +598,7 @@ class ContentExtractor:
 
         logger.info("Pre-cleaned HTML, removing unwanted widgets and blocks.")
 
-    def _remove_forbidden_blocks(self, soup: BeautifulSoup) -> None:
+    def _remove_forbidden_blocks(self, soup: bs4.BeautifulSoup) -> None:
         """Remove infobox técnica e mensagens indesejadas do html extraído."""
         for t in soup.find_all(string=True):
             s = (t or "").strip()
@@ -280,14 +608,7 @@ class ContentExtractor:
                 except Exception:
                     pass
 
-        candidates = []
-        for tag in soup.find_all(["div", "section", "aside", "ul", "ol"]):
-            text = " ".join(tag.get_text(separator="\n").split())
-            lbl_count = sum(1 for lbl in FORBIDDEN_LABELS
-                            if re.search(rf"(^|\n)\s*{re.escape(lbl)}\s*(\n|:|$)", text, flags=re.I))
-            if lbl_count >= 2:
-                candidates.append(tag)
-        for c in candidates:
+        for c in _find_infoboxes(soup):
             try:
                 c.decompose()
             except Exception:
@@ -303,7 +624,7 @@ class ContentExtractor:
                 except Exception:
                     pass
 
-    def _convert_data_img_to_figure(self, soup: BeautifulSoup):
+    def _convert_data_img_to_figure(self, soup: bs4.BeautifulSoup):
         """
         Converte divs com 'data-img-url' em <figure><img>.
         Faz APENAS dentro do corpo do artigo para não pegar sidebar.
@@ -330,8 +651,18 @@ class ContentExtractor:
         if converted:
             logger.info(f"Converted {converted} 'data-img-url' divs to <figure> tags.")
 
-    def _extract_featured_image(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
-        """Extrai imagem destacada (og/twitter/json-ld/primeira <img> de article)."""
+    def _extract_featured_image(self, soup: bs4.BeautifulSoup, base_url: str,
+                                structured: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Extrai imagem destacada (json-ld/og/twitter/primeira <img> de article).
+        `structured` é o resultado de _parse_json_ld; sem ele o JSON-LD é lido aqui.
+        """
+        if structured is None:
+            structured = _parse_json_ld(soup, base_url)
+        if structured.get("images"):
+            logger.info("Found featured image via JSON-LD.")
+            return structured["images"][0]
+
         if og := soup.find('meta', property='og:image'):
             if og.get('content'):
                 logger.info("Found featured image via 'og:image'.")
@@ -342,27 +673,6 @@ class ContentExtractor:
                 logger.info("Found featured image via 'twitter:image'.")
                 return urljoin(base_url, tw['content'])
 
-        for script in soup.find_all('script', type='application/ld+json'):
-            try:
-                if not script.string:
-                    continue
-                data = json.loads(script.string)
-                candidates = data if isinstance(data, list) else [data]
-                for item in candidates:
-                    if not isinstance(item, dict):
-                        continue
-                    if item.get('@type') in ('NewsArticle', 'Article') and 'image' in item:
-                        image_info = item['image']
-                        if isinstance(image_info, dict) and image_info.get('url'):
-                            return urljoin(base_url, image_info['url'])
-                        if isinstance(image_info, list) and image_info:
-                            first = image_info[0]
-                            return urljoin(base_url, first.get('url') if isinstance(first, dict) else first)
-                        if isinstance(image_info, str):
-                            return urljoin(base_url, image_info)
-            except (json.JSONDecodeError, TypeError, AttributeError):
-                continue
-
         if article_tag := soup.find('article'):
             first_img = article_tag.find('img')
             if first_img and first_img.get('src'):
@@ -390,7 +700,7 @@ class ContentExtractor:
             logger.warning(f"Could not parse YouTube ID from src: {src}")
         return None
 
-    def _extract_youtube_videos(self, soup: BeautifulSoup) -> list[dict]:
+    def _extract_youtube_videos(self, soup: bs4.BeautifulSoup) -> list[dict]:
         ids = []
         for iframe in soup.find_all("iframe"):
             vid = self._extract_youtube_id(iframe.get("src", ""))
@@ -410,70 +720,283 @@ class ContentExtractor:
         return [{"id": v, "embed_url": f"https://www.youtube.com/embed/{v}",
                  "watch_url": f"https://www.youtube.com/watch?v={v}"} for v in ordered]
 
+    def _image_from_block(self, block: bs4.Tag, base_url: str) -> Optional[str]:
+        """URL da imagem de um bloco de imagem (data-img-url, <img> ou srcset)."""
+        cand = block.get("data-img-url")
+        img = block if block.name == "img" else block.find("img")
+        if not cand and img is not None:
+            for attr in ("data-img-url", "src", "data-src", "data-original", "data-lazy-src"):
+                if img.get(attr):
+                    cand = img.get(attr)
+                    break
+            if not cand and img.get("srcset"):
+                cand = _parse_srcset(img.get("srcset"))
+        if not cand:
+            source = block.find("source", srcset=True)
+            if source is not None:
+                cand = _parse_srcset(source.get("srcset", ""))
+        abs_u = _abs(cand, base_url) if cand else None
+        if not abs_u or is_small(abs_u):
+            return None
+        return abs_u.rstrip("/")
+
+    def _extract_with_profile(self, soup: bs4.BeautifulSoup, base_url: str,
+                              profile: SiteProfile) -> Optional[Dict[str, Any]]:
+        """
+        Fast path: monta content/images/videos direto do corpo usando os
+        seletores do perfil, sem trafilatura. Retorna None se o corpo não for
+        encontrado ou não passar nos checks de qualidade do perfil.
+        """
+        body = profile.body.select_one(soup)
+        if body is None:
+            return None
+
+        junk = {id(el) for el in profile.junk.select(body)}
+        blocks: list[str] = []
+        images: list[str] = []
+        video_ids: list[str] = []
+        counts = {"p": 0, "chars": 0}
+
+        Tag = bs4.Tag
+
+        def walk(node: bs4.Tag) -> None:
+            for child in node.children:
+                if not isinstance(child, Tag) or id(child) in junk:
+                    continue
+                if profile.embeds.match(child):
+                    vid = child.get("data-youtube-id") or (
+                        self._extract_youtube_id(child.get("src", "")) if child.name == "iframe" else child.get("id")
+                    )
+                    if vid:
+                        video_ids.append(vid)
+                    continue
+                if profile.images.match(child):
+                    img_url = self._image_from_block(child, base_url)
+                    if img_url:
+                        images.append(img_url)
+                        cap_el = profile.captions.select_one(child)
+                        if cap_el is None and child.parent is not body:
+                            cap_el = profile.captions.select_one(child.parent)
+                        caption = cap_el.get_text(strip=True) if cap_el else ""
+                        alt = f' alt="{html_lib.escape(caption)}"' if caption else ""
+                        cap = f"<figcaption>{html_lib.escape(caption)}</figcaption>" if caption else ""
+                        blocks.append(f'<figure><img src="{html_lib.escape(img_url)}"{alt}/>{cap}</figure>')
+                    continue
+                if child.name in _PROFILE_BLOCK_TAGS:
+                    text = child.get_text(strip=True)
+                    if not text:
+                        # <p> que só embrulha imagem/vídeo: desce para os blocos de mídia, como no caminho genérico
+                        if child.find(_PROFILE_MEDIA_TAGS) is not None:
+                            walk(child)
+                        continue
+                    if child.name == "p":
+                        counts["p"] += 1
+                    counts["chars"] += len(text)
+                    blocks.append(str(child))
+                    continue
+                walk(child)
+
+        walk(body)
+
+        if not profile.passes_quality(counts["p"], counts["chars"]):
+            logger.info(
+                f"Site profile '{profile.name}' rejected {base_url} "
+                f"({counts['p']} paragraphs, {counts['chars']} chars); using generic path."
+            )
+            return None
+
+        seen, videos = set(), []
+        for v in video_ids:
+            if v not in seen:
+                seen.add(v)
+                videos.append({"id": v, "embed_url": f"https://www.youtube.com/embed/{v}",
+                               "watch_url": f"https://www.youtube.com/watch?v={v}"})
+
+        return {"content": "".join(blocks), "images": _order_images(images), "videos": videos}
+
     def extract(self, url: str) -> Optional[Dict[str, Any]]:
         """Fluxo principal: busca, limpa, extrai conteúdo + imagens/vídeos."""
-        html = self._fetch_html(url)
+        page = self._fetch_page(url)
+        if not page:
+            return None
+        html, encoding = page
+        return self._parse_pages([(html, url, encoding)])[0]
+
+    def extract_archived(self, url: str) -> Optional[Dict[str, Any]]:
+        """Reprocessa a última cópia arquivada da página, sem ir à rede."""
+        html = self.page_archive.get(url) if self.page_archive else None
         if not html:
+            logger.warning(f"No archived copy of {url}.")
             return None
+        return self._parse_pages([(html, url, None)])[0]
 
+    def extract_many(self, urls: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Extrai vários artigos: o download acontece aqui (processo pai) e o
+        parsing, que é CPU pura, vai para o pool de processos se houver um.
+        Retorna {url: resultado ou None}.
+        """
+        pages = []
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        # downloads concorrentes reaproveitando o pool de conexões compartilhado
+        for url, page in zip(urls, self.http.map(self._fetch_page, urls)):
+            if page:
+                html, encoding = page
+                pages.append((html, url, encoding))
+            else:
+                results[url] = None
+        for (_, url, _), result in zip(pages, self._parse_pages(pages)):
+            results[url] = result
+        return results
+
+    def _parse_pages(self, pages: List[Tuple[Union[bytes, str], str, Optional[str]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Faz o parsing de [(html, url, encoding)] na ordem recebida. Com cache
+        de resultados, páginas com os mesmos bytes não são parseadas de novo;
+        o restante vai para o pool de processos, se houver.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(pages)
+        pending, keys = [], {}
+        version = (f"{EXTRACTOR_VERSION}:{int(bool(self.use_site_profiles))}"
+                   f"{int(bool(self.use_structured_data))}{int(bool(self.probe_images))}")
+        for i, (html, url, encoding) in enumerate(pages):
+            if self.result_cache is not None:
+                keys[i] = result_key(html, url, encoding, version)
+                if (cached := self.result_cache.get(keys[i])) is not None:
+                    logger.info(f"Extraction result for {url} served from cache.")
+                    results[i] = cached
+                    continue
+            pending.append(i)
+        if pending:
+            batch = [pages[i] for i in pending]
+            if self.executor is not None:
+                parsed = self.executor.parse_many(batch)
+            else:
+                parsed = [self.parse(*page) for page in batch]
+            for i, result in zip(pending, parsed):
+                results[i] = result
+                if result is not None and i in keys:
+                    self.result_cache.put(keys[i], pages[i][1], result)
+        if self.image_prober is not None:
+            self._rank_images(results)
+        return results
+
+    def _rank_images(self, results: List[Optional[Dict[str, Any]]]) -> None:
+        """
+        Sonda de uma vez (concorrente) as imagens de todos os resultados e
+        troca cada lista pelas imagens grandes o bastante, maiores primeiro.
+        Imagens que não puderam ser sondadas caem na heurística de URL.
+        """
+        with_images = [r for r in results if r and r.get("images")]
+        if not with_images:
+            return
+        probes = self.image_prober.probe_many(u for r in with_images for u in r["images"])
+        for r in with_images:
+            ranked = rank_by_size(r["images"], probes, self.image_min_width, self.image_min_height)
+            kept = [u for u in ranked if probes.get(u) is not None or not is_small(u)]
+            logger.info(f"Image probes kept {len(kept)} of {len(r['images'])} images for {r.get('source_url')}.")
+            r["images"] = kept
+
+    def parse(self, html: Union[bytes, str], url: str,
+              encoding: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Limpa e extrai conteúdo + imagens/vídeos de um HTML já baixado.
+        `encoding` (charset do Content-Type) vai direto para o parser e evita
+        a detecção de encoding sobre os bytes.
+        """
         try:
-            soup = BeautifulSoup(html, 'lxml')
+            if isinstance(html, bytes) and encoding:
+                soup = bs4.BeautifulSoup(html, 'lxml', from_encoding=encoding)
+            else:
+                soup = bs4.BeautifulSoup(html, 'lxml')
+
+            # 0) dados estruturados primeiro: um único parse do JSON-LD
+            structured = _parse_json_ld(soup, url) if self.use_structured_data else {}
 
             # 1) limpeza prévia pesada
             self._pre_clean_html(soup)
 
-            # 2) normaliza data-img-url -> <figure>
-            self._convert_data_img_to_figure(soup)
-
-            # 3) imagens do HTML limpo (somente corpo)
-            pre_images = collect_images_from_article(soup, base_url=url)
-
-            # 4) destacada
-            featured_image_url = self._extract_featured_image(soup, url)
-
-            # 5) vídeos
-            videos = self._extract_youtube_videos(soup)
-
-            # 6) metadados
-            title = soup.title.string if soup.title else 'No Title Found'
-            if og_title := soup.find('meta', property='og:title'):
-                if og_title.get('content'):
-                    title = og_title['content']
-            excerpt = ''
-            if meta_desc := soup.find('meta', attrs={'name': 'description'}):
-                excerpt = meta_desc.get('content') or ''
-            elif og_desc := soup.find('meta', property='og:description'):
-                excerpt = og_desc.get('content') or ''
-
-            # 7) extrair corpo com trafilatura
-            cleaned_html_str = str(soup)
-            content_html = trafilatura.extract(
-                cleaned_html_str,
-                include_images=True,
-                include_links=True,
-                include_comments=False,
-                include_tables=False,
-                output_format='html'
-            )
+            # 1.1) fast path: perfil do site monta corpo/imagens/vídeos sem trafilatura
+            profile_result = None
+            if self.use_site_profiles and (profile := get_site_profile(url)):
+                profile_result = self._extract_with_profile(soup, url, profile)
+
+            if profile_result:
+                featured_image_url = self._extract_featured_image(soup, url, structured)
+                videos = profile_result["videos"]
+            else:
+                # 2) normaliza data-img-url -> <figure>
+                self._convert_data_img_to_figure(soup)
+
+                # 3) imagens do HTML limpo (somente corpo)
+                pre_images = collect_images_from_article(soup, base_url=url, size_filter=not self.probe_images)
+
+                # 4) destacada
+                featured_image_url = self._extract_featured_image(soup, url, structured)
+
+                # 5) vídeos
+                videos = self._extract_youtube_videos(soup)
+
+            # 6) metadados: JSON-LD; o DOM só é consultado para o que faltar
+            title = structured.get("title")
+            if not title:
+                title = soup.title.string if soup.title else 'No Title Found'
+                if og_title := soup.find('meta', property='og:title'):
+                    if og_title.get('content'):
+                        title = og_title['content']
+            excerpt = structured.get("excerpt")
+            if excerpt is None:
+                excerpt = ''
+                if meta_desc := soup.find('meta', attrs={'name': 'description'}):
+                    excerpt = meta_desc.get('content') or ''
+                elif og_desc := soup.find('meta', property='og:description'):
+                    excerpt = og_desc.get('content') or ''
+            published_date = structured.get("published_date")
+            if not published_date:
+                if pub := soup.find('meta', property='article:published_time'):
+                    published_date = pub.get('content') or None
+
+            # 7) extrair corpo com trafilatura (ou usar o do perfil)
+            if profile_result:
+                content_html = profile_result["content"]
+            else:
+                cleaned_html_str = str(soup)
+                content_html = trafilatura.extract(
+                    cleaned_html_str,
+                    include_images=True,
+                    include_links=True,
+                    include_comments=False,
+                    include_tables=False,
+                    output_format='html'
+                )
             if not content_html:
                 logger.warning(f"Trafilatura returned empty content for {url}")
                 return None
 
             # 8) pós-processar corpo
-            article_soup = BeautifulSoup(content_html, 'lxml')
+            article_soup = bs4.BeautifulSoup(content_html, 'lxml')
             self._remove_forbidden_blocks(article_soup)
 
-            # 9) imagens pós-trafilatura (ainda restritas ao corpo retornado)
-            post_images = collect_images_from_article(article_soup, base_url=url)
+            if profile_result:
+                all_image_urls = profile_result["images"]
+                logger.info(f"Collected {len(all_image_urls)} images from article via site profile.")
+            else:
+                # 9) imagens pós-trafilatura (ainda restritas ao corpo retornado)
+                post_images = collect_images_from_article(article_soup, base_url=url,
+                                                          size_filter=not self.probe_images)
+
+                # 10) merge dedup
+                seen, all_image_urls = set(), []
+                for u in pre_images + post_images:
+                    if u not in seen:
+                        seen.add(u)
+                        all_image_urls.append(u)
 
-            # 10) merge dedup
-            seen, all_image_urls = set(), []
-            for u in pre_images + post_images:
-                if u not in seen:
-                    seen.add(u)
-                    all_image_urls.append(u)
+                logger.info(f"Collected {len(all_image_urls)} images from article (pre+post).")
 
-            logger.info(f"Collected {len(all_image_urls)} images from article (pre+post).")
+            if not all_image_urls and structured.get("images"):
+                all_image_urls = list(structured["images"])
+                logger.info(f"No images in article body; using {len(all_image_urls)} from JSON-LD.")
 
             # Conteúdo final: só o conteúdo interno do <body>, se existir
             if article_soup.body:
@@ -485,6 +1008,7 @@ class ContentExtractor:
                 "title": title.strip(),
                 "content": final_content_html,
                 "excerpt": (excerpt or "").strip(),
+                "published_date": published_date,
                 "featured_image_url": featured_image_url,
                 "images": all_image_urls,
                 "videos": videos,
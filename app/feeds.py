@@ -8,10 +8,14 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from urllib.parse import urlparse
 
-import feedparser
-import requests
 from dateutil import parser as date_parser
 
+from .http_client import get_http_client
+from .lazy_import import lazy_import
+
+feedparser = lazy_import('feedparser')
+httpx = lazy_import('httpx')
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,8 +24,7 @@ class FeedReader:
     
     def __init__(self, user_agent: str):
         self.user_agent = user_agent
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': user_agent})
+        self.http = get_http_client()
         
     def normalize_item(self, entry: Any, source_id: str) -> Dict[str, Any]:
         """Normalize a feed entry to a standard format"""
@@ -75,8 +78,8 @@ class FeedReader:
         try:
             logger.debug(f"Reading feed: {url}")
             
-            # Use requests session for better control
-            response = self.session.get(url, timeout=15)
+            # Cliente HTTP compartilhado (pool de conexões, retries)
+            response = self.http.get(url, headers={'User-Agent': self.user_agent}, timeout=15)
             response.raise_for_status()
             
             # Parse feed
@@ -94,7 +97,7 @@ class FeedReader:
             logger.info(f"Read {len(items)} items from {url}")
             return items
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Network error reading feed {url}: {str(e)}")
             return []
         except Exception as e:
@@ -0,0 +1,245 @@
+"""
+Per-key Gemini client over the shared HTTP pool.
+
+google.generativeai keeps the API key in process-global state
+(genai.configure), so one process could only talk to Gemini with one key
+at a time. GeminiClient calls the generateContent REST endpoint directly:
+each instance carries its own key, any number of them can send requests
+concurrently, and they all reuse the keep-alive connections of the shared
+HttpClient (and accept a MockTransport in tests).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import AI_REWRITE_CONFIG
+from .exceptions import AIProcessorError
+from .http_client import HttpClient, get_http_client
+from .lazy_import import lazy_import
+
+httpx = lazy_import('httpx')
+
+logger = logging.getLogger(__name__)
+
+# "retryDelay": "17s" no detalhe google.rpc.RetryInfo das respostas 429
+_RETRY_DELAY_RX = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+
+class GeminiError(AIProcessorError):
+    """A failed Gemini call, with the HTTP status and the server's retry delay when given."""
+
+    def __init__(self, message: str, code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+
+class GeminiResponse:
+    """Text and token usage of one generation."""
+
+    def __init__(self, text: str, usage: Optional[Dict[str, int]] = None,
+                 finish_reason: Optional[str] = None, model: Optional[str] = None):
+        self.text = text
+        self.usage = usage or {}
+        self.finish_reason = finish_reason
+        self.model = model
+
+
+def _error_from_response(response: httpx.Response) -> GeminiError:
+    """Builds a GeminiError from an error body ({"error": {"code", "message", "details"}})."""
+    retry_after = None
+    try:
+        error = response.json().get('error', {})
+    except ValueError:
+        error = {}
+    message = error.get('message') or response.text[:300] or f"HTTP {response.status_code}"
+    for detail in error.get('details') or []:
+        match = _RETRY_DELAY_RX.match(str(detail.get('retryDelay', '')))
+        if match:
+            retry_after = float(match.group(1))
+    if retry_after is None and response.headers.get('retry-after', '').isdigit():
+        retry_after = float(response.headers['retry-after'])
+    status = error.get('status')
+    return GeminiError(f"{response.status_code} {status + ': ' if status else ''}{message}",
+                       code=response.status_code, retry_after=retry_after)
+
+
+def _expiry(data: Dict[str, Any], ttl_seconds: int) -> float:
+    """Expiry of a cachedContents resource (its expireTime, else now + ttl)."""
+    expire_time = data.get('expireTime')
+    if expire_time:
+        try:
+            # "2026-10-18T12:00:00.123456Z": frações de segundo variam de tamanho
+            stamp = re.sub(r"\.\d+", "", expire_time).replace('Z', '+00:00')
+            return datetime.fromisoformat(stamp).timestamp()
+        except ValueError:
+            pass
+    return time.time() + ttl_seconds
+
+
+class GeminiClient:
+    """generateContent calls for one API key and one model."""
+
+    def __init__(self, api_key: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                 http_client: Optional[HttpClient] = None, base_url: Optional[str] = None):
+        """
+        Args:
+            api_key: The Gemini API key used by this client.
+            model: Model name (e.g. 'gemini-1.5-flash-latest').
+            generation_config: generationConfig sent with every request (camelCase keys).
+            http_client: Client used for the calls (default: the shared one).
+            base_url: API root (default AI_REWRITE_CONFIG['api_url']).
+        """
+        self.api_key = api_key
+        self.model = model
+        self.generation_config = generation_config or {}
+        self.http = http_client or get_http_client()
+        self.base_url = (base_url or AI_REWRITE_CONFIG['api_url']).rstrip('/')
+
+    def _url(self, method: str) -> str:
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def _call(self, method: str, url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Sends one API request and returns the decoded JSON body."""
+        try:
+            response = self.http.request(
+                method,
+                url,
+                json=body,
+                headers={'x-goog-api-key': self.api_key},
+                timeout=AI_REWRITE_CONFIG['timeout_seconds'],
+            )
+        except httpx.HTTPError as e:
+            raise GeminiError(f"Request to Gemini failed: {e}") from e
+        if response.status_code >= 400:
+            raise _error_from_response(response)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise GeminiError(f"Invalid JSON from Gemini: {e}", code=response.status_code) from e
+
+    def create_cached_content(self, text: str, ttl_seconds: int) -> Tuple[str, float]:
+        """
+        Stores `text` as provider-side cached content for this key and model.
+
+        Returns:
+            The cache name ('cachedContents/...') and its expiry (epoch seconds).
+
+        Raises:
+            GeminiError: If caching is not available (model, minimum size, plan).
+        """
+        data = self._call('POST', f"{self.base_url}/cachedContents", {
+            'model': f"models/{self.model}",
+            'contents': [{'role': 'user', 'parts': [{'text': text}]}],
+            'ttl': f"{ttl_seconds}s",
+        })
+        return data['name'], _expiry(data, ttl_seconds)
+
+    def refresh_cached_content(self, name: str, ttl_seconds: int) -> float:
+        """Extends the TTL of a cached content; returns the new expiry."""
+        data = self._call('PATCH', f"{self.base_url}/{name}?updateMask=ttl", {'ttl': f"{ttl_seconds}s"})
+        return _expiry(data, ttl_seconds)
+
+    def _generate_body(self, prompt: str, cached_content: Optional[str],
+                       max_output_tokens: Optional[int]) -> Dict[str, Any]:
+        generation_config = self.generation_config
+        if max_output_tokens:
+            generation_config = {**generation_config, 'maxOutputTokens': max_output_tokens}
+        body = {
+            'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+            'generationConfig': generation_config,
+        }
+        if cached_content:
+            body['cachedContent'] = cached_content
+        return body
+
+    def generate_content(self, prompt: str, cached_content: Optional[str] = None,
+                         max_output_tokens: Optional[int] = None) -> GeminiResponse:
+        """
+        Sends one prompt and returns the generated text. With `cached_content`
+        the prompt is appended to that cached prefix; `max_output_tokens`
+        overrides the client's generation config for this call.
+
+        Raises:
+            GeminiError: On HTTP errors, transport failures or a response without text.
+        """
+        data = self._call('POST', self._url('generateContent'),
+                          self._generate_body(prompt, cached_content, max_output_tokens))
+        candidates = data.get('candidates') or []
+        if not candidates:
+            reason = (data.get('promptFeedback') or {}).get('blockReason', 'no candidates')
+            raise GeminiError(f"Gemini returned no content ({reason})", code=200)
+        candidate = candidates[0]
+        text = "".join(part.get('text', '') for part in (candidate.get('content') or {}).get('parts', []))
+        if not text:
+            raise GeminiError(f"Gemini returned an empty candidate ({candidate.get('finishReason')})", code=200)
+        return GeminiResponse(
+            text,
+            usage=data.get('usageMetadata'),
+            finish_reason=candidate.get('finishReason'),
+            model=data.get('modelVersion', self.model),
+        )
+
+    def stream_generate_content(self, prompt: str, cached_content: Optional[str] = None,
+                                on_text: Optional[Callable[[str], None]] = None,
+                                max_output_tokens: Optional[int] = None) -> GeminiResponse:
+        """
+        Like generate_content, over streamGenerateContent (server-sent
+        events): `on_text` receives each piece of text as it arrives. If it
+        raises ValueError the stream is closed right away and the call fails.
+
+        Raises:
+            GeminiError: As generate_content; code 200 when `on_text` aborted the stream.
+        """
+        pieces = []
+        usage, finish_reason, model, block_reason = None, None, self.model, None
+        try:
+            with self.http.stream(
+                'POST',
+                self._url('streamGenerateContent') + '?alt=sse',
+                json=self._generate_body(prompt, cached_content, max_output_tokens),
+                headers={'x-goog-api-key': self.api_key},
+                timeout=AI_REWRITE_CONFIG['timeout_seconds'],
+            ) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    raise _error_from_response(response)
+                for line in response.iter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    try:
+                        data = json.loads(line[5:])
+                    except ValueError as e:
+                        raise GeminiError(f"Invalid JSON in Gemini stream: {e}", code=200) from e
+                    if data.get('error'):
+                        error = data['error']
+                        raise GeminiError(f"{error.get('code')} {error.get('message')}", code=error.get('code'))
+                    usage = data.get('usageMetadata') or usage
+                    model = data.get('modelVersion', model)
+                    block_reason = (data.get('promptFeedback') or {}).get('blockReason', block_reason)
+                    for candidate in (data.get('candidates') or [])[:1]:
+                        finish_reason = candidate.get('finishReason', finish_reason)
+                        for part in (candidate.get('content') or {}).get('parts', []):
+                            text = part.get('text', '')
+                            if not text:
+                                continue
+                            pieces.append(text)
+                            if on_text:
+                                try:
+                                    on_text(text)
+                                except ValueError as e:
+                                    # sair do with fecha a conexão: o resto da resposta não é gerado/cobrado
+                                    raise GeminiError(f"Gemini stream aborted: {e}", code=200) from e
+        except httpx.HTTPError as e:
+            raise GeminiError(f"Request to Gemini failed: {e}") from e
+        if not pieces:
+            if block_reason:
+                raise GeminiError(f"Gemini returned no content ({block_reason})", code=200)
+            raise GeminiError(f"Gemini returned an empty candidate ({finish_reason})", code=200)
+        return GeminiResponse("".join(pieces), usage=usage, finish_reason=finish_reason, model=model)
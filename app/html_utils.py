@@ -2,9 +2,13 @@
 import re
 import logging
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse, parse_qs
 
+from .image_variants import canonical_key
+from .lazy_import import lazy_import
+
+bs4 = lazy_import('bs4')
+
 logger = logging.getLogger(__name__)
 
 # =========================
@@ -51,7 +55,7 @@ def strip_credits_and_normalize_youtube(html: str) -> str:
     if not html:
         return html
 
-    soup = BeautifulSoup(html, "lxml")
+    soup = bs4.BeautifulSoup(html, "lxml")
 
     # 1) Remover “Crédito:”, “Credito:”, “Fonte:”
     for node in soup.find_all(["figcaption", "p", "span"]):
@@ -109,7 +113,7 @@ def hard_filter_forbidden_html(html: str) -> str:
     if not html:
         return html
 
-    soup = BeautifulSoup(html, "lxml")
+    soup = bs4.BeautifulSoup(html, "lxml")
 
     REMOVE_TAGS = {
         "script","style","noscript","form","input","button","select","option",
@@ -157,10 +161,13 @@ def hard_filter_forbidden_html(html: str) -> str:
 # =========================
 
 def _norm_key(u: str) -> str:
-    """Normaliza URL para comparação/chave de dicionário."""
+    """
+    Normaliza URL para comparação/chave de dicionário. Variantes da mesma
+    imagem na CDN (parâmetros de tamanho, shards) têm a mesma chave.
+    """
     if not u:
         return ""
-    return (u.strip().rstrip("/")).lower()
+    return canonical_key(u)
 
 
 def _replace_in_srcset(srcset: str, mapping: Dict[str, str]) -> str:
@@ -193,7 +200,7 @@ def merge_images_into_content(content_html: str, image_urls: List[str], max_imag
     """
     if not content_html:
         content_html = ""
-    soup = BeautifulSoup(content_html, "lxml")
+    soup = bs4.BeautifulSoup(content_html, "lxml")
 
     # conjunto de URLs já presentes
     present: set[str] = set()
@@ -246,7 +253,7 @@ def rewrite_img_srcs_with_wp(content_html: str, uploaded_src_map: Dict[str, str]
     # normalizar chaves do mapping
     norm_map: Dict[str, str] = {_norm_key(k): v for k, v in uploaded_src_map.items() if k and v}
 
-    soup = BeautifulSoup(content_html, "lxml")
+    soup = bs4.BeautifulSoup(content_html, "lxml")
     for img in soup.find_all("img"):
         # src
         src = (img.get("src") or "").strip()
@@ -291,7 +298,7 @@ def strip_all_html(text: str) -> str:
         return text
 
     # BeautifulSoup decodifica entidades HTML e extrai apenas o texto.
-    soup = BeautifulSoup(text, "html.parser")
+    soup = bs4.BeautifulSoup(text, "html.parser")
     return soup.get_text(separator=' ', strip=True)
 
 # =========================
@@ -0,0 +1,187 @@
+"""
+Disk-backed HTTP response cache for article pages.
+
+Responses are stored in SQLite, keyed by normalized URL, with their
+validators (ETag / Last-Modified) and a zlib-compressed body. The total
+stored size is bounded and the least recently used entries are evicted
+first. Callers revalidate stale entries with conditional requests; a
+partial body (download stopped early) is stored without validators, so
+once stale it is fetched again in full instead of being confirmed by a 304.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros de rastreamento que não mudam o conteúdo da página
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL for use as a cache key: lowercases scheme and host,
+    drops the fragment, default ports and tracking parameters, and sorts
+    the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class HttpCache:
+    """SQLite-backed HTTP cache with validators, compressed bodies and LRU eviction by size."""
+
+    def __init__(self, db_path: str = 'data/http_cache.db', max_bytes: int = 200 * 1024 * 1024,
+                 fresh_seconds: int = 3600):
+        """
+        Args:
+            db_path: Path to the SQLite file.
+            max_bytes: Maximum total size of the compressed bodies.
+            fresh_seconds: Age below which an entry is served without revalidation.
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url_hash TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_access ON http_cache(last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry for `url`, or None.
+
+        The dict has 'body' (bytes), 'etag', 'last_modified', 'content_type',
+        'fetched_at' and 'fresh' (True if it can be used without revalidation).
+        """
+        key = self._key(url)
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM http_cache WHERE url_hash = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self.conn.execute("UPDATE http_cache SET last_access = ? WHERE url_hash = ?", (now, key))
+            self.conn.commit()
+        try:
+            body = zlib.decompress(row["body"])
+        except zlib.error as e:
+            logger.warning(f"Corrupted HTTP cache entry for {url}: {e}")
+            self.delete(url)
+            return None
+        return {
+            "body": body,
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "content_type": row["content_type"],
+            "fetched_at": row["fetched_at"],
+            "fresh": (now - row["fetched_at"]) < self.fresh_seconds,
+        }
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Builds If-None-Match / If-Modified-Since headers for revalidating `entry`."""
+        headers: Dict[str, str] = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, body: bytes, headers: Mapping[str, str], partial: bool = False) -> None:
+        """
+        Stores a 200 response body with its validators and evicts old entries
+        if needed. With `partial` the validators are dropped: they describe
+        the whole page, not the truncated body.
+        """
+        etag, last_modified = (None, None) if partial else (headers.get("etag"), headers.get("last-modified"))
+        compressed = zlib.compress(body, 6)
+        if len(compressed) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(url_hash, url, etag, last_modified, content_type, body, size, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(url), url, etag, last_modified,
+                 headers.get("content-type"), compressed, len(compressed), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def mark_revalidated(self, url: str) -> None:
+        """Resets the age of an entry after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE http_cache SET fetched_at = ?, last_access = ? WHERE url_hash = ?",
+                (now, now, self._key(url)),
+            )
+            self.conn.commit()
+
+    def delete(self, url: str) -> None:
+        """Removes the entry for `url`, if any."""
+        with self._lock:
+            self.conn.execute("DELETE FROM http_cache WHERE url_hash = ?", (self._key(url),))
+            self.conn.commit()
+
+    def total_size(self) -> int:
+        """Total size in bytes of the stored (compressed) bodies."""
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the total size fits. Caller holds the lock."""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self.conn.execute("SELECT url_hash, size FROM http_cache ORDER BY last_access ASC").fetchall()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM http_cache WHERE url_hash = ?", (row["url_hash"],))
+            total -= row["size"]
+            evicted += 1
+        logger.info(f"HTTP cache evicted {evicted} entries (LRU) to stay under {self.max_bytes} bytes.")
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
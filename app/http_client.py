@@ -0,0 +1,238 @@
+"""
+Shared HTTP client layer.
+
+One httpx client for the whole process (feeds, extractor, media, WordPress)
+so concurrent fetches reuse pooled keep-alive connections instead of paying
+a TLS handshake each time. It adds per-host connection limits, HTTP/2 when
+the optional 'h2' package is installed, unified timeouts and retry policy,
+and per-request metrics.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from .config import HTTP_CONFIG, USER_AGENT
+from .lazy_import import lazy_import
+
+# httpx (~70 ms de import) só carrega no primeiro pedido
+httpx = lazy_import('httpx')
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+MAX_RETRY_AFTER_SECONDS = 30.0
+
+
+class HttpClient:
+    """Process-wide httpx client with per-host limits, retries and metrics."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, user_agent: str = USER_AGENT,
+                 transport: Optional[httpx.BaseTransport] = None):
+        """
+        Args:
+            config: Overrides for HTTP_CONFIG (timeouts, limits, retries, http2).
+            user_agent: Default User-Agent header.
+            transport: Custom httpx transport (e.g. httpx.MockTransport for local stand-ins).
+        """
+        self.transport = transport
+        self.config = {**HTTP_CONFIG, **(config or {})}
+        self.user_agent = user_agent
+        self.retries = int(self.config['retries'])
+        self.http2 = bool(self.config['http2']) and importlib.util.find_spec('h2') is not None
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.metrics: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def client(self) -> httpx.Client:
+        """The underlying httpx.Client, created on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        http2=self.http2,
+                        transport=self.transport,
+                        follow_redirects=True,
+                        headers={'User-Agent': self.user_agent},
+                        timeout=httpx.Timeout(
+                            self.config['timeout_seconds'],
+                            connect=self.config['connect_timeout_seconds'],
+                        ),
+                        limits=httpx.Limits(
+                            max_connections=self.config['max_connections'],
+                            max_keepalive_connections=self.config['max_connections'],
+                            keepalive_expiry=self.config['keepalive_expiry_seconds'],
+                        ),
+                    )
+                    logger.info(f"Shared HTTP client ready (http2={'on' if self.http2 else 'off'}).")
+        return self._client
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Semaphore limiting concurrent requests to the URL's host."""
+        host = urlsplit(url).netloc.lower()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            with self._lock:
+                slot = self._host_slots.setdefault(
+                    host, threading.BoundedSemaphore(self.config['max_connections_per_host'])
+                )
+        return slot
+
+    @staticmethod
+    def _encode_headers(headers: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """httpx only accepts ASCII str values; encode the rest as latin-1 like requests does."""
+        if not headers:
+            return headers
+        return {
+            k: (v.encode('latin-1', 'replace') if isinstance(v, str) and not v.isascii() else v)
+            for k, v in headers.items()
+        }
+
+    def _record(self, url: str, status: Optional[int], elapsed: float, size: int, retried: bool) -> None:
+        """Aggregates per-host metrics for one request."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            m = self.metrics.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'bytes': 0})
+            m['requests'] += 1
+            m['total_ms'] += elapsed * 1000
+            m['bytes'] += size
+            if status is None or status >= 400:
+                m['errors'] += 1
+            if retried:
+                m['retries'] += 1
+        logger.debug(f"HTTP {status or 'ERR'} {url} in {elapsed * 1000:.0f}ms ({size} bytes)")
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Delay before the next attempt: Retry-After when given, else exponential with jitter."""
+        if response is not None and response.headers.get('retry-after', '').isdigit():
+            return min(float(response.headers['retry-after']), MAX_RETRY_AFTER_SECONDS)
+        return (0.5 * 2 ** attempt) + random.uniform(0, 0.25)
+
+    def request(self, method: str, url: str, *, retries: Optional[int] = None, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a request through the shared pool.
+
+        Idempotent methods are retried on transport errors and on 429/5xx
+        responses; other methods are retried only when the connection could
+        not be established (the request was never sent).
+
+        Raises:
+            httpx.RequestError: If every attempt failed at the transport level.
+        """
+        method = method.upper()
+        retries = self.retries if retries is None else retries
+        kwargs['headers'] = self._encode_headers(kwargs.get('headers'))
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with self._host_slot(url):
+                    response = self.client.request(method, url, **kwargs)
+            except httpx.RequestError as e:
+                self._record(url, None, time.perf_counter() - start, 0, attempt > 0)
+                can_retry = method in IDEMPOTENT_METHODS or isinstance(e, httpx.ConnectError)
+                if attempt >= retries or not can_retry:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({e}); retrying in {delay:.1f}s.")
+            else:
+                self._record(url, response.status_code, time.perf_counter() - start,
+                             len(response.content), attempt > 0)
+                if (response.status_code not in RETRY_STATUS_CODES or attempt >= retries
+                        or method not in IDEMPOTENT_METHODS):
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.warning(f"{method} {url} returned {response.status_code}; retrying in {delay:.1f}s.")
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request('POST', url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs: Any) -> Iterator[httpx.Response]:
+        """Streams a response body (no retries); holds the host slot while open."""
+        kwargs['headers'] = self._encode_headers(kwargs.get('headers'))
+        start = time.perf_counter()
+        status = None
+        with self._host_slot(url):
+            try:
+                with self.client.stream(method.upper(), url, **kwargs) as response:
+                    status = response.status_code
+                    yield response
+            finally:
+                self._record(url, status, time.perf_counter() - start, 0, False)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T], max_workers: Optional[int] = None) -> List[R]:
+        """
+        Runs `fn` over `items` concurrently on threads sharing this client's
+        pool; per-host limits still apply. Results keep the input order.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        workers = max_workers or min(len(items), self.config['max_connections_per_host'])
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http') as pool:
+            return list(pool.map(fn, items))
+
+    def log_metrics(self) -> None:
+        """Logs the per-host request metrics collected so far."""
+        with self._lock:
+            snapshot = {host: dict(m) for host, m in self.metrics.items()}
+        for host, m in sorted(snapshot.items()):
+            avg = m['total_ms'] / m['requests'] if m['requests'] else 0
+            logger.info(
+                f"HTTP {host}: {m['requests']:.0f} requests, {m['errors']:.0f} errors, "
+                f"{m['retries']:.0f} retries, avg {avg:.0f}ms, {m['bytes'] / 1024:.0f} KB"
+            )
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_shared_client: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Returns the process-wide HttpClient, creating it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = HttpClient()
+    return _shared_client
+
+
+def close_http_client() -> None:
+    """Closes the process-wide HttpClient (e.g. at shutdown)."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is not None:
+            _shared_client.log_metrics()
+            _shared_client.close()
+            _shared_client = None
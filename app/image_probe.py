@@ -0,0 +1,178 @@
+"""
+Image probing: real dimensions instead of URL heuristics.
+
+The ImageProber downloads only the first bytes of each candidate image
+(HTTP Range request, stream closed as soon as the header is understood)
+and reads format, width and height from it. Probes run concurrently on the
+shared HTTP client and results are cached by URL, so an article's images
+cost roughly one round trip of wall time.
+"""
+
+import io
+import logging
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .http_client import HttpClient, get_http_client
+from .lazy_import import lazy_import
+
+httpx = lazy_import('httpx')
+
+logger = logging.getLogger(__name__)
+
+ImageInfo = Dict[str, object]
+
+# Marcadores SOF do JPEG (exceto DHT/DAC/JPG) que trazem altura/largura
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in _JPEG_SOF:
+            h, w = struct.unpack(">HH", data[i + 5:i + 9])
+            return w, h
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        w, h = struct.unpack("<HH", data[26:30])
+        return w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        b0, b1, b2, b3 = data[21:25]
+        return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0xF) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+    if chunk == b"VP8X" and len(data) >= 30:
+        return 1 + int.from_bytes(data[24:27], "little"), 1 + int.from_bytes(data[27:30], "little")
+    return None
+
+
+def image_size(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """
+    Returns (format, width, height) read from the first bytes of an image,
+    or None if the header is incomplete or unknown.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        w, h = struct.unpack(">II", data[16:24])
+        return "png", w, h
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        w, h = struct.unpack("<HH", data[6:10])
+        return "gif", w, h
+    if data[:2] == b"\xff\xd8":
+        size = _jpeg_size(data)
+        return ("jpeg", *size) if size else None
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        size = _webp_size(data)
+        return ("webp", *size) if size else None
+    if data[4:8] == b"ftyp" and data[8:12] in (b"avif", b"avis"):
+        pos = data.find(b"ispe")
+        if pos != -1 and len(data) >= pos + 16:
+            w, h = struct.unpack(">II", data[pos + 8:pos + 16])
+            return "avif", w, h
+        return None
+    # outros formatos: o Pillow lê só o cabeçalho no open()
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as im:
+            return (im.format or "").lower(), im.size[0], im.size[1]
+    except Exception:
+        return None
+
+
+class ImageProber:
+    """Concurrent, cached image dimension probes over partial downloads."""
+
+    def __init__(self, http_client: Optional[HttpClient] = None, probe_bytes: int = 64 * 1024,
+                 cache_size: int = 4096):
+        """
+        Args:
+            http_client: Client used for the probes (default: the shared one).
+            probe_bytes: Maximum bytes read per image.
+            cache_size: Number of URLs kept in the in-memory cache.
+        """
+        self.http = http_client or get_http_client()
+        self.probe_bytes = probe_bytes
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, ImageInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, url: str) -> Optional[ImageInfo]:
+        with self._lock:
+            info = self._cache.get(url)
+            if info is not None:
+                self._cache.move_to_end(url)
+            return info
+
+    def _remember(self, url: str, info: ImageInfo) -> None:
+        with self._lock:
+            self._cache[url] = info
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def probe(self, url: str) -> Optional[ImageInfo]:
+        """
+        Returns {'format', 'width', 'height'} for the image at `url`, or None
+        if it could not be read. Only successful probes are cached.
+        """
+        if (info := self._cached(url)) is not None:
+            return info
+        data = b""
+        try:
+            headers = {"Range": f"bytes=0-{self.probe_bytes - 1}"}
+            with self.http.stream("GET", url, headers=headers) as resp:
+                if resp.status_code not in (200, 206):
+                    logger.debug(f"Image probe {url}: HTTP {resp.status_code}")
+                    return None
+                size = None
+                # servidores sem suporte a Range mandam 200 com o arquivo todo:
+                # fecha o stream assim que o cabeçalho for entendido
+                for chunk in resp.iter_bytes():
+                    data += chunk
+                    if (size := image_size(data)) or len(data) >= self.probe_bytes:
+                        break
+        except httpx.HTTPError as e:
+            logger.debug(f"Image probe {url} failed: {e}")
+            return None
+        if not size:
+            logger.debug(f"Image probe {url}: unknown header ({len(data)} bytes read)")
+            return None
+        info = {"format": size[0], "width": size[1], "height": size[2]}
+        self._remember(url, info)
+        return info
+
+    def probe_many(self, urls: Iterable[str]) -> Dict[str, Optional[ImageInfo]]:
+        """Probes several images concurrently; returns {url: info or None}."""
+        unique = list(dict.fromkeys(urls))
+        return dict(zip(unique, self.http.map(self.probe, unique)))
+
+
+def rank_by_size(urls: List[str], probes: Dict[str, Optional[ImageInfo]],
+                 min_width: int, min_height: int) -> List[str]:
+    """
+    Drops images whose real size is below the minimum and orders the rest
+    by area (largest first). Unprobed images keep their relative order
+    after the probed ones.
+    """
+    sized, unknown = [], []
+    for index, url in enumerate(urls):
+        info = probes.get(url)
+        if info is None:
+            unknown.append(url)
+        elif info["width"] >= min_width and info["height"] >= min_height:
+            sized.append((-(info["width"] * info["height"]), index, url))
+    return [url for _, _, url in sorted(sized)] + unknown
@@ -0,0 +1,101 @@
+"""
+Canonical keys for image variants.
+
+Valnet CDNs (static*.srcdn.com, static*.<site>images.com) serve one asset
+under many URLs: the same path with different resize parameters
+(?q=50&fit=crop&w=825&dpr=1.5), on several numbered shards, and in every
+width of a srcset. ImageVariantIndex groups those variants under one
+canonical key and picks the best one for a target width, so each picture
+is downloaded and uploaded once.
+"""
+
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# static0..3.gamerantimages.com, static1.srcdn.com, ...
+_VALNET_CDN_RX = re.compile(r"^static\d*\.(srcdn|[a-z]+images)\.com$")
+
+
+def is_resizing_cdn(host: str) -> bool:
+    """True for CDN hosts whose query string only selects a resized variant."""
+    return bool(_VALNET_CDN_RX.match((host or "").lower()))
+
+
+def canonical_key(url: str) -> str:
+    """
+    Key shared by every variant of the same asset. For resizing CDNs it is
+    host (without the shard number) + path; other URLs keep their query.
+    """
+    url = (url or "").strip().rstrip("/")
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if is_resizing_cdn(host):
+        host = re.sub(r"^static\d*\.", "static.", host)
+        return f"{host}{parts.path}"
+    return url.lower()
+
+
+def variant_width(url: str, descriptor: Optional[int] = None) -> Optional[int]:
+    """
+    Rendered width of a variant: the srcset 'w' descriptor when known, else
+    w x dpr from a resizing CDN's query. None means the original file.
+    """
+    if descriptor:
+        return descriptor
+    parts = urlsplit(url)
+    if not is_resizing_cdn(parts.netloc) or not parts.query:
+        return None
+    params = parse_qs(parts.query)
+    try:
+        width = int(params.get("w", ["0"])[0] or 0)
+        dpr = float(params.get("dpr", ["1"])[0] or 1)
+    except ValueError:
+        return None
+    return int(width * dpr) if width else None
+
+
+class ImageVariantIndex:
+    """Groups image URLs by canonical key and selects one variant per asset."""
+
+    def __init__(self, target_width: int = 1600):
+        """
+        Args:
+            target_width: Widest variant wanted; wider ones are used only
+                when nothing at or below it (and no original) exists.
+        """
+        self.target_width = target_width
+        self._variants: Dict[str, Dict[str, Optional[int]]] = {}
+
+    def add(self, url: str, width: Optional[int] = None) -> str:
+        """Registers a variant (width from the srcset, if known); returns its canonical key."""
+        url = url.strip().rstrip("/")
+        key = canonical_key(url)
+        variants = self._variants.setdefault(key, {})
+        w = variant_width(url, width)
+        if url not in variants or (w and not variants[url]):
+            variants[url] = w
+        return key
+
+    def best(self, key: str) -> Optional[str]:
+        """
+        Best variant of an asset: the widest one at or below target_width,
+        else the original (no resize parameters), else the narrowest one.
+        """
+        variants = self._variants.get(key)
+        if not variants:
+            return None
+        fitting = [(w, u) for u, w in variants.items() if w and w <= self.target_width]
+        if fitting:
+            return max(fitting, key=lambda item: item[0])[1]
+        originals = [u for u, w in variants.items() if not w]
+        if originals:
+            return originals[0]
+        return min(variants.items(), key=lambda item: item[1])[0]
+
+    def urls(self) -> List[str]:
+        """One URL per asset, in order of first appearance."""
+        return [self.best(key) for key in self._variants]
+
+    def __len__(self) -> int:
+        return len(self._variants)
@@ -0,0 +1,127 @@
+"""
+Tolerant decoding of the model's JSON.
+
+A response that json.loads rejects used to be thrown away and generated
+again on another key. Most of them are fixable: the object wrapped in a
+code fence or in a sentence, a trailing comma, raw newlines inside the
+HTML string, or a tail cut off by the output limit. repair_json tries the
+cheap fixes in order and, as a last resort, keeps the top-level fields that
+were complete before the damage (the field being written when the text was
+cut is dropped, never closed half-way). The caller decides whether what
+was recovered is enough.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from .json_stream import JsonFieldStream, JsonStreamError
+
+_FENCE_RX = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_WHITESPACE = ' \t\r\n'
+
+
+def _loads(text: str) -> Tuple[Any, bool]:
+    """json.loads, falling back to accepting raw control characters in strings; (value, needed_lenient)."""
+    try:
+        return json.loads(text), False
+    except ValueError:
+        return json.loads(text, strict=False), True
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Removes commas directly before a closing '}' or ']' (outside strings)."""
+    out: List[str] = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '}]':
+            j = len(out) - 1
+            while j >= 0 and out[j] in _WHITESPACE:
+                j -= 1
+            if j >= 0 and out[j] == ',':
+                del out[j]
+        out.append(ch)
+    return ''.join(out)
+
+
+def _json_start(text: str) -> int:
+    """Index of the first '{' or '[' (0 if there is none)."""
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    return min(starts) if starts else 0
+
+
+def _json_span(text: str) -> str:
+    """The text from the first '{' or '[' to the last '}' or ']' (or to the end if never closed)."""
+    start = _json_start(text)
+    end = max(text.rfind('}'), text.rfind(']'))
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def _complete_fields(text: str) -> Dict[str, Any]:
+    """Top-level fields of an object whose values were complete before the text broke off or went bad."""
+    fields: Dict[str, Any] = {}
+    stream = JsonFieldStream(lambda name, value: fields.__setitem__(name, value))
+    try:
+        stream.feed(text)
+    except JsonStreamError:
+        pass
+    return fields
+
+
+def repair_json(text: str) -> Tuple[Any, List[str]]:
+    """
+    Decodes `text`, repairing it if needed.
+
+    Returns:
+        The decoded value and the repairs applied, from 'fence', 'prose',
+        'control_chars', 'trailing_comma' and 'partial' (empty if the text
+        was valid JSON).
+
+    Raises:
+        ValueError: If nothing could be recovered.
+    """
+    stripped = text.strip()
+    try:
+        return json.loads(stripped), []
+    except ValueError:
+        pass
+
+    repairs: List[str] = []
+    candidate = stripped
+    fenced = _FENCE_RX.search(candidate)
+    if fenced:
+        candidate = fenced.group(1).strip()
+        repairs.append('fence')
+    span = _json_span(candidate)
+    if span != candidate:
+        candidate = span
+        repairs.append('prose')
+
+    for fix in (None, 'trailing_comma'):
+        if fix == 'trailing_comma':
+            fixed = _strip_trailing_commas(candidate)
+            if fixed == candidate:
+                continue
+            candidate = fixed
+            repairs.append(fix)
+        try:
+            value, lenient = _loads(candidate)
+        except ValueError:
+            continue
+        return value, repairs + (['control_chars'] if lenient else [])
+
+    # sem cortar o fim: num texto truncado o último '}' pode estar dentro de um valor
+    head = fenced.group(1).strip() if fenced else stripped
+    fields = _complete_fields(_strip_trailing_commas(head[_json_start(head):]))
+    if not fields:
+        raise ValueError("no complete JSON field could be recovered")
+    return fields, repairs + ['partial']
@@ -0,0 +1,157 @@
+"""
+Incremental parsing of a streamed JSON object.
+
+With streamGenerateContent the rewrite arrives in chunks. JsonFieldStream
+scans them as they come: each top-level field of the object is decoded and
+reported as soon as its value is closed (so tags can be resolved while the
+model is still writing the rest), and output that can no longer become a
+JSON object (prose instead of '{', mismatched brackets, garbage between
+fields) raises JsonStreamError right away instead of after the whole
+response has been paid for.
+"""
+
+import json
+from typing import Any, Callable, List, Optional
+
+_WHITESPACE = ' \t\r\n'
+_CLOSERS = {'}': '{', ']': '['}
+
+
+class JsonStreamError(ValueError):
+    """The streamed text is not a well-formed JSON object."""
+
+
+class JsonFieldStream:
+    """Reports the top-level fields of a JSON object fed in pieces."""
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        """
+        Args:
+            on_field: Called with (name, value) when a top-level field is complete.
+        """
+        self.on_field = on_field
+        self.fields: List[str] = []
+        self.done = False
+        self.failed = False
+        self._text = ''
+        self._state = 'start'
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._start = 0
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> None:
+        """
+        Scans the next piece of text.
+
+        Raises:
+            JsonStreamError: If the text can no longer be a JSON object.
+        """
+        offset = len(self._text)
+        self._text += chunk
+        for i, ch in enumerate(chunk, offset):
+            self._step(i, ch)
+
+    def _fail(self, i: int, reason: str) -> None:
+        self.failed = True
+        snippet = self._text[max(0, i - 20):i + 20].replace('\n', ' ')
+        raise JsonStreamError(f"{reason} at character {i} (...{snippet}...)")
+
+    def _emit(self, end: int) -> None:
+        """Decodes the value of the current field (text[start:end]) and reports it."""
+        raw = self._text[self._start:end].strip()
+        try:
+            # strict=False: quebras de linha cruas dentro do HTML não invalidam o campo
+            value = json.loads(raw, strict=False)
+        except ValueError:
+            self._fail(end, f"invalid value for field '{self._key}'")
+        self.fields.append(self._key)
+        if self.on_field:
+            self.on_field(self._key, value)
+
+    def _step(self, i: int, ch: str) -> None:
+        state = self._state
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if state == 'key':
+                    self._key = json.loads(self._text[self._start:i + 1])
+                    self._state = 'colon'
+                elif state == 'value' and not self._stack:
+                    self._emit(i + 1)
+                    self._state = 'after'
+            return
+
+        if state == 'start':
+            if ch == '`':
+                self._state = 'fence'
+            elif ch == '{':
+                self._state = 'key'
+            elif ch not in _WHITESPACE:
+                self._fail(i, "response does not start with a JSON object")
+        elif state == 'fence':
+            # ```json na primeira linha: ignora até o fim da linha
+            if ch == '\n':
+                self._state = 'start'
+        elif state == 'key':
+            if ch == '"':
+                self._in_string = True
+                self._start = i
+            elif ch == '}':
+                # vírgula sobrando antes do '}' é recuperável; não vale abortar
+                self._finish()
+            elif ch not in _WHITESPACE:
+                self._fail(i, "expected a field name")
+        elif state == 'colon':
+            if ch == ':':
+                self._state = 'value_start'
+            elif ch not in _WHITESPACE:
+                self._fail(i, "expected ':'")
+        elif state == 'value_start':
+            if ch in _WHITESPACE:
+                return
+            self._start = i
+            if ch == '"':
+                self._in_string = True
+                self._state = 'value'
+            elif ch in '{[':
+                self._stack.append(ch)
+                self._state = 'value'
+            elif ch in '}],:':
+                self._fail(i, f"missing value for field '{self._key}'")
+            else:
+                self._state = 'scalar'
+        elif state == 'value':
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._stack.append(ch)
+            elif ch in _CLOSERS:
+                if self._stack.pop() != _CLOSERS[ch]:
+                    self._fail(i, "mismatched bracket")
+                if not self._stack:
+                    self._emit(i + 1)
+                    self._state = 'after'
+        elif state == 'scalar':
+            if ch in _WHITESPACE or ch in ',}':
+                self._emit(i)
+                self._state = 'after'
+                if ch not in _WHITESPACE:
+                    self._step(i, ch)
+        elif state == 'after':
+            if ch == ',':
+                self._state = 'key'
+            elif ch == '}':
+                self._finish()
+            elif ch not in _WHITESPACE:
+                self._fail(i, "expected ',' or '}' after a field")
+        # 'done': o que vier depois (cerca ``` de fechamento) fica para o parse final
+
+    def _finish(self) -> None:
+        self._state = 'done'
+        self.done = True
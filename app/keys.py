@@ -1,83 +1,248 @@
+"""
+Persistent API key health and quota state.
+
+KeyManager keeps, in the `api_key_status` table, each key's validity,
+cooldown (exponential on repeated failures, or the server's Retry-After),
+its per-minute and daily request counts and its per-minute token usage
+(charged with an estimate up front, corrected with the billed count). Every process and every
+restart reads the same rows, so a key known to be rate-limited or invalid
+is skipped instead of burning another request on it.
+"""
+
+import hashlib
 import logging
+import sqlite3
+import threading
 import time
-from datetime import datetime, timedelta
-from itertools import cycle
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from .config import AI_KEY_CONFIG
+from .store import migrate_api_key_status
 
 logger = logging.getLogger(__name__)
 
-class KeyPool:
+
+def key_hash(api_key: str) -> str:
+    """Stable identifier of a key; the key itself is never stored."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def _mask(api_key: str) -> str:
+    return f"...{api_key[-4:]}"
+
+
+def _today() -> str:
+    # As cotas diárias do Gemini são por dia; usamos a data UTC como janela
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def _seconds_until_tomorrow() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() + 86400
+    return max(60.0, midnight - now.timestamp())
+
+
+class KeyManager:
     """
-    Manages a pool of API keys with rotation and exponential backoff cooldown.
+    Hands out API keys for one category, skipping keys that are invalid,
+    cooling down, or over their per-minute/daily quota. State is shared
+    through SQLite.
     """
 
-    def __init__(self, api_keys: List[str], max_cooldown_seconds: int = 300):
+    def __init__(self, category: str, api_keys: List[str], db_path: Optional[str] = None,
+                 requests_per_minute: Optional[int] = None, requests_per_day: Optional[int] = None,
+                 base_cooldown_seconds: Optional[int] = None, max_cooldown_seconds: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None):
         """
-        Initializes the KeyPool.
-
         Args:
-            api_keys: A list of API keys to manage.
-            max_cooldown_seconds: The maximum duration for a key to be in cooldown (default: 5 minutes).
-        """
-        if not api_keys:
-            self._key_list: List[str] = []
-            self._key_cycle = None
-            self._key_status: Dict[str, Dict[str, Any]] = {}
-            logger.warning("KeyPool initialized with an empty list of keys.")
-        else:
-            self._key_list = api_keys
-            self._key_cycle = cycle(self._key_list)
-            self._key_status = {
-                key: {'cooldown_until': None, 'failures': 0}
-                for key in self._key_list
-            }
-            logger.info(f"KeyPool ready with {len(self._key_list)} keys.")
-
-        self.max_cooldown_seconds = max_cooldown_seconds
-
-    def get_key(self) -> Optional[str]:
+            category: AI category the keys belong to (e.g. 'movies').
+            api_keys: The category's keys, in preference order.
+            db_path: SQLite database holding api_key_status (default AI_KEY_CONFIG).
+            requests_per_minute: Per-key RPM limit (default AI_KEY_CONFIG).
+            requests_per_day: Per-key daily limit (default AI_KEY_CONFIG).
+            base_cooldown_seconds: First cooldown after a failure; doubles on each repeat.
+            max_cooldown_seconds: Cap for the exponential cooldown.
+            tokens_per_minute: Per-key TPM limit (default AI_KEY_CONFIG).
         """
-        Gets the next available key from the pool, skipping any keys in cooldown.
+        self.category = category
+        self.api_keys = [k for k in api_keys if k]
+        self._by_hash = {key_hash(k): k for k in self.api_keys}
+        self.rpm = requests_per_minute or AI_KEY_CONFIG['requests_per_minute']
+        self.rpd = requests_per_day or AI_KEY_CONFIG['requests_per_day']
+        self.tpm = tokens_per_minute or AI_KEY_CONFIG['tokens_per_minute']
+        self.base_cooldown = base_cooldown_seconds or AI_KEY_CONFIG['base_cooldown_seconds']
+        self.max_cooldown = max_cooldown_seconds or AI_KEY_CONFIG['max_cooldown_seconds']
+        self._lock = threading.Lock()
+
+        db_path = db_path or AI_KEY_CONFIG['db_path']
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: transações explícitas (BEGIN IMMEDIATE) entre processos
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock:
+            migrate_api_key_status(self.conn)
+            for h, k in self._by_hash.items():
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO api_key_status (key_hash, api_key, category) VALUES (?, ?, ?)",
+                    (h, _mask(k), category),
+                )
+
+    def _rows(self) -> List[sqlite3.Row]:
+        placeholders = ",".join("?" * len(self._by_hash))
+        return self.conn.execute(
+            f"SELECT * FROM api_key_status WHERE key_hash IN ({placeholders})", list(self._by_hash)
+        ).fetchall()
 
-        Returns:
-            An available API key, or None if all keys are in cooldown.
+    def _minute_full(self, row: sqlite3.Row, now: float, tokens: int) -> bool:
+        """True if the key's current minute has no room for one more request of `tokens`."""
+        if not row['minute_started'] or now - row['minute_started'] >= 60:
+            return False
+        if row['minute_count'] >= self.rpm:
+            return True
+        # um pedido maior que o TPM inteiro ainda passa numa janela vazia
+        return row['minute_tokens'] > 0 and row['minute_tokens'] + tokens > self.tpm
+
+    def _available(self, row: sqlite3.Row, now: float, today: str, tokens: int = 0) -> bool:
+        # chaves inválidas também ficam em cooldown (longo) e depois são testadas de novo
+        if row['cooldown_until'] and float(row['cooldown_until']) > now:
+            return False
+        if row['usage_day'] == today and row['day_count'] >= self.rpd:
+            return False
+        return not self._minute_full(row, now, tokens)
+
+    def acquire(self, tokens: int = 0) -> Optional[str]:
         """
-        if not self._key_cycle:
+        Reserves one request of about `tokens` tokens on the least recently
+        used key with room for it and returns that key, or None if every key
+        is unavailable right now.
+        """
+        if not self._by_hash:
             return None
+        now, today = time.time(), _today()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = [r for r in self._rows() if self._available(r, now, today, tokens)]
+                if not rows:
+                    self.conn.execute("COMMIT")
+                    return None
+                order = {h: i for i, h in enumerate(self._by_hash)}
+                row = min(rows, key=lambda r: (r['last_used'] or 0, order[r['key_hash']]))
+                in_window = row['minute_started'] and now - row['minute_started'] < 60
+                same_day = row['usage_day'] == today
+                self.conn.execute(
+                    "UPDATE api_key_status SET minute_started = ?, minute_count = ?, minute_tokens = ?, "
+                    "usage_day = ?, day_count = ?, last_used = ? WHERE key_hash = ?",
+                    (
+                        row['minute_started'] if in_window else now,
+                        (row['minute_count'] if in_window else 0) + 1,
+                        (row['minute_tokens'] if in_window else 0) + tokens,
+                        today,
+                        (row['day_count'] if same_day else 0) + 1,
+                        now,
+                        row['key_hash'],
+                    ),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self._by_hash[row['key_hash']]
+
+    def next_available_in(self, tokens: int = 0) -> Optional[float]:
+        """Seconds until some key has room for a request of `tokens` (0 if one has now), or None without keys."""
+        now, today = time.time(), _today()
+        with self._lock:
+            rows = self._rows()
+        waits = []
+        for row in rows:
+            wait = 0.0
+            if row['cooldown_until']:
+                wait = max(wait, float(row['cooldown_until']) - now)
+            if row['usage_day'] == today and row['day_count'] >= self.rpd:
+                wait = max(wait, _seconds_until_tomorrow())
+            if self._minute_full(row, now, tokens):
+                wait = max(wait, 60 - (now - row['minute_started']))
+            waits.append(max(0.0, wait))
+        return min(waits) if waits else None
+
+    def _update(self, api_key: str, sql: str, params: tuple, where: str = "", where_params: tuple = ()) -> None:
+        with self._lock:
+            self.conn.execute(f"UPDATE api_key_status SET {sql} WHERE key_hash = ? {where}",
+                              (*params, key_hash(api_key), *where_params))
+
+    def report_success(self, api_key: str) -> None:
+        """Clears the failure streak and cooldown of a key."""
+        self._update(api_key, "failures = 0, cooldown_until = NULL, is_valid = 1, last_error = NULL", ())
+
+    def record_usage(self, api_key: str, charged_tokens: int, actual_tokens: int) -> None:
+        """Replaces the estimate charged by acquire() with the tokens actually billed."""
+        delta = actual_tokens - charged_tokens
+        if delta:
+            # só corrige se a janela do minuto ainda for a mesma da reserva
+            self._update(api_key, "minute_tokens = MAX(0, minute_tokens + ?)", (delta,),
+                         "AND minute_started > ?", (time.time() - 60,))
+
+    def release(self, api_key: str, charged_tokens: int) -> None:
+        """
+        Refunds the request and tokens reserved by acquire() for an attempt
+        that never reached the model; the key's failure streak is left as is.
+        """
+        # uma instrução só: o SQLite aplica de forma atômica; o minuto só é estornado se ainda for o da reserva
+        self._update(
+            api_key,
+            "minute_count = CASE WHEN minute_started > ? THEN MAX(0, minute_count - 1) ELSE minute_count END, "
+            "minute_tokens = CASE WHEN minute_started > ? THEN MAX(0, minute_tokens - ?) ELSE minute_tokens END, "
+            "day_count = CASE WHEN usage_day = ? THEN MAX(0, day_count - 1) ELSE day_count END",
+            (time.time() - 60, time.time() - 60, charged_tokens, _today()),
+        )
+
+    def report_failure(self, api_key: str, error: str, retry_after: Optional[float] = None) -> None:
+        """
+        Puts a key in cooldown after a transient failure or rate limit:
+        `retry_after` when the server gave one, else exponential backoff.
+        """
+        h = key_hash(api_key)
+        with self._lock:
+            # incremento e cooldown na mesma transação: falhas simultâneas na mesma chave não se perdem
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("UPDATE api_key_status SET failures = failures + 1 WHERE key_hash = ?", (h,))
+                row = self.conn.execute("SELECT failures FROM api_key_status WHERE key_hash = ?", (h,)).fetchone()
+                failures = row['failures'] if row else 1
+                cooldown = retry_after or min(self.base_cooldown * 2 ** (failures - 1), self.max_cooldown)
+                self.conn.execute(
+                    "UPDATE api_key_status SET cooldown_until = ?, last_error = ? WHERE key_hash = ?",
+                    (time.time() + cooldown, error[:500], h),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        logger.warning(f"Key {_mask(api_key)} ({self.category}) cooling down for {cooldown:.0f}s: {error[:120]}")
+
+    def report_quota_exhausted(self, api_key: str, error: str) -> None:
+        """Marks a key's daily quota as used up; it is skipped until the next day."""
+        self._update(api_key, "day_count = ?, usage_day = ?, cooldown_until = ?, last_error = ?",
+                     (self.rpd, _today(), time.time() + _seconds_until_tomorrow(), error[:500]))
+        logger.warning(f"Key {_mask(api_key)} ({self.category}) exhausted its daily quota.")
+
+    def report_invalid(self, api_key: str, error: str) -> None:
+        """Marks a key invalid; it is retried only after a long cooldown (in case it gets fixed)."""
+        self._update(api_key, "is_valid = 0, cooldown_until = ?, last_error = ?",
+                     (time.time() + AI_KEY_CONFIG['invalid_retry_hours'] * 3600, error[:500]))
+        logger.error(f"Key {_mask(api_key)} ({self.category}) rejected as invalid: {error[:120]}")
+
+    def status(self) -> List[dict]:
+        """Current state of the category's keys (masked), for logs and the dashboard."""
+        with self._lock:
+            return [dict(row) for row in self._rows()]
 
-        for _ in range(len(self._key_list)):
-            key = next(self._key_cycle)
-            status = self._key_status[key]
-            cooldown_until = status.get('cooldown_until')
-
-            if cooldown_until and datetime.now() < cooldown_until:
-                continue
-            
-            return key
-
-        logger.warning("All API keys are currently in cooldown.")
-        return None
-
-    def report_failure(self, key: str, base_cooldown_seconds: int = 60):
-        """Reports a failure for a key and puts it into exponential backoff cooldown."""
-        if key not in self._key_status:
-            return
-
-        status = self._key_status[key]
-        status['failures'] += 1
-
-        backoff_factor = 2 ** (status['failures'] - 1)
-        cooldown_duration = min(base_cooldown_seconds * backoff_factor, self.max_cooldown_seconds)
-        cooldown_end = datetime.now() + timedelta(seconds=cooldown_duration)
-        status['cooldown_until'] = cooldown_end
-
-        logger.warning(f"Cooldown set for key ...{key[-4:]} for {cooldown_duration:.0f}s. Cooldown until: {cooldown_end.strftime('%Y-%m-%d %H:%M:%S')}")
-
-    def report_success(self, key: str):
-        """Reports a successful use of a key, resetting its failure count."""
-        if key in self._key_status:
-            status = self._key_status[key]
-            if status['failures'] > 0:
-                logger.info(f"Key ...{key[-4:]} is now active again after successful use.")
-                status['failures'] = 0
-                status['cooldown_until'] = None
\ No newline at end of file
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
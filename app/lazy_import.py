@@ -0,0 +1,43 @@
+"""
+Deferred imports for heavy optional-path dependencies.
+
+trafilatura alone is about a third of the import time of app.main, yet it
+only runs when an article has no site profile or the profile fails. Every
+`--once` run started from the dashboard paid for it anyway. lazy_import
+returns a stand-in module that imports the real one on first attribute
+access, so module-level names (and the tests that patch them, e.g.
+app.extractor.trafilatura.extract) keep working. bs4, lxml, httpx,
+soupsieve and feedparser are deferred the same way: the first article or
+request loads them, not the import of app.main. In hot loops bind the
+attribute to a local once (e.g. `Tag = bs4.Tag`) instead of going through
+the stand-in on every access.
+"""
+
+import importlib
+import sys
+from types import ModuleType
+
+
+class _LazyModule(ModuleType):
+    """Module placeholder that resolves attributes from the real module, importing it on first use."""
+
+    def __getattr__(self, attr: str):
+        # importlib serializa imports concorrentes do mesmo módulo; não precisa de lock aqui
+        module = importlib.import_module(self.__name__)
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self.__name__}'>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns module `name` without importing it yet (or the module itself if it is already loaded).
+
+    Attributes set on the returned object (as unittest.mock.patch does)
+    shadow the real module's until they are deleted.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
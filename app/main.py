@@ -7,13 +7,13 @@ import argparse
 import logging
 import sys
 from datetime import datetime
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 from app.config import SCHEDULE_CONFIG
 from app.logging_config import setup_logging
 from app.pipeline import run_pipeline_cycle
+from app.ai_processor import log_key_counts
 from app.cleanup import CleanupManager
 from app.store import Database
+from app.http_client import close_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +24,7 @@ def main():
     parser = argparse.ArgumentParser(description='RSS to WordPress Automation System')
     parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
     args = parser.parse_args()
+    log_key_counts()
 
     # Inicializa o banco de dados para garantir que as tabelas existam
     try:
@@ -43,7 +44,13 @@ def main():
         except Exception as e:
             logger.critical(f"Erro crítico durante a execução do ciclo único: {e}", exc_info=True)
             sys.exit(1)
+        finally:
+            close_http_client()
     else:
+        # Só o modo contínuo usa o agendador: o --once (run-now do dashboard) não paga o import
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        from apscheduler.triggers.interval import IntervalTrigger
+
         logger.info("Iniciando o agendador para execução contínua.")
         scheduler = BlockingScheduler(timezone="UTC")
         cleanup_manager = CleanupManager(cleanup_after_hours=SCHEDULE_CONFIG.get('cleanup_after_hours', 72))
@@ -77,6 +84,8 @@ def main():
         except Exception as e:
             logger.critical(f"Erro crítico no agendador: {e}", exc_info=True)
             sys.exit(1)
+        finally:
+            close_http_client()
 
 
 if __name__ == "__main__":
@@ -8,11 +8,12 @@ import hashlib
 from typing import Optional, Dict, Any
 from urllib.parse import urlparse, urljoin
 
-import requests
+import httpx
 from PIL import Image
 import io
 
 from . import wordpress
+from .http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +24,7 @@ class MediaHandler:
     def __init__(self, pipeline_config: Dict[str, Any], wp_client: 'wordpress.WordPressClient'):
         self.config = pipeline_config
         self.wp_client = wp_client
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.http = get_http_client()
     
     def _validate_image_url(self, url: str) -> bool:
         """Validate if URL points to a valid image"""
@@ -52,29 +50,29 @@ class MediaHandler:
         try:
             logger.debug(f"Downloading image: {url}")
             
-            response = self.session.get(url, timeout=15, stream=True)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                logger.warning(f"URL does not return image content: {url}")
-                return None
-            
-            # Download with size limit (10MB)
-            max_size = 10 * 1024 * 1024
-            content = b''
-            
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    content += chunk
-                    if len(content) > max_size:
-                        logger.warning(f"Image too large, skipping: {url}")
-                        return None
-            
-            return content
+            with self.http.stream('GET', url, timeout=15) as response:
+                response.raise_for_status()
+
+                # Check content type
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    logger.warning(f"URL does not return image content: {url}")
+                    return None
+
+                # Download with size limit (10MB)
+                max_size = 10 * 1024 * 1024
+                content = bytearray()
+
+                for chunk in response.iter_bytes(chunk_size=8192):
+                    if chunk:
+                        content += chunk
+                        if len(content) > max_size:
+                            logger.warning(f"Image too large, skipping: {url}")
+                            return None
+
+            return bytes(content)
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error downloading image {url}: {str(e)}")
             return None
     
@@ -0,0 +1,100 @@
+"""
+Model routing for the AI rewrites.
+
+Every article used to go to one hardcoded model. ModelRouter picks the
+model per article (a per-category override, else a light model for short
+inputs, else the primary) and orders the rest of the configured chain
+behind it as fallbacks. It keeps a rolling window of latency and errors per
+model: a model whose error rate or average latency goes over the target is
+moved to the end of the chain until its bad samples age out of the window.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRouter:
+    """Chooses the model chain for each request from size, category and recent health."""
+
+    def __init__(self, chain: List[str], light_model: Optional[str] = None, light_max_tokens: int = 1200,
+                 category_models: Optional[Dict[str, str]] = None, latency_target_seconds: float = 30.0,
+                 max_error_rate: float = 0.5, window_seconds: int = 600, min_samples: int = 3):
+        """
+        Args:
+            chain: Models in fallback order (first = primary); duplicates are dropped.
+            light_model: Model for inputs up to `light_max_tokens` (None = primary).
+            light_max_tokens: Largest estimated article size sent to the light model.
+            category_models: {category: model} overriding the size rule.
+            latency_target_seconds: Average latency above which a model is demoted.
+            max_error_rate: Share of failed calls above which a model is demoted.
+            window_seconds: Age of the samples kept per model.
+            min_samples: Samples needed before a model can be demoted.
+        """
+        self.chain = list(dict.fromkeys(m for m in chain if m))
+        if not self.chain:
+            raise ValueError("ModelRouter needs at least one model.")
+        self.light_model = light_model or None
+        self.light_max_tokens = light_max_tokens
+        self.category_models = {k: v for k, v in (category_models or {}).items() if v}
+        self.latency_target = latency_target_seconds
+        self.max_error_rate = max_error_rate
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[Tuple[float, float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def base_model(self, input_tokens: int, category: Optional[str] = None) -> str:
+        """The model an article should go to, before health is considered (stable for caching)."""
+        if category in self.category_models:
+            return self.category_models[category]
+        if self.light_model and input_tokens <= self.light_max_tokens:
+            return self.light_model
+        return self.chain[0]
+
+    def route(self, base_model: str) -> List[str]:
+        """
+        Models to try, in order: `base_model` then the rest of the chain, with
+        unhealthy models moved to the end (still tried as a last resort).
+        """
+        candidates = [base_model] + [m for m in self.chain if m != base_model]
+        healthy = [m for m in candidates if self._healthy(m)]
+        return healthy + [m for m in candidates if m not in healthy]
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        """Adds one call's outcome (latency and success) to the model's window."""
+        now = time.time()
+        with self._lock:
+            samples = self._samples.setdefault(model, deque())
+            samples.append((now, seconds, ok))
+            self._prune(samples, now)
+
+    def _prune(self, samples: Deque[Tuple[float, float, bool]], now: float) -> None:
+        while samples and samples[0][0] < now - self.window_seconds:
+            samples.popleft()
+
+    def stats(self, model: str) -> Dict[str, float]:
+        """Samples, error rate and average latency of a model in the current window."""
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                return {'samples': 0, 'error_rate': 0.0, 'avg_latency': 0.0}
+            self._prune(samples, time.time())
+            n = len(samples)
+            if not n:
+                return {'samples': 0, 'error_rate': 0.0, 'avg_latency': 0.0}
+            return {
+                'samples': n,
+                'error_rate': sum(1 for _, _, ok in samples if not ok) / n,
+                'avg_latency': sum(s for _, s, _ in samples) / n,
+            }
+
+    def _healthy(self, model: str) -> bool:
+        stats = self.stats(model)
+        if stats['samples'] < self.min_samples:
+            return True
+        return stats['error_rate'] <= self.max_error_rate and stats['avg_latency'] <= self.latency_target
@@ -0,0 +1,396 @@
+"""
+Append-only archive of raw article pages.
+
+Every page downloaded in full (ContentExtractor skips bodies cut short by
+the early stop or the size limit) is appended to the current segment file,
+compressed on its own with zstd ('zstandard' is a dependency; an install
+without it falls back to zlib with a warning, and cannot read zstd
+segments). Each segment has a fixed-width index of (URL hash, offset,
+length) entries: the open segment's index lives in memory, and sealed
+segments keep theirs sorted on disk and are searched through mmap, so
+loading a page costs one binary search plus one read.
+
+Segments rotate by size or age and are pruned with the database cleanup
+(CleanupManager.run_cleanup).
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .http_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"VPA1"
+_CODEC_ZSTD = b"zstd"
+_CODEC_ZLIB = b"zlib"
+# registro: hash da URL, tamanho comprimido, tamanho original, fetched_at, tamanho da URL
+_RECORD = struct.Struct("<16sIIdH")
+# entrada do índice: hash da URL, offset do registro, tamanho total do registro
+_INDEX_ENTRY = struct.Struct("<16sQI")
+_SEGMENT_SUFFIX = ".seg"
+_OPEN_INDEX_SUFFIX = ".idx.open"
+_INDEX_SUFFIX = ".idx"
+
+
+def _segment_codec(header: bytes) -> bytes:
+    """Codec named in a segment header ('' if the header is invalid)."""
+    return header[4:8] if header[:4] == _MAGIC else b""
+
+
+def _read_header(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(8)
+
+
+def _segment_started(path: Path) -> float:
+    """Creation time encoded in a segment name (pages-YYYYmmddTHHMMSS[-n].seg)."""
+    try:
+        return datetime.strptime(path.stem[6:21], "%Y%m%dT%H%M%S").timestamp()
+    except ValueError:
+        return time.time()
+
+
+def _read_at(f: BinaryIO, offset: int, length: int) -> bytes:
+    """Reads `length` bytes at `offset` (seek + read: os.pread does not exist on Windows). Caller holds the lock."""
+    f.seek(offset)
+    return f.read(length)
+
+
+def url_key(url: str) -> bytes:
+    """16-byte archive key of a URL (hash of the normalized URL)."""
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).digest()[:16]
+
+
+class _SealedSegment:
+    """A read-only segment with a sorted, memory-mapped index."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index_path = path.with_suffix(_INDEX_SUFFIX)
+        self.codec = b""
+        self._index: Optional[mmap.mmap] = None
+        self._file: Optional[BinaryIO] = None
+
+    def _open(self) -> None:
+        if self._index is None:
+            with open(self.index_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            self._file = open(self.path, "rb")
+            self.codec = _segment_codec(_read_at(self._file, 0, 8))
+
+    def lookup(self, key: bytes) -> Optional[Tuple[int, int]]:
+        """Binary search of `key` in the sorted index; returns (offset, length) or None."""
+        self._open()
+        lo, hi = 0, len(self._index) // _INDEX_ENTRY.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = mid * _INDEX_ENTRY.size
+            probe = self._index[pos:pos + 16]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                _, offset, length = _INDEX_ENTRY.unpack_from(self._index, pos)
+                return offset, length
+        return None
+
+    def read(self, offset: int, length: int) -> bytes:
+        self._open()
+        return _read_at(self._file, offset, length)
+
+    def close(self) -> None:
+        if isinstance(self._index, mmap.mmap):
+            self._index.close()
+        if self._file is not None:
+            self._file.close()
+        self._index, self._file = None, None
+
+
+class PageArchive:
+    """Compressed, append-only page archive split in rotating segments."""
+
+    def __init__(self, directory: str = 'data/page_archive', segment_max_bytes: int = 64 * 1024 * 1024,
+                 segment_max_hours: int = 24, level: int = 3):
+        """
+        Args:
+            directory: Folder holding the segment and index files.
+            segment_max_bytes: Size after which the open segment is sealed.
+            segment_max_hours: Age after which the open segment is sealed,
+                so pruning can drop old pages at that granularity.
+            level: Compression level.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_hours * 3600
+        self.level = level
+        self.codec = _CODEC_ZSTD if zstandard is not None else _CODEC_ZLIB
+        self._compressor = zstandard.ZstdCompressor(level=level) if zstandard is not None else None
+        if zstandard is None:
+            logger.warning("'zstandard' is not installed: page archive falls back to zlib "
+                           "and cannot read zstd segments. Run pip install -r requirements.txt.")
+        self._lock = threading.Lock()
+        self._sealed: List[_SealedSegment] = []
+        self._active_path: Optional[Path] = None
+        self._active_index: Dict[bytes, Tuple[int, int]] = {}
+        self._active_file = None
+        self._active_index_file = None
+        self._active_reader: Optional[BinaryIO] = None
+        self._active_size = 0
+        self._active_started = 0.0
+        self._load()
+
+    # ---- abertura -------------------------------------------------------
+
+    def _load(self) -> None:
+        """Finds existing segments; the newest unsealed one is reopened for appends."""
+        unsealed = []
+        for path in sorted(self.directory.glob(f"*{_SEGMENT_SUFFIX}")):
+            if path.with_suffix(_INDEX_SUFFIX).exists():
+                self._sealed.append(_SealedSegment(path))
+            elif path.with_suffix(_OPEN_INDEX_SUFFIX).exists():
+                unsealed.append(path)
+        self._sealed.reverse()  # mais novos primeiro na busca
+        # sobras de execuções interrompidas são seladas; a mais nova continua aberta
+        for path in unsealed[:-1]:
+            self._active_path, self._active_index = path, self._read_open_index(path)
+            self._seal_locked()
+        if unsealed:
+            self._open_active(unsealed[-1])
+
+    def _open_active(self, path: Path) -> None:
+        new = not path.exists()
+        self._active_file = open(path, "ab")
+        if new:
+            self._active_file.write(_MAGIC + self.codec)
+            self._active_file.flush()
+        elif _segment_codec(_read_header(path)) != self.codec:
+            # segmento gravado com outro codec: não mistura, começa outro
+            self._active_file.close()
+            self._active_path = path
+            self._active_index = self._read_open_index(path)
+            self._seal_locked()
+            self._open_active(self._new_segment_path())
+            return
+        self._active_path = path
+        self._active_started = _segment_started(path)
+        self._active_size = self._active_file.tell()
+        self._active_reader = open(path, "rb")
+        self._active_index = self._read_open_index(path) if not new else {}
+        self._active_index_file = open(path.with_suffix(_OPEN_INDEX_SUFFIX), "ab")
+
+    @staticmethod
+    def _read_open_index(path: Path) -> Dict[bytes, Tuple[int, int]]:
+        index: Dict[bytes, Tuple[int, int]] = {}
+        index_path = path.with_suffix(_OPEN_INDEX_SUFFIX)
+        if not index_path.exists():
+            return index
+        data = index_path.read_bytes()
+        # ignora uma entrada final incompleta (queda no meio da escrita)
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        for key, offset, length in _INDEX_ENTRY.iter_unpack(data[:usable]):
+            index[key] = (offset, length)
+        return index
+
+    def _new_segment_path(self) -> Path:
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = self.directory / f"pages-{stamp}{_SEGMENT_SUFFIX}"
+        n = 1
+        while path.exists():
+            path = self.directory / f"pages-{stamp}-{n}{_SEGMENT_SUFFIX}"
+            n += 1
+        path.with_suffix(_OPEN_INDEX_SUFFIX).touch()
+        return path
+
+    # ---- escrita --------------------------------------------------------
+
+    def _compress(self, body: bytes) -> bytes:
+        if self._compressor is not None:
+            return self._compressor.compress(body)
+        return zlib.compress(body, min(self.level * 2, 9))
+
+    def put(self, url: str, body: bytes, fetched_at: Optional[float] = None) -> None:
+        """Appends a page to the open segment, rotating it first if it is full or old."""
+        payload = self._compress(body)
+        url_bytes = url.encode("utf-8")[:0xFFFF]
+        key = url_key(url)
+        record = _RECORD.pack(key, len(payload), len(body), fetched_at or time.time(), len(url_bytes))
+        with self._lock:
+            if self._active_path is None or self._should_rotate():
+                if self._active_path is not None:
+                    self._seal_locked()
+                self._open_active(self._new_segment_path())
+            offset = self._active_size
+            length = len(record) + len(url_bytes) + len(payload)
+            self._active_file.write(record + url_bytes + payload)
+            self._active_file.flush()
+            # o índice só aponta para registros já gravados por inteiro
+            self._active_index_file.write(_INDEX_ENTRY.pack(key, offset, length))
+            self._active_index_file.flush()
+            self._active_index[key] = (offset, length)
+            self._active_size += length
+
+    def _should_rotate(self) -> bool:
+        if self._active_size >= self.segment_max_bytes:
+            return True
+        age = time.time() - self._active_started
+        return self._active_size > len(_MAGIC) + 4 and age >= self.segment_max_seconds
+
+    def rotate(self) -> None:
+        """Seals the open segment; the next put starts a new one."""
+        with self._lock:
+            if self._active_path is not None:
+                self._seal_locked()
+
+    def _seal_locked(self) -> None:
+        """Writes the open segment's index sorted by key and marks it read-only. Caller holds the lock."""
+        path = self._active_path
+        for handle in (self._active_file, self._active_index_file):
+            if handle is not None:
+                handle.close()
+        if self._active_reader is not None:
+            self._active_reader.close()
+        entries = b"".join(
+            _INDEX_ENTRY.pack(key, offset, length)
+            for key, (offset, length) in sorted(self._active_index.items())
+        )
+        tmp = path.with_suffix(".idx.tmp")
+        tmp.write_bytes(entries)
+        os.replace(tmp, path.with_suffix(_INDEX_SUFFIX))
+        path.with_suffix(_OPEN_INDEX_SUFFIX).unlink(missing_ok=True)
+        self._sealed.insert(0, _SealedSegment(path))
+        logger.info(f"Page archive segment {path.name} sealed with {len(self._active_index)} pages.")
+        self._active_path, self._active_file, self._active_index_file, self._active_reader = None, None, None, None
+        self._active_index = {}
+        self._active_size = 0
+
+    # ---- leitura --------------------------------------------------------
+
+    def _decode(self, raw: bytes, codec: bytes) -> Tuple[str, bytes, float]:
+        _, comp_len, raw_len, fetched_at, url_len = _RECORD.unpack_from(raw)
+        start = _RECORD.size
+        url = raw[start:start + url_len].decode("utf-8", "replace")
+        payload = raw[start + url_len:start + url_len + comp_len]
+        if codec == _CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("segment is zstd-compressed but 'zstandard' is not installed")
+            body = zstandard.ZstdDecompressor().decompress(payload, max_output_size=raw_len)
+        else:
+            body = zlib.decompress(payload)
+        return url, body, fetched_at
+
+    def get_record(self, url: str) -> Optional[Dict[str, object]]:
+        """Returns {'url', 'body', 'fetched_at'} for the newest archived copy of `url`, or None."""
+        key = url_key(url)
+        with self._lock:
+            hit = self._active_index.get(key)
+            if hit is not None:
+                raw, codec = _read_at(self._active_reader, hit[0], hit[1]), self.codec
+            else:
+                raw = codec = None
+                for segment in self._sealed:
+                    try:
+                        found = segment.lookup(key)
+                        if found is not None:
+                            raw, codec = segment.read(*found), segment.codec
+                            break
+                    except OSError as e:
+                        logger.warning(f"Page archive segment {segment.path.name} unreadable: {e}")
+        if raw is None:
+            return None
+        try:
+            archived_url, body, fetched_at = self._decode(raw, codec)
+        except Exception as e:  # zlib.error, zstandard.ZstdError, struct.error
+            logger.warning(f"Corrupted archive record for {url}: {e}")
+            return None
+        return {"url": archived_url, "body": body, "fetched_at": fetched_at}
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Returns the newest archived body of `url`, or None."""
+        record = self.get_record(url)
+        return record["body"] if record else None
+
+    def iter_pages(self) -> Iterator[Tuple[str, bytes, float]]:
+        """Yields (url, body, fetched_at) for every stored record, oldest segment first."""
+        with self._lock:
+            paths = [s.path for s in reversed(self._sealed)]
+            if self._active_path is not None:
+                self._active_file.flush()
+                paths.append(self._active_path)
+        for path in paths:
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            codec, pos = data[4:8], 8
+            while pos + _RECORD.size <= len(data):
+                _, comp_len, _, _, url_len = _RECORD.unpack_from(data, pos)
+                end = pos + _RECORD.size + url_len + comp_len
+                if end > len(data):
+                    break
+                yield self._decode(data[pos:end], codec)
+                pos = end
+
+    # ---- manutenção -----------------------------------------------------
+
+    def prune(self, cutoff: datetime) -> int:
+        """Deletes sealed segments last written before `cutoff`. Returns how many were removed."""
+        with self._lock:
+            for segment in self._sealed:
+                segment.close()
+            removed = prune_segments(str(self.directory), cutoff)
+            self._sealed = [s for s in self._sealed if s.path.exists()]
+        return removed
+
+    def close(self) -> None:
+        """Closes open files; the open segment stays appendable for the next run."""
+        with self._lock:
+            for handle in (self._active_file, self._active_index_file):
+                if handle is not None:
+                    handle.close()
+            if self._active_reader is not None:
+                self._active_reader.close()
+            self._active_path, self._active_file, self._active_index_file, self._active_reader = None, None, None, None
+            self._active_index = {}
+            for segment in self._sealed:
+                segment.close()
+
+
+def prune_segments(directory: str, cutoff: datetime) -> int:
+    """
+    Deletes sealed segments (and their indexes) last written before
+    `cutoff`. The open segment is never touched, so this is safe while a
+    PageArchive is appending in the same directory.
+    """
+    cutoff_ts = cutoff.timestamp()
+    removed = 0
+    for index_path in Path(directory).glob(f"*{_INDEX_SUFFIX}"):
+        path = index_path.with_suffix(_SEGMENT_SUFFIX)
+        try:
+            if path.exists() and path.stat().st_mtime >= cutoff_ts:
+                continue
+            path.unlink(missing_ok=True)
+            index_path.unlink(missing_ok=True)
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Could not prune archive segment {path.name}: {e}")
+    if removed:
+        logger.info(f"Page archive pruned {removed} segments older than {cutoff.isoformat()}.")
+    return removed
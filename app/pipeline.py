@@ -2,7 +2,8 @@ import logging
 import time
 import random
 from collections import OrderedDict
-from typing import Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
 
 from .config import (
     PIPELINE_ORDER,
@@ -10,13 +11,25 @@ from .config import (
     SCHEDULE_CONFIG,
     WORDPRESS_CONFIG,
     WORDPRESS_CATEGORIES,
+    WORDPRESS_TAG_CONFIG,
     PIPELINE_CONFIG,
+    EXTRACTION_CONFIG,
+    AI_REWRITE_CONFIG,
 )
 from .store import Database
 from .feeds import FeedReader
 from .extractor import ContentExtractor
+from .extraction_cache import ExtractionCache
+from .extraction_pool import ExtractionExecutor
+from .http_cache import HttpCache
+from .http_client import get_http_client
+from .image_probe import ImageProber
+from .image_variants import canonical_key
+from .page_archive import PageArchive
 from .ai_processor import AIProcessor
+from .response_cache import ResponseCache
 from .categorizer import Categorizer
+from .tag_cache import TagCache
 from .wordpress import WordPressClient
 from .html_utils import (
     strip_all_html,
@@ -27,20 +40,102 @@ from .html_utils import (
     remove_broken_image_placeholders,
     strip_naked_internal_links,
 )
-from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
 
 
+def _images_to_upload(extracted_data: Dict[str, Any]) -> List[str]:
+    """Featured image plus the article images, up to 8 (CDN variants of one image count once)."""
+    urls_to_upload = []
+    if featured_url := extracted_data.get('featured_image_url'):
+        urls_to_upload.append(featured_url)
+    for img_url in extracted_data.get('images', []):
+        if canonical_key(img_url) not in {canonical_key(u) for u in urls_to_upload}:
+            urls_to_upload.append(img_url)
+    return urls_to_upload[:8]
+
+
+def _prefetch_on_field(wp_client: WordPressClient, pool: ThreadPoolExecutor, image_urls: List[str],
+                       prefetched: Dict[str, Any]) -> Callable[[str, Any], None]:
+    """
+    on_field callback for a streamed rewrite: looks up the existing tag IDs
+    as soon as the model closes 'tags' and starts the image downloads once
+    'conteudo_final' is closed, while the rest of the response streams in.
+    Only read-only work runs here: tags are created and images uploaded
+    after the response is validated, so a rejected rewrite leaves nothing
+    behind on the site. Results land in `prefetched` as futures.
+    """
+
+    def on_field(name: str, value: Any) -> None:
+        if name == 'tags' and isinstance(value, list):
+            prefetched['tag_ids'] = pool.submit(wp_client.find_tag_ids, value)
+        elif name == 'conteudo_final' and 'images' not in prefetched:
+            prefetched['images'] = {url: pool.submit(wp_client.download_image, url) for url in image_urls}
+
+    return on_field
+
+
 def run_pipeline_cycle():
     """Executes a full cycle of the content processing pipeline."""
     logger.info("Starting new pipeline cycle.")
 
     db = Database()
     feed_reader = FeedReader(user_agent=PIPELINE_CONFIG.get('publisher_name', 'Bot'))
-    extractor = ContentExtractor()
+    image_prober = ImageProber() if EXTRACTION_CONFIG.get('image_probe', True) else None
+    workers = EXTRACTION_CONFIG.get('workers', 1)
+    extraction_executor = None
+    if workers > 1:
+        extraction_executor = ExtractionExecutor(max_workers=workers, probe_images=image_prober is not None)
+    http_cache = None
+    if EXTRACTION_CONFIG.get('http_cache_enabled', True):
+        http_cache = HttpCache(
+            db_path=EXTRACTION_CONFIG.get('http_cache_path', 'data/http_cache.db'),
+            max_bytes=EXTRACTION_CONFIG.get('http_cache_max_mb', 200) * 1024 * 1024,
+            fresh_seconds=EXTRACTION_CONFIG.get('http_cache_fresh_seconds', 3600),
+        )
+    page_archive = None
+    if EXTRACTION_CONFIG.get('page_archive_enabled', True):
+        page_archive = PageArchive(
+            directory=EXTRACTION_CONFIG.get('page_archive_path', 'data/page_archive'),
+            segment_max_bytes=EXTRACTION_CONFIG.get('page_archive_segment_mb', 64) * 1024 * 1024,
+        )
+    result_cache = None
+    if EXTRACTION_CONFIG.get('result_cache_enabled', True):
+        result_cache = ExtractionCache(
+            db_path=EXTRACTION_CONFIG.get('result_cache_path', 'data/extraction_cache.db'),
+            max_bytes=EXTRACTION_CONFIG.get('result_cache_max_mb', 50) * 1024 * 1024,
+        )
+    extractor = ContentExtractor(
+        executor=extraction_executor,
+        http_cache=http_cache,
+        page_archive=page_archive,
+        result_cache=result_cache,
+        image_prober=image_prober,
+    )
+    response_cache = None
+    if AI_REWRITE_CONFIG.get('response_cache_enabled', True):
+        response_cache = ResponseCache(
+            db_path=AI_REWRITE_CONFIG.get('response_cache_path', 'data/ai_cache.db'),
+            max_bytes=AI_REWRITE_CONFIG.get('response_cache_max_mb', 20) * 1024 * 1024,
+            ttl_seconds=AI_REWRITE_CONFIG.get('response_cache_ttl_hours', 168) * 3600,
+        )
     categorizer = Categorizer()
-    wp_client = WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
+    tag_cache = None
+    if WORDPRESS_TAG_CONFIG.get('cache_enabled', True):
+        tag_cache = TagCache(
+            db_path=WORDPRESS_TAG_CONFIG.get('cache_path', 'data/wp_tags.db'),
+            site=(WORDPRESS_CONFIG.get('url') or '').rstrip('/'),
+        )
+    wp_client = WordPressClient(
+        config=WORDPRESS_CONFIG,
+        categories_map=WORDPRESS_CATEGORIES,
+        tag_cache=tag_cache,
+        tag_create_workers=WORDPRESS_TAG_CONFIG.get('create_workers', 4),
+    )
+    wp_client.warm_tag_cache(
+        max_age_seconds=WORDPRESS_TAG_CONFIG.get('sync_hours', 24) * 3600,
+        max_pages=WORDPRESS_TAG_CONFIG.get('sync_max_pages', 100),
+    )
 
     processed_articles_in_cycle = 0
 
@@ -62,7 +157,12 @@ def run_pipeline_cycle():
             category = feed_config['category']
             logger.info(f"Processing feed: {source_id} (Category: {category})")
 
-            ai_processor = AIProcessor(category)
+            ai_processor = AIProcessor(category, response_cache=response_cache)
+            # com streaming, a busca das tags e o download das imagens começam antes de a resposta terminar
+            prefetch_pool = None
+            prefetched_by_url: Dict[str, Dict[str, Any]] = {}
+            if AI_REWRITE_CONFIG['streaming'] and not AI_REWRITE_CONFIG['batch_enabled']:
+                prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch')
 
             try:
                 feed_items = feed_reader.read_feeds(feed_config['urls'], source_id)
@@ -74,33 +174,51 @@ def run_pipeline_cycle():
 
                 logger.info(f"Found {len(new_articles)} new articles for {source_id}")
 
-                for article_data in new_articles[:SCHEDULE_CONFIG.get('max_articles_per_feed', 3)]:
+                batch = new_articles[:SCHEDULE_CONFIG.get('max_articles_per_feed', 3)]
+                # Baixa os artigos do lote e faz o parsing em paralelo no pool de processos
+                extracted_by_url = extractor.extract_many([a['link'] for a in batch])
+
+                # Step 2: Rewrite content with AI, in parallel across the category's keys
+                rewrite_jobs = {}
+                for article_data in batch:
+                    extracted_data = extracted_by_url.get(article_data['link'])
+                    if extracted_data and extracted_data.get('content'):
+                        rewrite_jobs[article_data['link']] = {
+                            'title': extracted_data['title'],
+                            'source_url': article_data['link'],
+                            'content_html': extracted_data['content'],
+                            'domain': wp_client.get_domain(),
+                            'videos': extracted_data.get('videos', []),
+                        }
+                        if prefetch_pool is not None:
+                            prefetched = prefetched_by_url.setdefault(article_data['link'], {})
+                            rewrite_jobs[article_data['link']]['on_field'] = _prefetch_on_field(
+                                wp_client, prefetch_pool, _images_to_upload(extracted_data), prefetched)
+                # artigos curtos podem ir juntos num só pedido (AI_BATCH_REWRITE)
+                rewrite = ai_processor.rewrite_batch if AI_REWRITE_CONFIG['batch_enabled'] else ai_processor.rewrite_many
+                rewritten_by_url = dict(zip(rewrite_jobs, rewrite(list(rewrite_jobs.values()))))
+
+                for article_data in batch:
                     article_db_id = article_data['db_id']
                     try:
-                        logger.info(f"Processing article: {article_data['title']} (DB ID: {article_db_id}) from {source_id}")
+                        # PROCESSING só aqui dentro: se o lote falhar antes, os artigos não ficam presos nesse status
                         db.update_article_status(article_db_id, 'PROCESSING')
+                        logger.info(f"Processing article: {article_data['title']} (DB ID: {article_db_id}) from {source_id}")
 
-                        extracted_data = extractor.extract(article_data['link'])
+                        extracted_data = extracted_by_url.get(article_data['link'])
                         if not extracted_data or not extracted_data.get('content'):
                             logger.warning(f"Failed to extract content from {article_data['link']}")
                             db.update_article_status(article_db_id, 'FAILED', reason="Extraction failed")
                             continue
 
-                        # Step 2: Rewrite content with AI
-                        rewritten_data, failure_reason = ai_processor.rewrite_content(
-                            title=extracted_data['title'],
-                            url=article_data['link'],
-                            content=extracted_data['content'],
-                            domain=wp_client.get_domain(),
-                            videos=extracted_data.get('videos', [])
-                        )
+                        rewritten_data, failure_reason = rewritten_by_url[article_data['link']]
 
                         if not rewritten_data:
                             reason = failure_reason or "AI processing failed"
-                            # Check for the specific case where the key pool for the category is exhausted
-                            if "pool is exhausted" in reason:
+                            # Check for the specific case where every key of the category is unavailable
+                            if "no key available" in reason:
                                 logger.warning(
-                                    f"{feed_config['category']} pool exhausted → marking article FAILED → moving on."
+                                    f"{feed_config['category']} has no API key available → marking article FAILED → moving on."
                                 )
                             else:
                                 logger.warning(f"Article '{article_data['title']}' marked as FAILED (Reason: {reason}). Continuing to next article.")
@@ -127,20 +245,20 @@ def run_pipeline_cycle():
                         )
                         
                         # 3.3: Collect and upload up to 8 priority images
-                        urls_to_upload = []
-                        if featured_url := extracted_data.get('featured_image_url'):
-                            urls_to_upload.append(featured_url)
-                        for img_url in extracted_data.get('images', []):
-                            if img_url not in urls_to_upload:
-                                urls_to_upload.append(img_url)
-                        
-                        urls_to_upload = urls_to_upload[:8]
+                        # (variantes da mesma imagem na CDN contam uma vez só)
+                        urls_to_upload = _images_to_upload(extracted_data)
+                        prefetched = prefetched_by_url.get(article_data['link'], {})
+                        prefetched_images: Dict[str, Future] = prefetched.get('images', {})
 
                         uploaded_src_map = {}
                         uploaded_id_map = {}
                         logger.info(f"Attempting to upload up to {len(urls_to_upload)} images.")
                         for url in urls_to_upload:
-                            media = wp_client.upload_media_from_url(url, final_title)
+                            if url in prefetched_images:
+                                image = prefetched_images[url].result()
+                                media = wp_client.upload_image(image[0], image[1], url, final_title) if image else None
+                            else:
+                                media = wp_client.upload_media_from_url(url, final_title)
                             if media and media.get("source_url") and media.get("id"):
                                 # Normalize URL to handle potential trailing slashes as keys
                                 k = url.rstrip('/')
@@ -175,6 +293,10 @@ def run_pipeline_cycle():
                             'tags': rewritten_data.get('tags', []),
                             'featured_media': featured_media_id,
                         }
+                        # tags já existentes achadas durante o streaming; as que faltam são criadas agora
+                        if 'tag_ids' in prefetched:
+                            post_payload['tag_ids'] = wp_client.get_tag_ids(
+                                post_payload['tags'], known=prefetched['tag_ids'].result())
 
                         wp_post_id = wp_client.create_post(post_payload)
 
@@ -203,6 +325,10 @@ def run_pipeline_cycle():
             except Exception as e:
                 logger.error(f"Error processing feed {source_id}: {e}", exc_info=True)
                 db.increment_consecutive_failures(source_id)
+            finally:
+                ai_processor.close()
+                if prefetch_pool is not None:
+                    prefetch_pool.shutdown(wait=True)
 
             # Per-feed delay before processing the next source
             if i < len(PIPELINE_ORDER) - 1:
@@ -214,4 +340,17 @@ def run_pipeline_cycle():
     finally:
         logger.info(f"Pipeline cycle completed. Processed {processed_articles_in_cycle} articles.")
         db.close()
-        wp_client.close()
\ No newline at end of file
+        wp_client.close()
+        if extraction_executor is not None:
+            extraction_executor.shutdown()
+        if http_cache is not None:
+            http_cache.close()
+        if page_archive is not None:
+            page_archive.close()
+        if result_cache is not None:
+            result_cache.close()
+        if response_cache is not None:
+            response_cache.close()
+        if tag_cache is not None:
+            tag_cache.close()
+        get_http_client().log_metrics()
\ No newline at end of file
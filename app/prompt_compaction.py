@@ -0,0 +1,169 @@
+"""
+Prompt input compaction.
+
+The extracted article HTML keeps every attribute, class, srcset and wrapper
+of the source page, and most of its tokens are markup the model does not
+need. compact_article_html reduces it to bare semantic tags (paragraphs,
+headings, lists, quotes, figures) and swaps each image URL for a short id
+(src="IMG_1"); restore_image_ids puts the real URLs back into the
+rewritten content after the response.
+"""
+
+from __future__ import annotations
+
+import re
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from .lazy_import import lazy_import
+
+bs4 = lazy_import('bs4')
+
+# Tags mantidas (sem atributos); as demais são desembrulhadas e só o texto fica
+KEEP_TAGS = {
+    'p', 'h2', 'h3', 'h4', 'h5', 'ul', 'ol', 'li', 'blockquote',
+    'figure', 'figcaption', 'table', 'tr', 'th', 'td', 'br',
+}
+DROP_TAGS = ['script', 'style', 'noscript', 'svg', 'button', 'form', 'input', 'select', 'template']
+IMAGE_ID_PREFIX = 'IMG_'
+
+_IMG_ID_SRC_RX = re.compile(r'''(\bsrc\s*=\s*)(["'])(IMG_\d+)\2''')
+_LEFTOVER_IMG_RX = re.compile(r'''<img\b[^>]*\bsrc\s*=\s*(["'])IMG_\d+\1[^>]*>''', re.IGNORECASE)
+_BLANK_RX = re.compile(r'\s+')
+_H2_TEXT_RX = re.compile(r'<h2>(.*?)</h2>', re.DOTALL)
+_TAG_RX = re.compile(r'<[^>]+>')
+
+
+def _image_src(img: bs4.Tag) -> Optional[str]:
+    for attr in ('src', 'data-src', 'data-lazy-src'):
+        value = (img.get(attr) or '').strip()
+        if value and not value.startswith('data:'):
+            return value
+    return None
+
+
+def compact_article_html(html: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Reduces article HTML to a minimal semantic form for the prompt.
+
+    Returns:
+        The compact HTML and the {image id: original URL} map.
+    """
+    if not html:
+        return "", {}
+    soup = bs4.BeautifulSoup(html, "lxml")
+    root = soup.body or soup
+    id_by_url: Dict[str, str] = {}
+
+    for node in root.find_all(string=lambda s: isinstance(s, bs4.Comment)):
+        node.extract()
+    for tag in root.find_all(DROP_TAGS):
+        tag.decompose()
+
+    for tag in list(root.find_all(True)):
+        if tag.decomposed:
+            continue
+        if tag.name == 'img':
+            src = _image_src(tag)
+            if not src:
+                tag.decompose()
+                continue
+            image_id = id_by_url.setdefault(src, f"{IMAGE_ID_PREFIX}{len(id_by_url) + 1}")
+            alt = (tag.get('alt') or '').strip()
+            tag.attrs = {'src': image_id, **({'alt': alt} if alt else {})}
+        elif tag.name == 'iframe':
+            src = (tag.get('src') or '').strip()
+            # só embeds do YouTube interessam ao prompt (os vídeos vão em videos_list)
+            if 'youtube' in src or 'youtu.be' in src:
+                tag.attrs = {'src': src}
+                tag.clear()
+            else:
+                tag.decompose()
+        elif tag.name in KEEP_TAGS:
+            tag.attrs = {}
+        else:
+            tag.unwrap()
+
+    # elementos que ficaram vazios (wrappers, legendas sem texto) só custam tokens
+    for tag in reversed(root.find_all(True)):
+        if tag.decomposed:
+            continue
+        if tag.name not in ('img', 'iframe', 'br') and not tag.get_text(strip=True) and not tag.find(['img', 'iframe']):
+            tag.decompose()
+
+    for node in root.find_all(string=True):
+        if isinstance(node, bs4.NavigableString):
+            collapsed = _BLANK_RX.sub(' ', str(node))
+            if collapsed != str(node):
+                node.replace_with(collapsed)
+
+    compact = root.decode_contents() if root is not soup else str(soup)
+    # espaços entre blocos não carregam informação
+    compact = re.sub(r'>\s+<', '><', compact).strip()
+    return compact, {image_id: url for url, image_id in id_by_url.items()}
+
+
+def restore_image_ids(html: str, id_map: Dict[str, str]) -> str:
+    """
+    Replaces image ids in src attributes with their original URLs; images
+    whose id is unknown (invented by the model) are removed.
+    """
+    if not html or IMAGE_ID_PREFIX not in html:
+        return html
+
+    def _sub(match: re.Match) -> str:
+        url = id_map.get(match.group(3))
+        return f'{match.group(1)}{match.group(2)}{url}{match.group(2)}' if url else match.group(0)
+
+    html = _IMG_ID_SRC_RX.sub(_sub, html)
+    return _LEFTOVER_IMG_RX.sub('', html)
+
+
+def restore_alt_text_keys(alt_texts: Dict[str, str], id_map: Dict[str, str]) -> Dict[str, str]:
+    """Maps image_alt_texts keys given as image ids back to the image file names."""
+    restored = {}
+    for key, text in (alt_texts or {}).items():
+        url = id_map.get(str(key).strip())
+        restored[url.rstrip('/').rsplit('/', 1)[-1].split('?')[0] if url else key] = text
+    return restored
+
+
+def split_sections(html: str, max_chars: int) -> List[str]:
+    """
+    Splits compact article HTML into consecutive chunks of up to about
+    `max_chars`, cutting before <h2> headings; a section longer than that
+    by itself is cut between its top-level blocks (never inside one).
+    """
+    soup = bs4.BeautifulSoup(html or "", "html.parser")
+    sections: List[List[str]] = [[]]
+    for node in soup.contents:
+        text = node.decode() if isinstance(node, bs4.Tag) else escape(str(node), quote=False)
+        if not text.strip():
+            continue
+        if isinstance(node, bs4.Tag) and node.name == 'h2' and sections[-1]:
+            sections.append([])
+        sections[-1].append(text)
+
+    chunks: List[str] = []
+    current = ''
+    for blocks in sections:
+        section = ''.join(blocks)
+        if current and len(current) + len(section) > max_chars:
+            chunks.append(current)
+            current = ''
+        if len(section) <= max_chars:
+            current += section
+            continue
+        for block in blocks:
+            if current and len(current) + len(block) > max_chars:
+                chunks.append(current)
+                current = ''
+            current += block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def section_headings(html: str) -> List[str]:
+    """Plain text of the <h2> headings of compact article HTML."""
+    return [_TAG_RX.sub('', h).strip() for h in _H2_TEXT_RX.findall(html or '')]
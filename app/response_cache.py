@@ -0,0 +1,132 @@
+"""
+Persistent cache of AI rewrites.
+
+The same article used to be paid for twice. Responses are stored in
+SQLite as zlib-compressed JSON under a hash of the compacted article text
+(image URLs already replaced by ids, so copies on other CDNs match), the
+other prompt fields (original title and URL are echoed in the output, so a
+syndicated copy under another title is a different entry), the prompt
+template version, the model and the generation config. Entries expire after a TTL and the least
+recently used ones are evicted beyond a size limit.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def response_key(content: str, prompt_version: str, model: str,
+                 generation_config: Dict[str, Any], context: str = "") -> str:
+    """Hash identifying one rewrite: prompt version, model, generation config, context and article text."""
+    h = hashlib.sha256()
+    for part in (prompt_version, model, json.dumps(generation_config, sort_keys=True), context):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(" ".join(content.split()).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of compressed AI responses with TTL and LRU eviction by size."""
+
+    def __init__(self, db_path: str = 'data/ai_cache.db', max_bytes: int = 20 * 1024 * 1024,
+                 ttl_seconds: int = 7 * 24 * 3600):
+        """
+        Args:
+            db_path: Path to the SQLite file.
+            max_bytes: Maximum total size of the compressed responses.
+            ttl_seconds: Age after which an entry is no longer used.
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ai_response_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_access ON ai_response_cache(last_access)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached response for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response FROM ai_response_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE ai_response_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Corrupted AI response cache entry {key[:12]}: {e}")
+            self.delete(key)
+            return None
+
+    def put(self, key: str, model: str, response: Dict[str, Any]) -> None:
+        """Stores a response and evicts expired and old entries if needed."""
+        blob = zlib.compress(json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ai_response_cache (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def delete(self, key: str) -> None:
+        """Removes the entry for `key`, if any."""
+        with self._lock:
+            self.conn.execute("DELETE FROM ai_response_cache WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drops expired entries, then least recently used ones until the size fits. Caller holds the lock."""
+        self.conn.execute("DELETE FROM ai_response_cache WHERE created_at <= ?", (now - self.ttl_seconds,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_response_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self.conn.execute("SELECT key, size FROM ai_response_cache ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM ai_response_cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"AI response cache evicted {evicted} entries (LRU) to stay under {self.max_bytes} bytes.")
+
+    def close(self) -> None:
+        """Closes the database connection and logs the hit rate."""
+        with self._lock:
+            if self.conn:
+                if self.hits or self.misses:
+                    logger.info(f"AI response cache: {self.hits} hits, {self.misses} misses.")
+                self.conn.close()
+                self.conn = None
@@ -13,6 +13,36 @@ from .config import PIPELINE_ORDER
 
 logger = logging.getLogger(__name__)
 
+# Colunas acrescentadas depois da versão original de api_key_status (app/keys.py)
+API_KEY_STATUS_EXTRA_COLUMNS = {
+    'failures': 'INTEGER NOT NULL DEFAULT 0',
+    'minute_started': 'REAL',
+    'minute_count': 'INTEGER NOT NULL DEFAULT 0',
+    'minute_tokens': 'INTEGER NOT NULL DEFAULT 0',
+    'usage_day': 'TEXT',
+    'day_count': 'INTEGER NOT NULL DEFAULT 0',
+    'last_used': 'REAL',
+    'last_error': 'TEXT',
+}
+
+
+def migrate_api_key_status(conn: sqlite3.Connection) -> None:
+    """Creates api_key_status and adds the usage/health columns missing from older databases."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS api_key_status (
+            key_hash TEXT PRIMARY KEY,
+            api_key TEXT NOT NULL,
+            category TEXT NOT NULL,
+            is_valid BOOLEAN DEFAULT 1,
+            cooldown_until DATETIME
+        )
+    ''')
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(api_key_status)")}
+    for column, decl in API_KEY_STATUS_EXTRA_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE api_key_status ADD COLUMN {column} {decl}")
+
+
 class Database:
     """Handles all database operations for the application."""
 
@@ -91,15 +121,7 @@ class Database:
                 cursor.execute("INSERT OR IGNORE INTO feed_status (source_id) VALUES (?)", (feed_id,))
 
             # Tabela para gerenciar o status e cooldown das chaves de API
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS api_key_status (
-                    key_hash TEXT PRIMARY KEY,
-                    api_key TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    is_valid BOOLEAN DEFAULT 1,
-                    cooldown_until DATETIME
-                )
-            ''')
+            migrate_api_key_status(self.conn)
 
             # Tabela para rastrear o uso da API para o dashboard
             cursor.execute('''
@@ -0,0 +1,126 @@
+"""
+Persistent slug -> ID cache of the WordPress tags.
+
+create_post used to resolve every tag with a GET /tags?slug= and often a
+POST, 10-20 sequential round-trips per post. TagCache keeps the mapping in
+SQLite per site, so the usual post costs zero tag requests: the client
+warms it by paging /tags at startup (WordPressClient.warm_tag_cache),
+which replaces the site's rows so deleted tags drop out, and adds every
+tag it looks up or creates in between. A 'term_exists' answer means the
+cache missed a tag the site has, so it marks the cache stale and the next
+warm-up pages everything again.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+class TagCache:
+    """SQLite store of WordPress tag IDs by slug, with the time of the last full sync per site."""
+
+    def __init__(self, db_path: str = 'data/wp_tags.db', site: str = ''):
+        """
+        Args:
+            db_path: Path to the SQLite file.
+            site: Identifies the WordPress site (its API URL), so one file can serve several.
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.site = site
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS wp_tag_cache (
+                site TEXT NOT NULL,
+                slug TEXT NOT NULL,
+                tag_id INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (site, slug)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS wp_tag_sync (
+                site TEXT PRIMARY KEY,
+                synced_at REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def get_many(self, slugs: Iterable[str]) -> Dict[str, int]:
+        """Returns {slug: tag_id} for the cached slugs among `slugs`."""
+        slugs = list(dict.fromkeys(slugs))
+        found: Dict[str, int] = {}
+        with self._lock:
+            # limite de variáveis do SQLite: consulta em blocos
+            for i in range(0, len(slugs), 500):
+                chunk = slugs[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT slug, tag_id FROM wp_tag_cache WHERE site = ? AND slug IN ({','.join('?' * len(chunk))})",
+                    (self.site, *chunk),
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, tag_ids: Dict[str, int]) -> None:
+        """Stores (or updates) the IDs of the given slugs."""
+        if not tag_ids:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO wp_tag_cache (site, slug, tag_id, updated_at) VALUES (?, ?, ?, ?)",
+                [(self.site, slug, tag_id, now) for slug, tag_id in tag_ids.items()],
+            )
+            self.conn.commit()
+
+    def replace_all(self, tag_ids: Dict[str, int]) -> None:
+        """
+        Replaces every cached tag of the site with `tag_ids` (a full listing)
+        and records the sync, in one transaction: tags deleted on the site drop out.
+        """
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM wp_tag_cache WHERE site = ?", (self.site,))
+                self.conn.executemany(
+                    "INSERT INTO wp_tag_cache (site, slug, tag_id, updated_at) VALUES (?, ?, ?, ?)",
+                    [(self.site, slug, tag_id, now) for slug, tag_id in tag_ids.items()],
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO wp_tag_sync (site, synced_at) VALUES (?, ?)", (self.site, now)
+                )
+
+    def synced_at(self) -> Optional[float]:
+        """When the last full sync of this site finished (None if never or invalidated)."""
+        with self._lock:
+            row = self.conn.execute("SELECT synced_at FROM wp_tag_sync WHERE site = ?", (self.site,)).fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self) -> None:
+        """Records that every tag of the site was just loaded."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO wp_tag_sync (site, synced_at) VALUES (?, ?)", (self.site, time.time())
+            )
+            self.conn.commit()
+
+    def invalidate(self) -> None:
+        """Forgets the last sync, so the next warm-up reloads all tags (cached IDs stay usable)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM wp_tag_sync WHERE site = ?", (self.site,))
+            self.conn.commit()
+
+    def count(self) -> int:
+        """Number of cached tags of this site."""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM wp_tag_cache WHERE site = ?", (self.site,)).fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
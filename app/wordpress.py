@@ -2,28 +2,39 @@
 WordPress client for publishing content via the REST API.
 """
 
+from __future__ import annotations
+
 import logging
-import httpx
 import os
-from typing import List, Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import mimetypes
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
 from slugify import slugify
 
+from .http_client import get_http_client
+from .lazy_import import lazy_import
+from .tag_cache import TagCache
+
+httpx = lazy_import('httpx')
+
 logger = logging.getLogger(__name__)
 
 
 class WordPressClient:
     """Handles communication with the WordPress REST API."""
 
-    def __init__(self, config: Dict[str, Any], categories_map: Dict[str, int]):
+    def __init__(self, config: Dict[str, Any], categories_map: Dict[str, int],
+                 tag_cache: Optional[TagCache] = None, tag_create_workers: int = 4):
         """
         Initializes the WordPress client.
 
         Args:
             config: Dictionary with 'url', 'user', and 'password'.
             categories_map: Dictionary mapping category names to IDs.
+            tag_cache: Persistent slug -> ID cache of the tags (optional).
+            tag_create_workers: Missing tags created in parallel.
         """
         if not config.get('url') or not config.get('user') or not config.get('password'):
             raise ValueError("WordPress URL, user, and password must be provided.")
@@ -31,9 +42,16 @@ class WordPressClient:
         raw_url = config['url'].rstrip('/')
         self.auth = (config['user'], config['password'])
         self.categories_map = categories_map
-        self.client = httpx.Client(auth=self.auth, timeout=30.0, follow_redirects=True)
+        self.tag_cache = tag_cache
+        self.tag_create_workers = max(1, tag_create_workers)
+        self.http = get_http_client()
         self.base_url = self._get_final_url(raw_url)
 
+    def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Authenticated request to the WordPress API through the shared HTTP client."""
+        kwargs.setdefault('timeout', 30.0)
+        return self.http.request(method, url, auth=self.auth, **kwargs)
+
     def _get_final_url(self, url: str) -> str:
         """
         Resolves any redirects to get the final, canonical URL for the API.
@@ -41,7 +59,7 @@ class WordPressClient:
         """
         try:
             # Make a HEAD request to efficiently get the final URL after redirects
-            response = self.client.head(url)
+            response = self._request('HEAD', url)
             final_url = str(response.url)
             if url != final_url:
                 logger.warning(f"WordPress URL redirected from {url} to {final_url}. Using final URL.")
@@ -58,61 +76,162 @@ class WordPressClient:
         except Exception:
             return self.base_url
 
-    def _get_tag_id(self, tag_name: str) -> Optional[int]:
+    def warm_tag_cache(self, max_age_seconds: float = 24 * 3600, max_pages: int = 100) -> int:
         """
-        Gets the ID of a tag, creating it if it doesn't exist.
+        Loads every tag of the site into the tag cache (GET /tags, 100 per page),
+        unless the last full load is more recent than `max_age_seconds`. A
+        complete listing replaces the cached tags, so deleted tags drop out.
 
-        Args:
-            tag_name: The name of the tag.
+        Returns:
+            The number of tags loaded (0 if the cache is fresh or disabled, or the listing failed).
+        """
+        if not self.tag_cache:
+            return 0
+        synced_at = self.tag_cache.synced_at()
+        if synced_at and time.time() - synced_at < max_age_seconds:
+            return 0
+
+        site_tags: Dict[str, int] = {}
+        page, total_pages = 1, 1
+        while page <= min(total_pages, max_pages):
+            try:
+                response = self._request('GET', f"{self.base_url}/tags",
+                                         params={'per_page': 100, 'page': page, '_fields': 'id,slug'})
+                response.raise_for_status()
+                tags = response.json()
+            except (httpx.RequestError, httpx.HTTPStatusError, ValueError) as e:
+                # cache intacto e sem marcar como sincronizado: a próxima execução tenta de novo
+                logger.error(f"Failed to load page {page} of the WordPress tags: {e}")
+                return 0
+            site_tags.update({tag['slug']: tag['id'] for tag in tags if tag.get('slug')})
+            if not tags:
+                break
+            total_pages = int(response.headers.get('X-WP-TotalPages', page))
+            page += 1
+        if total_pages > max_pages:
+            # listagem parcial: não dá para saber o que foi apagado, só acrescenta
+            logger.warning(f"Tag cache warm-up stopped at {max_pages} of {total_pages} pages.")
+            self.tag_cache.put_many(site_tags)
+            self.tag_cache.mark_synced()
+        else:
+            self.tag_cache.replace_all(site_tags)
+        logger.info(f"Tag cache warmed with {len(site_tags)} tags.")
+        return len(site_tags)
+
+    def _lookup_tags(self, slugs: List[str]) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Finds existing tags by slug, 100 per request (slug[]=...).
 
         Returns:
-            The ID of the tag, or None if it cannot be found or created.
+            ({slug: id} of the tags found, slugs whose lookup failed).
         """
-        tag_slug = slugify(tag_name)
-        if not tag_slug:
-            return None
+        found: Dict[str, int] = {}
+        failed: List[str] = []
+        for i in range(0, len(slugs), 100):
+            chunk = slugs[i:i + 100]
+            try:
+                response = self._request('GET', f"{self.base_url}/tags",
+                                         params={'slug[]': chunk, 'per_page': 100, '_fields': 'id,slug'})
+                response.raise_for_status()
+                found.update({tag['slug']: tag['id'] for tag in response.json() if tag.get('slug') in chunk})
+            except (httpx.RequestError, httpx.HTTPStatusError, ValueError) as e:
+                logger.error(f"Error searching for tags {chunk}: {e}")
+                failed.extend(chunk)
+        return found, failed
 
-        # 1. Try to find the tag by slug
-        try:
-            response = self.client.get(f"{self.base_url}/tags", params={'slug': tag_slug})
-            if response.status_code == 200 and response.json():
-                return response.json()[0]['id']
-        except (httpx.RequestError, ValueError) as e:
-            logger.error(f"Error searching for tag '{tag_name}': {e}")
+    def _create_tag(self, tag_name: str, tag_slug: str) -> Optional[int]:
+        """
+        Creates a tag.
 
-        # 2. If not found, create it
+        Returns:
+            The ID of the new (or already existing) tag, or None on failure.
+        """
         try:
-            response = self.client.post(f"{self.base_url}/tags", json={'name': tag_name, 'slug': tag_slug})
+            response = self._request('POST', f"{self.base_url}/tags", json={'name': tag_name, 'slug': tag_slug})
             if response.status_code == 201:
                 logger.info(f"Successfully created tag '{tag_name}'")
                 return response.json()['id']
-            # Handle case where tag exists but slug search failed (e.g., due to cache)
+            # Handle case where tag exists but the lookup missed it (e.g., slug generated differently)
             elif response.status_code == 400 and response.json().get('code') == 'term_exists':
                 logger.warning(f"Tag '{tag_name}' already exists. Retrieving its ID.")
+                if self.tag_cache:
+                    # o cache não conhecia uma tag do site: recarrega tudo no próximo warm-up
+                    self.tag_cache.invalidate()
                 return response.json()['data']['term_id']
             else:
                 logger.error(f"Failed to create tag '{tag_name}': {response.status_code} - {response.text}")
                 return None
-        except (httpx.RequestError, ValueError) as e:
+        except (httpx.RequestError, ValueError, KeyError) as e:
             logger.error(f"Exception while creating tag '{tag_name}': {e}")
             return None
 
-    def _get_tag_ids(self, tag_names: List[str]) -> List[int]:
+    def _find_tags(self, names_by_slug: Dict[str, str]) -> Tuple[Dict[str, int], List[str]]:
+        """Cache, then slug[] lookup (found tags are cached); returns ({slug: id}, slugs whose lookup failed)."""
+        ids = self.tag_cache.get_many(names_by_slug) if self.tag_cache else {}
+        missing = [slug for slug in names_by_slug if slug not in ids]
+        if not missing:
+            return ids, []
+        found, failed = self._lookup_tags(missing)
+        if self.tag_cache:
+            self.tag_cache.put_many(found)
+        ids.update(found)
+        return ids, failed
+
+    @staticmethod
+    def _names_by_slug(tag_names: List[str]) -> Dict[str, str]:
+        names_by_slug: Dict[str, str] = {}
+        for name in tag_names:
+            tag_slug = slugify(name)
+            if tag_slug:
+                names_by_slug.setdefault(tag_slug, name)
+        return names_by_slug
+
+    def find_tag_ids(self, tag_names: List[str]) -> Dict[str, int]:
         """
-        Converts a list of tag names to a list of tag IDs.
+        Resolves the tags that already exist, without creating any (read-only
+        on the site, safe to run before the post is known to be published).
+
+        Returns:
+            {slug: tag ID} of the tags found.
+        """
+        return self._find_tags(self._names_by_slug(tag_names))[0]
+
+    def get_tag_ids(self, tag_names: List[str], known: Optional[Dict[str, int]] = None) -> List[int]:
+        """
+        Converts a list of tag names to a list of tag IDs, creating the missing tags.
+
+        Cached slugs cost no request; the others are looked up in one
+        request and whatever is still missing is created in parallel. Tags
+        whose lookup failed are left out rather than created blindly.
 
         Args:
             tag_names: A list of tag names.
+            known: {slug: tag ID} already resolved (e.g. by find_tag_ids).
 
         Returns:
-            A list of corresponding tag IDs.
+            A list of corresponding tag IDs (without duplicates).
         """
-        tag_ids = []
-        for name in tag_names:
-            tag_id = self._get_tag_id(name)
-            if tag_id:
-                tag_ids.append(tag_id)
-        return tag_ids
+        names_by_slug = self._names_by_slug(tag_names)
+        if not names_by_slug:
+            return []
+
+        ids = {slug: tag_id for slug, tag_id in (known or {}).items() if slug in names_by_slug}
+        unresolved = {slug: name for slug, name in names_by_slug.items() if slug not in ids}
+        if unresolved:
+            found, failed = self._find_tags(unresolved)
+            ids.update(found)
+            # sem a busca não dá para saber se a tag existe: criar daria term_exists em série
+            missing = [slug for slug in unresolved if slug not in found and slug not in failed]
+            if missing:
+                workers = min(len(missing), self.tag_create_workers)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = pool.map(lambda slug: self._create_tag(names_by_slug[slug], slug), missing)
+                    created = {slug: tag_id for slug, tag_id in zip(missing, results) if tag_id}
+                if self.tag_cache:
+                    self.tag_cache.put_many(created)
+                ids.update(created)
+
+        return list(dict.fromkeys(ids[slug] for slug in names_by_slug if slug in ids))
     
     def _ensure_media(self, url: str, post_title: str) -> Optional[int]:
         """
@@ -144,12 +263,25 @@ class WordPressClient:
         Returns:
             A dictionary with 'id' and 'source_url' of the uploaded image, or None on failure.
         """
+        image = self.download_image(image_url)
+        if image is None:
+            return None
+        return self.upload_image(image[0], image[1], image_url, post_title)
+
+    def download_image(self, image_url: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Downloads an image from its source (read-only: nothing is written to WordPress).
+
+        Returns:
+            (image bytes, content type), or None on failure.
+        """
         if not image_url:
             return None
 
         try:
             logger.info(f"Downloading image for upload: {image_url}")
-            with self.client.stream("GET", image_url, timeout=20.0) as response:
+            # Download da CDN de origem: sem as credenciais do WordPress
+            with self.http.stream("GET", image_url, timeout=20.0) as response:
                 response.raise_for_status()
                 image_data = response.read()
                 content_type = response.headers.get('content-type', 'image/jpeg')
@@ -160,7 +292,16 @@ class WordPressClient:
         if not image_data:
             logger.warning(f"Downloaded image from {image_url} is empty.")
             return None
+        return image_data, content_type
+
+    def upload_image(self, image_data: bytes, content_type: str, image_url: str,
+                     post_title: str) -> Optional[Dict[str, Any]]:
+        """
+        Uploads downloaded image bytes to the media library, with the post title as alt text and title.
 
+        Returns:
+            A dictionary with 'id' and 'source_url' of the uploaded image, or None on failure.
+        """
         parsed_url = urlparse(image_url)
         filename = os.path.basename(parsed_url.path) or f"{slugify(post_title)}.jpg"
 
@@ -172,7 +313,7 @@ class WordPressClient:
 
         try:
             logger.info(f"Uploading image '{filename}' to WordPress.")
-            upload_response = self.client.post(media_endpoint, content=image_data, headers=headers, timeout=60.0)
+            upload_response = self._request('POST', media_endpoint, content=image_data, headers=headers, timeout=60.0)
             upload_response.raise_for_status()
 
             media_data = upload_response.json()
@@ -181,7 +322,7 @@ class WordPressClient:
 
             # Update alt text and title for SEO
             update_payload = {'alt_text': post_title, 'title': post_title}
-            self.client.post(f"{media_endpoint}/{media_id}", json=update_payload)
+            self._request('POST', f"{media_endpoint}/{media_id}", json=update_payload)
 
             return {
                 'id': media_id,
@@ -224,10 +365,12 @@ class WordPressClient:
         else:
             logger.warning(f"Post '{post_title}' will be created without a featured image.")
 
-        # Resolve tag names to IDs
+        # Resolve tag names to IDs (or use the IDs already resolved by the caller)
         tag_names = post_data.get('tags', [])
-        if tag_names:
-            payload['tags'] = self._get_tag_ids(tag_names)
+        if post_data.get('tag_ids') is not None:
+            payload['tags'] = post_data['tag_ids']
+        elif tag_names:
+            payload['tags'] = self.get_tag_ids(tag_names)
 
         # Copy other relevant fields from post_data to the payload
         for key in ['title', 'content', 'excerpt', 'categories', 'meta']:
@@ -237,7 +380,7 @@ class WordPressClient:
         logger.info(f"Creating WordPress post: {payload.get('title')}")
 
         try:
-            response = self.client.post(endpoint, json=payload, timeout=45.0)
+            response = self._request('POST', endpoint, json=payload, timeout=45.0)
             response.raise_for_status()
 
             created_post = response.json()
@@ -265,7 +408,7 @@ class WordPressClient:
         endpoint = f"{self.base_url}/media/{media_id}"
         payload = {"alt_text": alt_text}
         try:
-            response = self.client.post(endpoint, json=payload, timeout=20.0)
+            response = self._request('POST', endpoint, json=payload, timeout=20.0)
             response.raise_for_status()
             logger.info(f"Successfully set alt text for media ID {media_id}.")
             return True
@@ -289,7 +432,7 @@ class WordPressClient:
         endpoint = f"{self.base_url}/search"
         params = {"search": search_term, "per_page": limit, "subtype": "post"}
         try:
-            response = self.client.get(endpoint, params=params, timeout=15.0)
+            response = self._request('GET', endpoint, params=params, timeout=15.0)
             response.raise_for_status()
             results = response.json()
             # The search endpoint returns a list of objects with title and url
@@ -302,7 +445,8 @@ class WordPressClient:
             return []
 
     def close(self):
-        """Closes the httpx client session."""
-        if self.client and not self.client.is_closed:
-            self.client.close()
-            logger.info("WordPress client connection closed.")
+        """
+        Releases the client. Connections belong to the shared HTTP pool
+        (app/http_client.py), which stays open for the next cycle.
+        """
+        logger.info("WordPress client released; shared HTTP pool stays open.")
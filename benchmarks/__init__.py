@@ -0,0 +1,3 @@
+"""
+Benchmarks for the RSS to WordPress Automation System
+"""
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extração: latência por artigo do corpus salvo em tests/fixtures.
+
+Compara o fast path dos perfis por site (app/site_profiles.py) com o caminho
+genérico (trafilatura), sem acessar a rede. Com --workers, mede também a
+vazão (páginas/s) do pool de processos (app/extraction_pool.py). Com
+--archive, usa as páginas reais guardadas pelo app/page_archive.py.
+
+Uso:
+    python -m benchmarks.bench_extraction [--repeat N] [--workers N] [--archive DIR [--limit N]]
+"""
+
+import argparse
+import logging
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.extraction_pool import ExtractionExecutor  # noqa: E402
+from app.extractor import ContentExtractor  # noqa: E402
+from app.page_archive import PageArchive  # noqa: E402
+
+CORPUS_DIR = ROOT / 'tests' / 'fixtures'
+
+
+def load_archive(directory, limit):
+    """Retorna [(nome, url, html)] com a cópia mais recente de até `limit` páginas arquivadas."""
+    archive = PageArchive(directory=directory)
+    try:
+        latest = {url: body for url, body, _ in archive.iter_pages()}
+    finally:
+        archive.close()
+    items = list(latest.items())[-limit:]
+    return [(url.rstrip('/').rsplit('/', 1)[-1][:32], url, body) for url, body in items]
+
+
+def load_corpus():
+    """Retorna [(nome, url, html)] de todas as páginas do corpus."""
+    pages = []
+    for path in sorted(CORPUS_DIR.glob('*/*.html')):
+        html = path.read_text(encoding='utf-8')
+        m = re.search(r'rel="canonical" href="([^"]+)"', html)
+        if m:
+            pages.append((path.name, m.group(1), html))
+    return pages
+
+
+def time_extract(extractor, url, html, repeat):
+    """Mediana (ms) de `repeat` execuções de extractor.extract, após uma execução de aquecimento descartada."""
+    samples = []
+    with patch.object(extractor, '_fetch_page', return_value=(html, None)):
+        extractor.extract(url)  # aquece caches de seletores/parsers; não entra na amostra
+        for _ in range(repeat):
+            start = time.perf_counter()
+            extractor.extract(url)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_throughput(pages, workers, repeat):
+    """Páginas/s do parsing inline vs. no pool com `workers` processos."""
+    batch = [(html if isinstance(html, bytes) else html.encode('utf-8'), url) for _, url, html in pages] * repeat
+    inline = ContentExtractor(use_site_profiles=False)
+    start = time.perf_counter()
+    for html, url in batch:
+        inline.parse(html, url)
+    inline_rate = len(batch) / (time.perf_counter() - start)
+
+    executor = ExtractionExecutor(max_workers=workers, use_site_profiles=False)
+    try:
+        executor.parse_many(batch[:workers])  # aquece os workers
+        start = time.perf_counter()
+        executor.parse_many(batch)
+        pool_rate = len(batch) / (time.perf_counter() - start)
+    finally:
+        executor.shutdown()
+    print(f"\nthroughput over {len(batch)} pages: inline {inline_rate:.1f}/s, "
+          f"pool({workers}) {pool_rate:.1f}/s ({pool_rate / inline_rate:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-article extraction latency')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per article (median is reported)')
+    parser.add_argument('--workers', type=int, default=0, help='Also measure process-pool throughput')
+    parser.add_argument('--archive', help='Use pages from this page archive directory instead of the fixtures')
+    parser.add_argument('--limit', type=int, default=50, help='Max archived pages to load')
+    args = parser.parse_args()
+    pages = load_archive(args.archive, args.limit) if args.archive else load_corpus()
+
+    logging.disable(logging.CRITICAL)
+    profiled = ContentExtractor(use_site_profiles=True)
+    generic = ContentExtractor(use_site_profiles=False)
+
+    print(f"{'article':<32} {'profile ms':>11} {'generic ms':>11} {'speedup':>8}")
+    totals = [0.0, 0.0]
+    for name, url, html in pages:
+        fast_ms = time_extract(profiled, url, html, args.repeat)
+        slow_ms = time_extract(generic, url, html, args.repeat)
+        totals[0] += fast_ms
+        totals[1] += slow_ms
+        print(f"{name:<32} {fast_ms:>11.2f} {slow_ms:>11.2f} {slow_ms / fast_ms:>7.2f}x")
+    print(f"{'TOTAL':<32} {totals[0]:>11.2f} {totals[1]:>11.2f} {totals[1] / totals[0]:>7.2f}x")
+
+    if args.workers > 1:
+        bench_throughput(pages, args.workers, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
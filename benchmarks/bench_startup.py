@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização: tempo de import a frio dos pontos de entrada.
+
+Cada execução do `python -m app.main --once` (inclusive as disparadas pelo
+/api/system/run-now do dashboard) paga o import de todo o app antes de fazer
+qualquer trabalho. Este script importa cada ponto de entrada num processo
+novo com `python -X importtime`, reporta a mediana do tempo total e os
+módulos mais pesados, e falha (código 1) se algum passar do orçamento em
+BUDGETS_MS. Mede só o import: o ciclo em si acessa a rede.
+
+Uso:
+    python -m benchmarks.bench_startup [--repeat N] [--top N] [--budget-scale X]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Orçamento (ms) do import de cada ponto de entrada; ajuste junto com a mudança que o justificar
+BUDGETS_MS = {
+    'app.main': 400,
+    'dashboard': 350,
+}
+
+# Módulos que o --once não deve importar na partida (carregados só quando usados)
+DEFERRED = {
+    'app.main': ('apscheduler', 'trafilatura', 'bs4', 'lxml', 'httpx', 'soupsieve', 'feedparser'),
+}
+
+# "import time:       245 |      48345 |     feedparser"
+_LINE_RX = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def import_profile(module):
+    """
+    Importa `module` num processo novo com -X importtime.
+
+    Retorna:
+        (total_ms, {módulo: ms cumulativo}, módulos importados)
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total_us, cumulative, names = 0, {}, set()
+    for line in proc.stderr.splitlines():
+        m = _LINE_RX.match(line)
+        if not m:
+            continue
+        cum_us, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        names.add(name)
+        if indent == 1:
+            # só os imports de primeiro nível: os aninhados já estão no cumulativo deles
+            total_us += cum_us
+        cumulative[name] = max(cumulative.get(name, 0), cum_us / 1000)
+    return total_us / 1000, cumulative, names
+
+
+def bench(module, repeat, top):
+    """Mediana do import de `module`; imprime os `top` módulos mais pesados da última execução."""
+    totals = []
+    for _ in range(repeat):
+        total_ms, cumulative, names = import_profile(module)
+        totals.append(total_ms)
+    heaviest = sorted(
+        ((ms, name) for name, ms in cumulative.items() if name != module and '.' not in name),
+        reverse=True,
+    )[:top]
+    print(f"\n{module}: median {statistics.median(totals):.0f} ms (min {min(totals):.0f}, max {max(totals):.0f})")
+    for ms, name in heaviest:
+        print(f"  {name:<32} {ms:>8.1f} ms")
+    return statistics.median(totals), names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold import time of the entry points')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh processes per entry point (median is reported)')
+    parser.add_argument('--top', type=int, default=10, help='Heaviest top-level packages to list')
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='Multiply the budgets (slower machines, CI)')
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        median_ms, names = bench(module, args.repeat, args.top)
+        limit = budget * args.budget_scale
+        status = 'OK' if median_ms <= limit else 'OVER BUDGET'
+        print(f"  budget {limit:.0f} ms: {status}")
+        if median_ms > limit:
+            failures.append(f"{module}: {median_ms:.0f} ms > {limit:.0f} ms")
+        for name in DEFERRED.get(module, ()):
+            if name in names:
+                failures.append(f"{module}: imports {name} at startup")
+
+    if failures:
+        print("\nFAIL\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nall entry points within budget")
+
+
+if __name__ == '__main__':
+    main()
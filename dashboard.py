@@ -18,13 +18,9 @@ except ImportError:
     psutil = None
 from collections import deque
 
-# Load environment variables
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    # Fallback to manual loading if python-dotenv is not available
-    env_file = Path('.env')
+
+def load_env_file(env_file: Path = Path('.env')):
+    """Manual .env loading, for when python-dotenv is not available."""
     if env_file.exists():
         with open(env_file) as f:
             for line in f:
@@ -37,10 +33,12 @@ except ImportError:
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Import application modules
+# Import application modules (app.config already loads the .env with load_dotenv)
 try:
     from app.config import RSS_FEEDS, PIPELINE_ORDER, SCHEDULE_CONFIG
 except ImportError:
+    # Fallback to manual loading if python-dotenv is not available
+    load_env_file()
     # Define empty fallbacks to allow the app to start, but show an error.
     print("="*80)
     print("ERROR: Could not import configuration from 'app.config'.")
@@ -0,0 +1,569 @@
+"""
+Unit tests for the ai_processor and gemini_client modules
+"""
+
+import json
+import re
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+from app.ai_processor import AIProcessor
+from app.context_cache import ContextCache
+from app.http_client import HttpClient
+from app.model_router import ModelRouter
+from app.response_cache import ResponseCache
+from app.token_estimator import TokenEstimator
+
+VALID_RESULT = {
+    'titulo_final': 'Título',
+    'conteudo_final': '<p>Texto</p>',
+    'meta_description': 'Resumo',
+    'focus_keyword': 'filme',
+    'tags': ['filme'],
+}
+
+
+def gemini_body(data, usage=None):
+    """generateContent response carrying `data` as JSON text."""
+    return {
+        'candidates': [{'content': {'parts': [{'text': json.dumps(data)}]}, 'finishReason': 'STOP'}],
+        'usageMetadata': usage or {'promptTokenCount': 100, 'candidatesTokenCount': 50},
+    }
+
+
+class GeminiTestCase(unittest.TestCase):
+    """Runs AIProcessor against a local stand-in of the Gemini API"""
+
+    keys = ['key-aaaa', 'key-bbbb', 'key-cccc']
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.requests = []
+        self.lock = threading.Lock()
+        self.handler = lambda request: httpx.Response(200, json=gemini_body(VALID_RESULT))
+        patches = [
+            patch.dict('app.ai_processor.AI_CONFIG', {'movies': self.keys}),
+            patch.dict('app.keys.AI_KEY_CONFIG', {'db_path': str(Path(self.tmp.name) / 'app.db')}),
+            patch.dict('app.ai_processor.AI_REWRITE_CONFIG', {'max_key_wait_seconds': 0}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _dispatch(self, request):
+        with self.lock:
+            self.requests.append(request)
+        return self.handler(request)
+
+    def _processor(self):
+        http = HttpClient(transport=httpx.MockTransport(self._dispatch), config={'max_connections_per_host': 10})
+        processor = AIProcessor('movies', http_client=http)
+        self.addCleanup(processor.close)
+        return processor
+
+
+class TestAIProcessor(GeminiTestCase):
+    """Test cases for the AIProcessor class"""
+
+    def test_rewrite_and_aliases(self):
+        """The url/content aliases reach the prompt and the key goes in a header"""
+        result, reason = self._processor().rewrite_content(
+            title='T', url='https://a.com/post', content='<p>Conteúdo original</p>')
+        self.assertIsNone(reason)
+        self.assertEqual(result['titulo_final'], 'Título')
+        request = self.requests[0]
+        self.assertTrue(request.url.path.endswith(':generateContent'))
+        self.assertIn(request.headers['x-goog-api-key'], self.keys)
+        prompt = json.loads(request.content)['contents'][0]['parts'][0]['text']
+        self.assertIn('Conteúdo original', prompt)
+        self.assertIn('https://a.com/post', prompt)
+
+    def test_compacted_content_round_trip(self):
+        """The prompt carries image ids and the result gets the real URLs back"""
+        url = 'https://static1.srcdn.com/uploads/cena.jpg?w=825'
+        result_with_id = dict(VALID_RESULT, conteudo_final='<p>Texto</p><figure><img src="IMG_1"></figure>')
+        self.handler = lambda request: httpx.Response(200, json=gemini_body(result_with_id))
+        result, _ = self._processor().rewrite_content(
+            title='T', content_html=f'<div class="body"><p class="x">Texto</p><img src="{url}" class="i"></div>')
+        prompt = json.loads(self.requests[0].content)['contents'][0]['parts'][0]['text']
+        self.assertIn('<p>Texto</p><img src="IMG_1"/>', prompt)
+        self.assertNotIn(url, prompt)
+        self.assertEqual(result['conteudo_final'], f'<p>Texto</p><figure><img src="{url}"></figure>')
+
+    def test_billed_tokens_replace_estimate(self):
+        """The key's minute budget ends up holding the tokens Gemini billed"""
+        self.handler = lambda request: httpx.Response(200, json=gemini_body(
+            VALID_RESULT, {'promptTokenCount': 3000, 'candidatesTokenCount': 700, 'totalTokenCount': 3700}))
+        processor = self._processor()
+        processor.rewrite_content(title='T', content_html='<p>x</p>')
+        used = [row['minute_tokens'] for row in processor.keys.status() if row['minute_count']]
+        self.assertEqual(used, [3700])
+
+    def test_rate_limited_key_fails_over(self):
+        """A 429 puts the key in cooldown with the server's retry delay and the next key is used"""
+        def handler(request):
+            if request.headers['x-goog-api-key'] == 'key-aaaa':
+                return httpx.Response(429, json={'error': {
+                    'code': 429, 'status': 'RESOURCE_EXHAUSTED', 'message': 'Rate limit',
+                    'details': [{'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '40s'}],
+                }})
+            return httpx.Response(200, json=gemini_body(VALID_RESULT))
+        self.handler = handler
+        processor = self._processor()
+        result, _ = processor.rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertIsNotNone(result)
+        status = {row['api_key']: row for row in processor.keys.status()}
+        self.assertAlmostEqual(status['...aaaa']['cooldown_until'] - time.time(), 40, delta=2)
+        self.assertEqual([r.headers['x-goog-api-key'] for r in self.requests], ['key-aaaa', 'key-bbbb'])
+
+    def test_invalid_key_is_skipped(self):
+        """A rejected key is marked invalid and not used by the next processor"""
+        def handler(request):
+            if request.headers['x-goog-api-key'] == 'key-aaaa':
+                return httpx.Response(400, json={'error': {
+                    'code': 400, 'status': 'INVALID_ARGUMENT', 'message': 'API key not valid.'}})
+            return httpx.Response(200, json=gemini_body(VALID_RESULT))
+        self.handler = handler
+        self._processor().rewrite_content(title='T', content_html='<p>x</p>')
+        self.requests.clear()
+        self._processor().rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertNotIn('key-aaaa', [r.headers['x-goog-api-key'] for r in self.requests])
+
+    def test_no_key_available(self):
+        """When every key is over its limit the article fails without a request"""
+        processor = self._processor()
+        with patch.object(processor.keys, 'acquire', return_value=None):
+            result, reason = processor.rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertIsNone(result)
+        self.assertIn('no key available', reason)
+        self.assertEqual(self.requests, [])
+
+    def test_rewrite_many_runs_keys_in_parallel(self):
+        """Requests on different keys are in flight at the same time"""
+        in_flight, peak = [0], [0]
+
+        def handler(request):
+            with self.lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.2)
+            with self.lock:
+                in_flight[0] -= 1
+            return httpx.Response(200, json=gemini_body(VALID_RESULT))
+        self.handler = handler
+        articles = [{'title': f'T{i}', 'content_html': f'<p>{i}</p>'} for i in range(3)]
+        start = time.perf_counter()
+        results = self._processor().rewrite_many(articles)
+        elapsed = time.perf_counter() - start
+        self.assertTrue(all(result for result, _ in results))
+        self.assertEqual(peak[0], 3)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(len({r.headers['x-goog-api-key'] for r in self.requests}), 3)
+
+    def test_truncated_response_is_salvaged(self):
+        """A response cut after the required fields is used without a new generation"""
+        text = json.dumps(VALID_RESULT)[:-1] + ', "yoast_meta": {"_yoast_wpseo_title": "Tít'
+        self.handler = lambda request: httpx.Response(200, json={
+            'candidates': [{'content': {'parts': [{'text': text}]}, 'finishReason': 'MAX_TOKENS'}]})
+        with patch.dict(AIProcessor._parse_stats, clear=True):
+            result, reason = self._processor().rewrite_content(title='T', content_html='<p>x</p>')
+            self.assertEqual(AIProcessor._parse_stats['partial'], 1)
+        self.assertIsNone(reason)
+        self.assertEqual(result, VALID_RESULT)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_unrecoverable_fields_regenerate(self):
+        """A response cut before a required field is generated again"""
+        replies = iter(['{"titulo_final": "T", "conteudo_final": "<p>meio', json.dumps(VALID_RESULT)])
+        self.handler = lambda request: httpx.Response(200, json={
+            'candidates': [{'content': {'parts': [{'text': next(replies)}]}, 'finishReason': 'STOP'}]})
+        result, reason = self._processor().rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertIsNone(reason)
+        self.assertEqual(len(self.requests), 2)
+
+
+class TestResponseCache(GeminiTestCase):
+    """Test cases for AIProcessor with a response cache"""
+
+    def test_repeated_article_costs_no_request(self):
+        """A second rewrite of the same text (even with other image URLs) is served from the cache"""
+        result_with_id = dict(VALID_RESULT, conteudo_final='<p>Texto</p><img src="IMG_1">')
+        self.handler = lambda request: httpx.Response(200, json=gemini_body(result_with_id))
+        cache = ResponseCache(db_path=str(Path(self.tmp.name) / 'ai.db'))
+        self.addCleanup(cache.close)
+        processor = AIProcessor('movies', http_client=HttpClient(transport=httpx.MockTransport(self._dispatch)),
+                                response_cache=cache)
+        self.addCleanup(processor.close)
+
+        first, _ = processor.rewrite_content(
+            title='T', content_html='<p>Texto</p><img src="https://cdn-a.com/1.jpg">', domain='https://site.com')
+        copy, _ = processor.rewrite_content(
+            title='T', content_html='<p class="c">Texto</p><img src="https://cdn-b.com/1.jpg">',
+            domain='https://site.com')
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIn('https://cdn-a.com/1.jpg', first['conteudo_final'])
+        self.assertIn('https://cdn-b.com/1.jpg', copy['conteudo_final'])
+
+        processor.rewrite_content(title='T', content_html='<p>Outro texto</p>', domain='https://site.com')
+        self.assertEqual(len(self.requests), 2)
+
+    def test_syndicated_copy_with_other_title_is_not_served_from_cache(self):
+        """The same body under another title or URL gets its own rewrite"""
+        cache = ResponseCache(db_path=str(Path(self.tmp.name) / 'ai.db'))
+        self.addCleanup(cache.close)
+        processor = AIProcessor('movies', http_client=HttpClient(transport=httpx.MockTransport(self._dispatch)),
+                                response_cache=cache)
+        self.addCleanup(processor.close)
+        processor.rewrite_content(title='T', content_html='<p>Texto</p>', source_url='https://a.com/1')
+        processor.rewrite_content(title='Outro T', content_html='<p>Texto</p>', source_url='https://a.com/1')
+        processor.rewrite_content(title='T', content_html='<p>Texto</p>', source_url='https://b.com/1')
+        self.assertEqual(len(self.requests), 3)
+        processor.rewrite_content(title='T', content_html='<p>Texto</p>', source_url='https://a.com/1')
+        self.assertEqual(len(self.requests), 3)
+
+
+class TestContextCache(GeminiTestCase):
+    """Test cases for the cached prompt prefix"""
+
+    def setUp(self):
+        super().setUp()
+        self.caches = {}
+        self.cache_supported = True
+        self.handler = self._api
+        for p in (patch.dict('app.ai_processor.AI_REWRITE_CONFIG', {'context_cache': True}),
+                  patch.object(AIProcessor, '_context_cache', ContextCache(ttl_seconds=600))):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _api(self, request):
+        """Minimal stand-in of the cachedContents and generateContent endpoints"""
+        body = json.loads(request.content or b'{}')
+        if request.method == 'PATCH':
+            return httpx.Response(200, json={'name': request.url.path.split('/', 2)[-1], 'expireTime': '2099-01-01T00:00:00Z'})
+        if request.url.path.endswith('/cachedContents'):
+            if not self.cache_supported:
+                return httpx.Response(400, json={'error': {'code': 400, 'message': 'Cached content is too small.'}})
+            name = f"cachedContents/c{len(self.caches) + 1}"
+            self.caches[name] = body['contents'][0]['parts'][0]['text']
+            return httpx.Response(200, json={'name': name, 'model': body['model'], 'expireTime': '2099-01-01T00:00:00.5Z'})
+        if body.get('cachedContent') and body['cachedContent'] not in self.caches:
+            return httpx.Response(404, json={'error': {'code': 404, 'message': 'CachedContent not found.'}})
+        usage = {'promptTokenCount': 4000, 'candidatesTokenCount': 500}
+        if body.get('cachedContent'):
+            usage['cachedContentTokenCount'] = 3500
+        return httpx.Response(200, json=gemini_body(VALID_RESULT, usage))
+
+    def _prompts(self):
+        return [json.loads(r.content) for r in self.requests if r.url.path.endswith(':generateContent')]
+
+    def test_prefix_cached_once_per_key(self):
+        """The static prefix is uploaded once per key and each request sends only the article data"""
+        processor = self._processor()
+        for i in range(4):
+            result, _ = processor.rewrite_content(title=f'T{i}', content_html=f'<p>Artigo {i}</p>')
+            self.assertIsNotNone(result)
+        self.assertEqual(len(self.caches), 3)
+        self.assertIn('REGRAS OBRIGATÓRIAS', next(iter(self.caches.values())))
+        self.assertNotIn('Artigo', ''.join(self.caches.values()))
+        for body in self._prompts():
+            text = body['contents'][0]['parts'][0]['text']
+            self.assertTrue(body['cachedContent'].startswith('cachedContents/'))
+            self.assertIn('DADOS PARA PROCESSAMENTO', text)
+            self.assertNotIn('REGRAS OBRIGATÓRIAS', text)
+
+    def test_prefix_and_suffix_match_inline_prompt(self):
+        """Context-cached requests get the same instructions as inline ones, tag links included"""
+        processor = self._processor()
+        job = processor._prepare(title='T', content_html='<p>Artigo</p>', domain='https://site.com')
+        prompt, parts = processor._build_prompt(job["fields"], job["image_ids"])
+        self.assertNotIn('<tag>', parts[0])
+        self.assertEqual(parts[0].count('https://site.com/tag/movies'), prompt.count('https://site.com/tag/movies'))
+        self.assertGreater(parts[0].count('https://site.com/tag/movies'), 0)
+
+    def test_expiring_cache_is_refreshed(self):
+        """A cache close to expiry gets its TTL extended instead of being recreated"""
+        cache = ContextCache(ttl_seconds=600, refresh_margin_seconds=10 ** 10)
+        with patch.object(AIProcessor, '_context_cache', cache), \
+                patch.dict('app.ai_processor.AI_CONFIG', {'movies': ['key-aaaa']}):
+            processor = self._processor()
+            processor.rewrite_content(title='T', content_html='<p>x</p>')
+            processor.rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertEqual(len(self.caches), 1)
+        patches = [r for r in self.requests if r.method == 'PATCH']
+        self.assertEqual(len(patches), 1)
+        self.assertEqual(json.loads(patches[0].content), {'ttl': '600s'})
+
+    def test_falls_back_to_inline(self):
+        """Without caching support requests carry the whole prompt and creation is not retried"""
+        self.cache_supported = False
+        processor = self._processor()
+        for _ in range(4):
+            processor.rewrite_content(title='T', content_html='<p>x</p>')
+        creations = [r for r in self.requests if r.url.path.endswith('/cachedContents')]
+        self.assertEqual(len(creations), 3)
+        for body in self._prompts():
+            self.assertNotIn('cachedContent', body)
+            self.assertIn('REGRAS OBRIGATÓRIAS', body['contents'][0]['parts'][0]['text'])
+
+    def test_missing_cache_is_recreated(self):
+        """A cache deleted on the server is dropped, the request goes inline and a new cache is made next time"""
+        with patch.dict('app.ai_processor.AI_CONFIG', {'movies': ['key-aaaa']}):
+            processor = self._processor()
+        processor.rewrite_content(title='T', content_html='<p>x</p>')
+        self.caches.clear()
+        result, _ = processor.rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertIsNotNone(result)
+        self.assertNotIn('cachedContent', self._prompts()[-1])
+        processor.rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertTrue(self._prompts()[-1].get('cachedContent'))
+
+
+class TestBatchRewrite(GeminiTestCase):
+    """Test cases for rewrite_batch"""
+
+    def setUp(self):
+        super().setUp()
+        self.invalid_ids = set()
+        self.handler = self._api
+        for p in (patch.object(AIProcessor, '_token_estimator', TokenEstimator()),
+                  patch.object(AIProcessor, '_batch_output_per_article', 1500.0)):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _api(self, request):
+        """Answers batch prompts with one element per article id, others with a single object"""
+        text = json.loads(request.content)['contents'][0]['parts'][0]['text']
+        usage = {'promptTokenCount': len(text) // 4, 'candidatesTokenCount': 400}
+        ids = re.findall(r'### ARTIGO id=(a\d+)', text)
+        if not ids:
+            return httpx.Response(200, json=gemini_body(VALID_RESULT, usage))
+        elements = [{'id': i, **({'titulo_final': 'Só título'} if i in self.invalid_ids else VALID_RESULT)}
+                    for i in ids]
+        return httpx.Response(200, json=gemini_body(elements, usage))
+
+    def _batch_ids(self):
+        prompts = [json.loads(r.content)['contents'][0]['parts'][0]['text'] for r in self.requests]
+        return [re.findall(r'### ARTIGO id=(a\d+)', p) for p in prompts]
+
+    def test_short_articles_share_one_request(self):
+        """Short articles go out in one request and each element becomes its article's result"""
+        articles = [{'title': f'T{i}', 'content_html': f'<p>Artigo curto {i}</p>'} for i in range(3)]
+        results = self._processor().rewrite_batch(articles)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self._batch_ids(), [['a1', 'a2', 'a3']])
+        self.assertEqual([reason for _, reason in results], [None] * 3)
+        self.assertTrue(all(result['titulo_final'] == 'Título' and 'id' not in result for result, _ in results))
+
+    def test_invalid_element_is_requeued(self):
+        """An element that fails validation is rewritten on its own; the others are kept"""
+        self.invalid_ids = {'a2'}
+        articles = [{'title': f'T{i}', 'content_html': f'<p>Artigo curto {i}</p>'} for i in range(3)]
+        results = self._processor().rewrite_batch(articles)
+        self.assertEqual(self._batch_ids(), [['a1', 'a2', 'a3'], []])
+        self.assertIn('Artigo curto 1', json.loads(self.requests[1].content)['contents'][0]['parts'][0]['text'])
+        self.assertEqual([reason for _, reason in results], [None] * 3)
+
+    def test_long_article_goes_alone(self):
+        """Articles above the batch size limit get their own request"""
+        articles = [{'title': 'Longo', 'content_html': '<p>' + 'palavra ' * 2000 + '</p>'},
+                    {'title': 'A', 'content_html': '<p>Curto A</p>'},
+                    {'title': 'B', 'content_html': '<p>Curto B</p>'}]
+        results = self._processor().rewrite_batch(articles)
+        self.assertEqual(sorted(self._batch_ids()), [[], ['a2', 'a3']])
+        self.assertEqual([reason for _, reason in results], [None] * 3)
+
+    def test_batches_respect_output_budget(self):
+        """Batch size is bounded by the expected output tokens per article"""
+        articles = [{'title': f'T{i}', 'content_html': f'<p>Artigo curto {i}</p>'} for i in range(5)]
+        with patch.dict('app.ai_processor.AI_REWRITE_CONFIG', {'batch_max_output_tokens': 3000}):
+            results = self._processor().rewrite_batch(articles)
+        self.assertEqual(sorted(self._batch_ids()), [[], ['a1', 'a2'], ['a3', 'a4']])
+        self.assertEqual([reason for _, reason in results], [None] * 5)
+
+
+class TestStreaming(GeminiTestCase):
+    """Test cases for streamed rewrites"""
+
+    def setUp(self):
+        super().setUp()
+        self.replies = {}
+        self.sent_chunks = []
+        self.handler = self._api
+        p = patch.dict('app.ai_processor.AI_REWRITE_CONFIG', {'streaming': True})
+        p.start()
+        self.addCleanup(p.stop)
+
+    def _api(self, request):
+        """streamGenerateContent as server-sent events, one event per 20 characters of text"""
+        self.assertTrue(request.url.path.endswith(':streamGenerateContent'))
+        self.assertEqual(request.url.params['alt'], 'sse')
+        key = request.headers['x-goog-api-key']
+        text = self.replies.get(key, json.dumps(VALID_RESULT, ensure_ascii=False))
+        pieces = [text[i:i + 20] for i in range(0, len(text), 20)]
+
+        def events():
+            for n, piece in enumerate(pieces):
+                event = {'candidates': [{'content': {'parts': [{'text': piece}]}}]}
+                if n == len(pieces) - 1:
+                    event['candidates'][0]['finishReason'] = 'STOP'
+                    event['usageMetadata'] = {'promptTokenCount': 100, 'candidatesTokenCount': 50}
+                self.sent_chunks.append(key)
+                yield f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8')
+
+        return httpx.Response(200, headers={'content-type': 'text/event-stream'}, content=events())
+
+    def test_fields_reported_while_streaming(self):
+        """on_field gets each field as it closes, with image ids resolved"""
+        reply = dict(VALID_RESULT, conteudo_final='<p>Texto</p><img src="IMG_1">')
+        self.replies = {key: json.dumps(reply) for key in self.keys}
+        seen = []
+        result, reason = self._processor().rewrite_content(
+            title='T', content_html='<p>x</p><img src="https://cdn.example.com/a.jpg">',
+            on_field=lambda name, value: seen.append((name, value)))
+        self.assertIsNone(reason)
+        self.assertEqual([name for name, _ in seen], list(VALID_RESULT))
+        self.assertEqual(dict(seen)['conteudo_final'], '<p>Texto</p><img src="https://cdn.example.com/a.jpg">')
+        self.assertEqual(result['conteudo_final'], dict(seen)['conteudo_final'])
+
+    def test_invalid_output_aborts_early(self):
+        """Prose instead of JSON closes the stream at once and the next key is tried"""
+        self.replies = {'key-aaaa': 'Desculpe, não posso reescrever este artigo. ' * 20}
+        with patch.dict('app.ai_processor.AI_CONFIG', {'movies': ['key-aaaa', 'key-bbbb']}):
+            result, reason = self._processor().rewrite_content(title='T', content_html='<p>x</p>')
+        self.assertIsNone(reason)
+        self.assertEqual([r.headers['x-goog-api-key'] for r in self.requests], ['key-aaaa', 'key-bbbb'])
+        self.assertLessEqual(self.sent_chunks.count('key-aaaa'), 2)
+
+
+class TestModelRouting(GeminiTestCase):
+    """Test cases for model choice and fallback"""
+
+    def setUp(self):
+        super().setUp()
+        self.router = ModelRouter(['pro-model', 'flash-model'], light_model='lite-model', light_max_tokens=100)
+        for p in (patch.object(AIProcessor, '_router', self.router),
+                  patch.object(AIProcessor, '_token_estimator', TokenEstimator())):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _models(self):
+        return [r.url.path.rsplit('/', 1)[-1].split(':')[0] for r in self.requests]
+
+    def test_model_by_size_and_generation_config(self):
+        """Short articles use the light model, long ones the primary, with AI_GENERATION_CONFIG"""
+        processor = self._processor()
+        processor.rewrite_content(title='T', content_html='<p>Curto</p>')
+        processor.rewrite_content(title='T', content_html='<p>' + 'palavra ' * 2000 + '</p>')
+        self.assertEqual(self._models(), ['lite-model', 'pro-model'])
+        config = json.loads(self.requests[0].content)['generationConfig']
+        self.assertEqual(config['responseMimeType'], 'application/json')
+        self.assertEqual((config['temperature'], config['maxOutputTokens']), (0.7, 4096))
+
+    def test_overloaded_model_falls_back(self):
+        """A 503 moves down the chain without cooling the key down or charging it twice"""
+        def handler(request):
+            if 'pro-model' in request.url.path:
+                return httpx.Response(503, json={'error': {'code': 503, 'message': 'The model is overloaded.'}})
+            return httpx.Response(200, json=gemini_body(VALID_RESULT))
+        self.handler = handler
+        with patch.dict('app.ai_processor.AI_CONFIG', {'movies': ['key-aaaa']}):
+            processor = self._processor()
+            result, reason = processor.rewrite_content(title='T', content_html='<p>' + 'palavra ' * 2000 + '</p>')
+        self.assertIsNone(reason)
+        self.assertEqual(self._models(), ['pro-model', 'flash-model'])
+        self.assertEqual(processor.keys.status()[0]['failures'], 0)
+        self.assertEqual(processor.keys.status()[0]['minute_count'], 1)
+        self.assertEqual(self.router.stats('pro-model')['error_rate'], 1.0)
+
+
+    def test_unparsable_replies_share_attempt_budget(self):
+        """Decode retries and model fallback run in one loop of keys + models - 1 attempts"""
+        def handler(request):
+            if 'pro-model' in request.url.path:
+                return httpx.Response(503, json={'error': {'code': 503, 'message': 'The model is overloaded.'}})
+            return httpx.Response(200, json=gemini_body('não é o JSON pedido'))
+        self.handler = handler
+        with patch.dict('app.ai_processor.AI_CONFIG', {'movies': ['key-aaaa', 'key-bbbb']}):
+            result, reason = self._processor().rewrite_content(title='T', content_html='<p>' + 'palavra ' * 2000 + '</p>')
+        self.assertIsNone(result)
+        self.assertIn('Failed to parse', reason)
+        self.assertEqual(self._models(), ['pro-model', 'flash-model', 'flash-model'])
+
+class TestChunkedRewrite(GeminiTestCase):
+    """Test cases for the map-reduce rewrite of long articles"""
+
+    ARTICLE = '<p>Abertura</p>' + ''.join(f'<h2>Filme {i}</h2><p>{"texto " * 40}</p>' for i in range(1, 5))
+
+    def setUp(self):
+        super().setUp()
+        self.failing_part = None
+        self.in_flight, self.peak = 0, 0
+        self.handler = self._api
+        for p in (patch.dict('app.ai_processor.AI_REWRITE_CONFIG', {
+                      'chunked_rewrite': True, 'chunk_min_tokens': 50, 'chunk_target_tokens': 80}),
+                  patch.object(AIProcessor, '_token_estimator', TokenEstimator())):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _api(self, request):
+        """Answers part prompts with their headings rewritten and the title/meta prompt with the short fields"""
+        text = json.loads(request.content)['contents'][0]['parts'][0]['text']
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.1)
+        with self.lock:
+            self.in_flight -= 1
+        part = re.search(r'somente a parte (\d+) de', text)
+        if part:
+            if part.group(1) == self.failing_part:
+                return httpx.Response(200, json=gemini_body({'titulo_final': 'sem conteúdo'}))
+            article = text.split('Conteúdo Original (HTML):', 1)[1]
+            headings = re.findall(r'<h2>(.*?)</h2>', article)
+            body = f'<p>parte {part.group(1)}</p>' + ''.join(f'<h2>{h} reescrito</h2>' for h in headings)
+            return httpx.Response(200, json=gemini_body({'conteudo_final': body}))
+        if 'sendo reescrito à parte' in text:
+            return httpx.Response(200, json=gemini_body(dict(VALID_RESULT, conteudo_final='')))
+        return httpx.Response(200, json=gemini_body(VALID_RESULT))
+
+    def test_parts_rewritten_concurrently_and_merged(self):
+        """Each part is rewritten in parallel and joined in order under one title/meta"""
+        result, reason = self._processor().rewrite_content(title='Ranking', content_html=self.ARTICLE)
+        self.assertIsNone(reason)
+        parts = len(self.requests) - 1
+        self.assertGreater(parts, 1)
+        self.assertGreater(self.peak, 1)
+        self.assertEqual(result['titulo_final'], VALID_RESULT['titulo_final'])
+        self.assertEqual(re.findall(r'<p>parte (\d+)</p>', result['conteudo_final']),
+                         [str(i) for i in range(1, parts + 1)])
+        self.assertEqual(re.findall(r'<h2>(.*?)</h2>', result['conteudo_final']),
+                         [f'Filme {i} reescrito' for i in range(1, 5)])
+
+    def test_failed_part_fails_the_article(self):
+        """A part that never comes back valid fails the rewrite with a reason naming it"""
+        self.failing_part = '2'
+        result, reason = self._processor().rewrite_content(title='Ranking', content_html=self.ARTICLE)
+        self.assertIsNone(result)
+        self.assertIn('part 2/', reason)
+
+    def test_short_articles_stay_single(self):
+        """Articles under the threshold use one request"""
+        with patch.dict('app.ai_processor.AI_REWRITE_CONFIG', {'chunk_min_tokens': 10 ** 6}):
+            result, reason = self._processor().rewrite_content(title='Ranking', content_html=self.ARTICLE)
+        self.assertIsNone(reason)
+        self.assertEqual(result['conteudo_final'], VALID_RESULT['conteudo_final'])
+        self.assertEqual(len(self.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
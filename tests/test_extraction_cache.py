@@ -0,0 +1,99 @@
+"""
+Unit tests for the extraction_cache module
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.extraction_cache import ExtractionCache, result_key
+from app.extractor import EXTRACTOR_VERSION, ContentExtractor
+from tests.test_site_profiles import load_page
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test cases for the ExtractionCache class"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ExtractionCache(db_path=str(Path(self.tmp_dir) / 'results.db'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_key_depends_on_bytes_url_and_version(self):
+        """Any change in page bytes, URL, encoding or version gives a new key"""
+        base = result_key(b'<html>a</html>', 'https://a.com/x', None, '1')
+        self.assertEqual(base, result_key('<html>a</html>', 'https://a.com/x', None, '1'))
+        for other in (result_key(b'<html>b</html>', 'https://a.com/x', None, '1'),
+                      result_key(b'<html>a</html>', 'https://a.com/y', None, '1'),
+                      result_key(b'<html>a</html>', 'https://a.com/x', 'utf-8', '1'),
+                      result_key(b'<html>a</html>', 'https://a.com/x', None, '2')):
+            self.assertNotEqual(base, other)
+
+    def test_roundtrip_and_counters(self):
+        """Results survive a put/get and hits/misses are counted"""
+        result = {'title': 'Título', 'images': ['https://a.com/1.jpg'], 'videos': []}
+        self.assertIsNone(self.cache.get('k'))
+        self.cache.put('k', 'https://a.com/x', result)
+        self.assertEqual(self.cache.get('k'), result)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_lru_eviction_by_size(self):
+        """The least recently used results are evicted first"""
+        self.cache.max_bytes = 1
+        self.cache.put('a', 'https://a.com/a', {'content': 'a'})
+        self.cache.put('b', 'https://a.com/b', {'content': 'b'})
+        self.assertIsNone(self.cache.get('a'))
+
+
+class TestExtractorResultCache(unittest.TestCase):
+    """Test cases for ContentExtractor with a result cache"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ExtractionCache(db_path=str(Path(self.tmp_dir) / 'results.db'))
+        self.url, html = load_page('gamerant_zelda.html')
+        self.page = (html.encode('utf-8'), 'utf-8')
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_same_bytes_skip_parsing(self):
+        """A second extraction of unchanged bytes returns the cached result without parsing"""
+        extractor = ContentExtractor(result_cache=self.cache)
+        with patch.object(extractor, '_fetch_page', return_value=self.page):
+            first = extractor.extract(self.url)
+            with patch.object(extractor, 'parse') as mock_parse:
+                second = extractor.extract_many([self.url])[self.url]
+        mock_parse.assert_not_called()
+        self.assertEqual(second, first)
+
+    def test_changed_page_is_parsed_again(self):
+        """Different bytes miss the cache"""
+        extractor = ContentExtractor(result_cache=self.cache)
+        with patch.object(extractor, '_fetch_page', return_value=self.page):
+            extractor.extract(self.url)
+        changed = (self.page[0].replace(b'</article>', b'<p>Update.</p></article>'), 'utf-8')
+        with patch.object(extractor, '_fetch_page', return_value=changed), \
+                patch.object(extractor, 'parse', return_value={'title': 'new'}) as mock_parse:
+            self.assertEqual(extractor.extract(self.url), {'title': 'new'})
+        mock_parse.assert_called_once()
+
+    def test_version_is_part_of_the_key(self):
+        """Bumping EXTRACTOR_VERSION invalidates stored results"""
+        extractor = ContentExtractor(result_cache=self.cache)
+        with patch.object(extractor, '_fetch_page', return_value=self.page):
+            extractor.extract(self.url)
+            with patch('app.extractor.EXTRACTOR_VERSION', EXTRACTOR_VERSION + '-next'), \
+                    patch.object(extractor, 'parse', return_value=None) as mock_parse:
+                extractor.extract(self.url)
+        mock_parse.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
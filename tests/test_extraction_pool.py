@@ -0,0 +1,66 @@
+"""
+Unit tests for the extraction_pool module
+"""
+
+import unittest
+from unittest.mock import patch
+
+from app.extraction_pool import ExtractionExecutor
+from app.extractor import ContentExtractor
+from tests.test_site_profiles import FULL_PAGES, load_page
+
+
+class TestExtractionExecutor(unittest.TestCase):
+    """Test cases for the process-pool extraction"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ExtractionExecutor(max_workers=2)
+        cls.pages = dict(load_page(name) for name in FULL_PAGES)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def _fake_fetch(self, url):
+        html = self.pages.get(url)
+        return (html.encode('utf-8'), 'utf-8') if html else None
+
+    def test_pool_results_match_inline_parsing(self):
+        """Parsing in worker processes gives the same result as in-process parsing"""
+        inline = ContentExtractor()
+        pooled = ContentExtractor(executor=self.executor)
+        urls = list(self.pages)
+        with patch.object(inline, '_fetch_page', side_effect=self._fake_fetch), \
+                patch.object(pooled, '_fetch_page', side_effect=self._fake_fetch):
+            expected = inline.extract_many(urls)
+            result = pooled.extract_many(urls)
+        self.assertEqual(result, expected)
+        self.assertTrue(all(result[u] for u in urls))
+
+    def test_fetch_failures_are_reported_as_none(self):
+        """URLs that can't be downloaded map to None without reaching the pool"""
+        pooled = ContentExtractor(executor=self.executor)
+        with patch.object(pooled, '_fetch_page', return_value=None), \
+                patch.object(self.executor, 'submit') as mock_submit:
+            result = pooled.extract_many(['https://screenrant.com/missing/'])
+        self.assertEqual(result, {'https://screenrant.com/missing/': None})
+        mock_submit.assert_not_called()
+
+    def test_single_extract_uses_pool(self):
+        """ContentExtractor.extract sends the parsing to the executor"""
+        url = next(iter(self.pages))
+        pooled = ContentExtractor(executor=self.executor)
+        with patch.object(pooled, '_fetch_page', side_effect=self._fake_fetch):
+            result = pooled.extract(url)
+        self.assertEqual(result['source_url'], url)
+
+    def test_worker_extractor_has_no_http_client(self):
+        """The extractor built for parsing only never creates the shared HTTP client"""
+        with patch('app.extractor.get_http_client') as mock_client:
+            ContentExtractor(probe_images=True).parse(self.pages[next(iter(self.pages))], next(iter(self.pages)))
+        mock_client.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+"""
+Unit tests for the extractor module
+"""
+
+import re
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import httpx
+from bs4 import BeautifulSoup
+
+from app.extractor import (
+    _BAD_SECTION_RX,
+    ContentExtractor,
+    _find_article_body,
+    _find_infoboxes,
+    _parse_json_ld,
+    _score_nodes,
+)
+from app.http_client import HttpClient
+from app.page_archive import PageArchive
+from tests.test_site_profiles import load_page
+
+
+def _reference_find_article_body(soup):
+    """Implementação original (quadrática), usada como referência."""
+    candidates = soup.select(
+        "[itemprop='articleBody'], .article-body, .article-content, "
+        ".entry-content, .post-content, article .content, article"
+    )
+    if not candidates:
+        candidates = soup.find_all(True)
+    best, best_score = None, -1
+    for c in candidates:
+        classes = " ".join(c.get("class", [])) + " " + (c.get("id") or "")
+        if _BAD_SECTION_RX.search(classes):
+            continue
+        if c.name in ("header", "footer", "nav", "aside"):
+            continue
+        score = len(c.find_all("p")) + len(c.find_all("figure"))
+        if score > best_score:
+            best, best_score = c, score
+    return best or soup
+
+
+SAMPLES = [
+    # corpo com seletor conhecido + sidebar
+    """<html><body><header><p>menu</p></header>
+    <article><div class="article-body"><p>a</p><figure><img src="x.jpg"></figure><p>b</p></div>
+    <div class="related"><p>r1</p><p>r2</p><p>r3</p><p>r4</p></div></article></body></html>""",
+    # vários candidatos aninhados
+    """<html><body><div class="entry-content"><p>1</p>
+    <div class="post-content"><p>2</p><p>3</p></div></div>
+    <div class="article-content"><p>4</p></div></body></html>""",
+    # fallback sem seletores conhecidos
+    """<html><body><div id="main"><section><p>1</p><p>2</p></section>
+    <section><figure></figure></section></div><footer><p>f</p></footer></body></html>""",
+    # documento sem <p>
+    """<html><body><div><span>nada</span></div></body></html>""",
+]
+
+
+class TestFindArticleBody(unittest.TestCase):
+    """Test cases for the article body detection"""
+
+    def test_matches_reference_implementation(self):
+        """Bottom-up scoring picks the same root as the original algorithm"""
+        for html in SAMPLES:
+            with self.subTest(html=html[:40]):
+                expected = _reference_find_article_body(BeautifulSoup(html, "lxml"))
+                result = _find_article_body(BeautifulSoup(html, "lxml"))
+                self.assertEqual(result.name, expected.name)
+                self.assertEqual(result.get("class"), expected.get("class"))
+                self.assertEqual(str(result), str(expected))
+
+    def test_scores_count_descendants(self):
+        """Scores equal the number of descendant <p> and <figure> tags"""
+        soup = BeautifulSoup(SAMPLES[0], "lxml")
+        scores = _score_nodes(soup)
+        for tag in soup.find_all(True):
+            with self.subTest(tag=tag.name):
+                expected = len(tag.find_all("p")) + len(tag.find_all("figure"))
+                self.assertEqual(scores[id(tag)], expected)
+
+    def test_root_is_cached_per_document(self):
+        """The chosen root is reused on subsequent calls for the same soup"""
+        soup = BeautifulSoup(SAMPLES[0], "lxml")
+        first = _find_article_body(soup)
+        self.assertIs(_find_article_body(soup), first)
+
+    def test_cache_ignores_decomposed_root(self):
+        """A decomposed cached root triggers a fresh detection"""
+        soup = BeautifulSoup(SAMPLES[0], "lxml")
+        _find_article_body(soup).decompose()
+        root = _find_article_body(soup)
+        self.assertFalse(root.decomposed)
+
+
+INFOBOX_HTML = """<html><body><div class="wrapper">
+<p>Intro paragraph about the movie.</p>
+<div class="infobox"><ul>
+<li><strong>Release Date</strong>: July 11, 2025</li>
+<li><strong>Director</strong>: James Gunn</li>
+<li>Cast: David Corenswet</li>
+</ul></div>
+<p>The director said the cast was great.</p>
+<div class="single"><p>Runtime</p><p>129 minutes</p></div>
+</div></body></html>"""
+
+
+class TestRemoveForbiddenBlocks(unittest.TestCase):
+    """Test cases for the infobox removal"""
+
+    def setUp(self):
+        self.extractor = ContentExtractor()
+
+    def test_finds_innermost_infobox(self):
+        """Only the innermost container with 2+ distinct labels is flagged"""
+        soup = BeautifulSoup(INFOBOX_HTML, "lxml")
+        boxes = _find_infoboxes(soup)
+        self.assertEqual([b.name for b in boxes], ["ul"])
+
+    def test_removes_infobox_and_keeps_body(self):
+        """Infobox goes away, regular paragraphs and the wrapper stay"""
+        soup = BeautifulSoup(INFOBOX_HTML, "lxml")
+        self.extractor._remove_forbidden_blocks(soup)
+        text = soup.get_text()
+        self.assertNotIn("James Gunn", text)
+        self.assertIn("Intro paragraph", text)
+        self.assertIn("The director said the cast was great.", text)
+        self.assertIsNotNone(soup.find("div", class_="wrapper"))
+
+    def test_labels_in_prose_wrapper_are_not_an_infobox(self):
+        """Bold labels between body paragraphs do not turn the article wrapper into an infobox"""
+        html = ('<html><body><div class="entry"><p>Intro about the movie.</p><p><b>Director</b></p>'
+                '<p>Body paragraph about the director.</p><p><b>Cast</b></p>'
+                '<p>Body paragraph about the cast.</p></div></body></html>')
+        soup = BeautifulSoup(html, "lxml")
+        self.assertEqual(_find_infoboxes(soup), [])
+        self.extractor._remove_forbidden_blocks(soup)
+        self.assertIsNotNone(soup.find("div", class_="entry"))
+        self.assertIn("Body paragraph about the cast.", soup.get_text())
+
+    def test_table_and_definition_list_rows(self):
+        """Label/value rows in a table or a dl are recognized"""
+        soup = BeautifulSoup('<table><tr><th>Director</th><td>James Gunn</td></tr>'
+                             '<tr><th>Runtime</th><td>129 minutes</td></tr></table>'
+                             '<dl><dt>Writer</dt><dd>James Gunn</dd><dt>Cast</dt><dd>David Corenswet</dd></dl>',
+                             "lxml")
+        self.assertEqual([b.name for b in _find_infoboxes(soup)], ["table", "dl"])
+
+    def test_single_label_container_is_kept(self):
+        """A container with a single label is not an infobox"""
+        soup = BeautifulSoup(INFOBOX_HTML, "lxml")
+        self.extractor._remove_forbidden_blocks(soup)
+        self.assertIn("129 minutes", soup.get_text())
+        self.assertNotIn("Runtime", soup.get_text())
+
+
+class TestJsonLdMetadata(unittest.TestCase):
+    """Test cases for the JSON-LD structured-data fast path"""
+
+    def test_news_article_fields(self):
+        """Headline, description, date and images come from the NewsArticle object"""
+        url, html = load_page('screenrant_superman.html')
+        meta = _parse_json_ld(BeautifulSoup(html, 'lxml'), url)
+        self.assertEqual(meta['title'], "Superman's Second Weekend Box Office Beats Every DCEU Movie")
+        self.assertTrue(meta['excerpt'].startswith("James Gunn's Superman"))
+        self.assertEqual(meta['published_date'], '2025-07-20T14:00:00Z')
+        self.assertEqual(meta['images'], ['https://static1.srcdn.com/wordpress/wp-content/uploads/2025/07/superman-hero.jpg'])
+
+    def test_graph_and_image_lists(self):
+        """Articles inside @graph and relative image lists are understood"""
+        html = (
+            '<script type="application/ld+json">{"@graph": [{"@type": "WebPage"}, '
+            '{"@type": ["NewsArticle"], "headline": "A &amp; B", '
+            '"image": ["/a.jpg", {"@type": "ImageObject", "url": "/b.jpg"}, "/a.jpg"]}]}</script>'
+            '<script type="application/ld+json">{broken</script>'
+        )
+        meta = _parse_json_ld(BeautifulSoup(html, 'lxml'), 'https://a.com/x/')
+        self.assertEqual(meta, {'title': 'A & B', 'images': ['https://a.com/a.jpg', 'https://a.com/b.jpg']})
+
+    def test_extract_uses_structured_data(self):
+        """extract fills title, excerpt, date and featured image from JSON-LD"""
+        url, html = load_page('collider_andor.html')
+        extractor = ContentExtractor()
+        with patch.object(extractor, '_fetch_page', return_value=(html, None)):
+            result = extractor.extract(url)
+        meta = _parse_json_ld(BeautifulSoup(html, 'lxml'), url)
+        self.assertEqual(result['title'], meta['title'])
+        self.assertEqual(result['published_date'], meta['published_date'])
+        self.assertEqual(result['featured_image_url'], meta['images'][0])
+
+    def test_dom_fallback_without_json_ld(self):
+        """Pages without JSON-LD still get their metadata from the meta tags"""
+        url, html = load_page('screenrant_superman.html')
+        html = re.sub(r'<script type="application/ld\+json">.*?</script>', '', html, flags=re.S)
+        extractor = ContentExtractor()
+        with patch.object(extractor, '_fetch_page', return_value=(html, None)):
+            result = extractor.extract(url)
+        self.assertEqual(result['title'], "Superman's Second Weekend Box Office Beats Every DCEU Movie")
+        self.assertIsNone(result['published_date'])
+        self.assertTrue(result['featured_image_url'].endswith('superman-hero.jpg'))
+
+
+class TestStreamingFetch(unittest.TestCase):
+    """Test cases for the bounded streaming download in ContentExtractor._fetch_page"""
+
+    CHUNK = 512
+
+    def setUp(self):
+        self.url, html = load_page('screenrant_superman.html')
+        # sidebar/rodapé grandes depois do corpo do artigo
+        self.page = html.replace('</body>', '<div class="sidebar">' + '<p>related</p>' * 2000 + '</div></body>')
+        self.page_bytes = self.page.encode('utf-8')
+        self.sent = 0
+
+    def _extractor(self, **kwargs):
+        def chunks():
+            for i in range(0, len(self.page_bytes), self.CHUNK):
+                self.sent += 1
+                yield self.page_bytes[i:i + self.CHUNK]
+
+        def handler(request):
+            return httpx.Response(200, content=chunks(), headers={'content-type': 'text/html; charset=UTF-8'})
+
+        return ContentExtractor(http_client=HttpClient(transport=httpx.MockTransport(handler)), **kwargs)
+
+    def test_stops_after_article_body_closes(self):
+        """With a site profile the download stops once the body container closes"""
+        body, encoding = self._extractor()._fetch_page(self.url)
+        self.assertEqual(encoding, 'utf-8')
+        self.assertLess(len(body), len(self.page_bytes) // 2)
+        self.assertLess(self.sent, len(self.page_bytes) // self.CHUNK)
+        self.assertIn(b'</section>', body)
+
+    def test_truncated_page_extracts_like_full_page(self):
+        """Stopping early doesn't change the extracted article"""
+        streamed = self._extractor().extract(self.url)
+        with patch.object(ContentExtractor, '_fetch_page', return_value=(self.page_bytes, 'utf-8')):
+            full = ContentExtractor().extract(self.url)
+        self.assertEqual(streamed['content'], full['content'])
+        self.assertEqual(streamed['title'], full['title'])
+
+    def test_without_profile_reads_whole_page(self):
+        """Pages without a profile are read to the end"""
+        body, _ = self._extractor(use_site_profiles=False)._fetch_page(self.url)
+        self.assertEqual(body, self.page_bytes)
+
+    def test_only_complete_pages_archived(self):
+        """A download cut at the end of the article body is not archived; a complete one is"""
+        tmp_dir = tempfile.mkdtemp()
+        archive = PageArchive(directory=tmp_dir)
+        try:
+            self._extractor(page_archive=archive)._fetch_page(self.url)
+            self.assertIsNone(archive.get(self.url))
+            self._extractor(page_archive=archive, use_site_profiles=False)._fetch_page(self.url)
+            self.assertEqual(archive.get(self.url), self.page_bytes)
+        finally:
+            archive.close()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def test_byte_budget(self):
+        """The download never exceeds the configured maximum size"""
+        extractor = self._extractor(use_site_profiles=False)
+        extractor.max_html_bytes = 4096
+        body, _ = extractor._fetch_page(self.url)
+        self.assertEqual(len(body), 4096)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the http_cache module
+"""
+
+import shutil
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+import httpx
+
+from app.extractor import ContentExtractor
+from app.http_cache import HttpCache, normalize_url
+from app.http_client import HttpClient
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    """Test cases for the cache key normalization"""
+
+    def test_equivalent_urls(self):
+        """Case, fragments, default ports, tracking params and query order don't matter"""
+        base = normalize_url('https://screenrant.com/article/?a=1&b=2')
+        for url in ('HTTPS://ScreenRant.com:443/article/?b=2&a=1',
+                    'https://screenrant.com/article/?a=1&b=2#comments',
+                    'https://screenrant.com/article/?utm_source=rss&a=1&b=2&fbclid=x'):
+            with self.subTest(url=url):
+                self.assertEqual(normalize_url(url), base)
+
+    def test_different_paths(self):
+        """Different paths keep different keys"""
+        self.assertNotEqual(normalize_url('https://a.com/x/'), normalize_url('https://a.com/y/'))
+
+
+class TestHttpCache(unittest.TestCase):
+    """Test cases for the HttpCache class"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = HttpCache(db_path=str(Path(self.tmp_dir) / 'cache.db'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_roundtrip_with_validators(self):
+        """Bodies and validators survive a put/get"""
+        self.cache.put('https://a.com/x', b'<html>x</html>', {'etag': '"v1"', 'last-modified': 'Mon, 01 Jan 2024'})
+        entry = self.cache.get('https://a.com/x#frag')
+        self.assertEqual(entry['body'], b'<html>x</html>')
+        self.assertTrue(entry['fresh'])
+        self.assertEqual(self.cache.conditional_headers(entry),
+                         {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024'})
+
+    def test_lru_eviction_by_size(self):
+        """The least recently used entries are evicted once the size budget is exceeded"""
+        self.cache.max_bytes = 3 * len(zlib.compress(b'a' * 1000, 6))
+        for name in ('a', 'b', 'c'):
+            self.cache.put(f'https://a.com/{name}', b'a' * 1000, {})
+        self.cache.get('https://a.com/a')  # 'b' passa a ser o menos recente
+        self.cache.put('https://a.com/d', b'a' * 1000, {})
+        self.assertIsNotNone(self.cache.get('https://a.com/a'))
+        self.assertIsNone(self.cache.get('https://a.com/b'))
+        self.assertIsNotNone(self.cache.get('https://a.com/d'))
+        self.assertLessEqual(self.cache.total_size(), self.cache.max_bytes)
+
+
+class TestExtractorHttpCache(unittest.TestCase):
+    """Test cases for ContentExtractor._fetch_page with the cache"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = HttpCache(db_path=str(Path(self.tmp_dir) / 'cache.db'), fresh_seconds=0)
+        self.requests = []
+        self.responses = []
+        client = HttpClient(transport=httpx.MockTransport(self._handler))
+        self.extractor = ContentExtractor(http_cache=self.cache, http_client=client)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _handler(self, request):
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+    def test_stale_entry_is_revalidated(self):
+        """A stale entry sends a conditional request and a 304 reuses the stored body"""
+        url = 'https://screenrant.com/x/'
+        self.responses = [
+            httpx.Response(200, content=b'<html>v1</html>',
+                           headers={'etag': '"v1"', 'content-type': 'text/html; charset=utf-8'}),
+            httpx.Response(304),
+        ]
+        self.assertEqual(self.extractor._fetch_page(url), (b'<html>v1</html>', 'utf-8'))
+        self.assertEqual(self.extractor._fetch_page(url), (b'<html>v1</html>', 'utf-8'))
+        self.assertEqual(self.requests[-1].headers['if-none-match'], '"v1"')
+
+    def test_partial_body_is_not_revalidated(self):
+        """A body cut short is stored without validators, so a stale copy is downloaded again in full"""
+        url = 'https://a.com/partial/'
+        self.extractor.max_html_bytes = 8
+        self.responses = [
+            httpx.Response(200, content=b'<html>truncated</html>', headers={'etag': '"v1"'}),
+            httpx.Response(200, content=b'<html>ok</html>', headers={'etag': '"v1"'}),
+        ]
+        self.assertEqual(self.extractor._fetch_page(url), (b'<html>tr', None))
+        self.assertEqual(self.cache.conditional_headers(self.cache.get(url)), {})
+        self.extractor.max_html_bytes = 1024
+        self.assertEqual(self.extractor._fetch_page(url), (b'<html>ok</html>', None))
+        self.assertNotIn('if-none-match', self.requests[-1].headers)
+
+    def test_fresh_entry_skips_network(self):
+        """A fresh entry is served without any request"""
+        self.cache.fresh_seconds = 3600
+        self.cache.put('https://screenrant.com/y/', b'<html>y</html>', {})
+        self.assertEqual(self.extractor._fetch_page('https://screenrant.com/y/'), (b'<html>y</html>', None))
+        self.assertEqual(self.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
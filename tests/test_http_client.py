@@ -0,0 +1,99 @@
+"""
+Unit tests for the http_client module
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from app.http_client import HttpClient
+
+
+def make_client(handler, **config):
+    """HttpClient backed by an in-process httpx.MockTransport."""
+    return HttpClient(config={'retries': 2, **config}, transport=httpx.MockTransport(handler))
+
+
+class TestHttpClient(unittest.TestCase):
+    """Test cases for the shared HttpClient"""
+
+    def setUp(self):
+        patcher = patch('app.http_client.time.sleep')
+        self.mock_sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_idempotent_requests_on_5xx(self):
+        """GET is retried on 503 and the final response is returned"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503 if len(calls) < 3 else 200, text='ok')
+
+        client = make_client(handler)
+        response = client.get('https://a.com/x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(client.metrics['a.com']['requests'], 3)
+        self.assertEqual(client.metrics['a.com']['retries'], 2)
+
+    def test_does_not_retry_post_on_5xx(self):
+        """POST may have side effects, so a 5xx is returned as is"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500)
+
+        response = make_client(handler).post('https://a.com/x', json={})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(calls), 1)
+
+    def test_retry_after_is_honored(self):
+        """A 429 with Retry-After waits the advertised time"""
+        responses = [httpx.Response(429, headers={'Retry-After': '3'}), httpx.Response(200)]
+        client = make_client(lambda request: responses.pop(0))
+        self.assertEqual(client.get('https://a.com/x').status_code, 200)
+        self.mock_sleep.assert_called_once_with(3.0)
+
+    def test_non_ascii_header_values(self):
+        """Non-ASCII header values are sent as latin-1 instead of failing"""
+        seen = {}
+
+        def handler(request):
+            seen['ua'] = request.headers.get('user-agent')
+            return httpx.Response(200)
+
+        make_client(handler).get('https://a.com/x', headers={'User-Agent': 'Máquina Nerd'})
+        self.assertEqual(seen['ua'], 'Máquina Nerd')
+
+    def test_per_host_concurrency_limit(self):
+        """No more than max_connections_per_host requests run at once against a host"""
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def handler(request):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return httpx.Response(200)
+
+        client = make_client(handler, max_connections_per_host=2)
+        client.map(lambda i: client.get(f'https://a.com/{i}'), range(8), max_workers=8)
+        self.assertLessEqual(state['peak'], 2)
+
+    def test_map_keeps_order(self):
+        """map returns results in input order"""
+        client = make_client(lambda request: httpx.Response(200, text=request.url.path))
+        paths = client.map(lambda i: client.get(f'https://a.com/{i}').text, range(5))
+        self.assertEqual(paths, [f'/{i}' for i in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Unit tests for the image_probe module
+"""
+
+import io
+import unittest
+from unittest.mock import patch
+
+import httpx
+from PIL import Image
+
+from app.extractor import ContentExtractor
+from app.http_client import HttpClient
+from app.image_probe import ImageProber, image_size, rank_by_size
+
+
+def make_image(fmt, size):
+    """Encoded bytes of a blank image."""
+    buf = io.BytesIO()
+    Image.new('RGB', size, 'white').save(buf, format=fmt)
+    return buf.getvalue()
+
+
+class TestImageSize(unittest.TestCase):
+    """Test cases for the header parsers"""
+
+    def test_formats(self):
+        """Format and dimensions are read for the common web formats"""
+        for fmt, name in (('PNG', 'png'), ('GIF', 'gif'), ('JPEG', 'jpeg'), ('WEBP', 'webp')):
+            with self.subTest(fmt=fmt):
+                self.assertEqual(image_size(make_image(fmt, (1200, 675))), (name, 1200, 675))
+
+    def test_incomplete_header(self):
+        """A truncated header returns None instead of guessing"""
+        self.assertIsNone(image_size(make_image('PNG', (10, 10))[:12]))
+        self.assertIsNone(image_size(b'\xff\xd8\xff\xe0\x00\x10JFIF'))
+
+
+class TestImageProber(unittest.TestCase):
+    """Test cases for the ImageProber class"""
+
+    def setUp(self):
+        self.images = {
+            '/big.jpg': make_image('JPEG', (1600, 900)),
+            '/thumb.png': make_image('PNG', (420, 300)),
+        }
+        self.requests = []
+
+    def _prober(self, honor_range=True):
+        def handler(request):
+            self.requests.append(request)
+            body = self.images.get(request.url.path)
+            if body is None:
+                return httpx.Response(404)
+            if honor_range and 'range' in request.headers:
+                end = int(request.headers['range'].split('-')[1])
+                return httpx.Response(206, content=body[:end + 1])
+            return httpx.Response(200, content=body)
+        return ImageProber(http_client=HttpClient(transport=httpx.MockTransport(handler)), probe_bytes=1024)
+
+    def test_range_probe_and_cache(self):
+        """Probes send a Range request and repeated URLs come from the cache"""
+        prober = self._prober()
+        info = prober.probe('https://cdn.com/big.jpg')
+        self.assertEqual(info, {'format': 'jpeg', 'width': 1600, 'height': 900})
+        self.assertEqual(self.requests[0].headers['range'], 'bytes=0-1023')
+        prober.probe('https://cdn.com/big.jpg')
+        self.assertEqual(len(self.requests), 1)
+
+    def test_server_without_range_support(self):
+        """A plain 200 response is still read only up to the header"""
+        info = self._prober(honor_range=False).probe('https://cdn.com/thumb.png')
+        self.assertEqual((info['width'], info['height']), (420, 300))
+
+    def test_probe_many_with_failures(self):
+        """Failed probes map to None"""
+        result = self._prober().probe_many(['https://cdn.com/big.jpg', 'https://cdn.com/missing.jpg'])
+        self.assertEqual(result['https://cdn.com/big.jpg']['width'], 1600)
+        self.assertIsNone(result['https://cdn.com/missing.jpg'])
+
+    def test_rank_by_size(self):
+        """Small images are dropped, the rest ordered by area, unknown ones last"""
+        probes = {
+            'a': {'width': 800, 'height': 450},
+            'b': {'width': 420, 'height': 300},
+            'c': {'width': 1600, 'height': 900},
+            'd': None,
+        }
+        self.assertEqual(rank_by_size(['a', 'b', 'd', 'c'], probes, 500, 250), ['c', 'a', 'd'])
+
+    def test_extractor_uses_real_sizes(self):
+        """Images are kept or dropped by their real size, not by URL parameters"""
+        self.images['/scaled.jpg'] = make_image('JPEG', (1200, 800))
+        html = (
+            '<html><head><title>T</title></head><body><article>'
+            + '<p>' + 'Texto do artigo. ' * 40 + '</p>'
+            + '<figure><img src="https://cdn.com/scaled.jpg?w=300"></figure>'
+            + '<figure><img src="https://cdn.com/thumb.png"></figure>'
+            + '<figure><img src="https://cdn.com/big.jpg"></figure>'
+            + '<p>' + 'Mais texto. ' * 40 + '</p>'
+            + '</article></body></html>'
+        )
+        extractor = ContentExtractor(use_site_profiles=False, image_prober=self._prober())
+        with patch.object(extractor, '_fetch_page', return_value=(html, None)):
+            result = extractor.extract('https://a.com/post/')
+        self.assertEqual(result['images'], ['https://cdn.com/big.jpg', 'https://cdn.com/scaled.jpg?w=300'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Unit tests for the image_variants module
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extractor import collect_images_from_article
+from app.html_utils import merge_images_into_content, rewrite_img_srcs_with_wp
+from app.image_variants import ImageVariantIndex, canonical_key, variant_width
+
+ASSET = 'https://static1.srcdn.com/wordpress/wp-content/uploads/2025/07/superman-hero.jpg'
+
+
+class TestCanonicalKey(unittest.TestCase):
+    """Test cases for canonical_key and variant_width"""
+
+    def test_cdn_variants_share_a_key(self):
+        """Resize parameters and shard numbers don't change the key on Valnet CDNs"""
+        key = canonical_key(ASSET)
+        for url in (ASSET + '?q=50&fit=crop&w=825&dpr=1.5',
+                    ASSET + '?w=1600',
+                    ASSET.replace('static1', 'static3') + '/'):
+            with self.subTest(url=url):
+                self.assertEqual(canonical_key(url), key)
+
+    def test_other_hosts_keep_query(self):
+        """Query strings elsewhere may select different files"""
+        self.assertNotEqual(canonical_key('https://a.com/img?id=1'), canonical_key('https://a.com/img?id=2'))
+
+    def test_variant_width(self):
+        """Width is w x dpr, a srcset descriptor wins, originals have none"""
+        self.assertEqual(variant_width(ASSET + '?w=825&dpr=1.5'), 1237)
+        self.assertEqual(variant_width(ASSET + '?w=825', 480), 480)
+        self.assertIsNone(variant_width(ASSET))
+
+
+class TestImageVariantIndex(unittest.TestCase):
+    """Test cases for the ImageVariantIndex class"""
+
+    def test_best_variant_under_target(self):
+        """The widest variant at or below the target width is chosen"""
+        index = ImageVariantIndex(target_width=1600)
+        for w in (480, 825, 1200, 2400):
+            index.add(f'{ASSET}?w={w}')
+        index.add(ASSET)
+        self.assertEqual(index.urls(), [f'{ASSET}?w=1200'])
+
+    def test_original_then_narrowest(self):
+        """Without a fitting variant the original is used, else the narrowest"""
+        index = ImageVariantIndex(target_width=800)
+        index.add(f'{ASSET}?w=1200')
+        index.add(ASSET)
+        self.assertEqual(index.urls(), [ASSET])
+        index = ImageVariantIndex(target_width=800)
+        index.add(f'{ASSET}?w=2400')
+        index.add(f'{ASSET}?w=1200')
+        self.assertEqual(index.urls(), [f'{ASSET}?w=1200'])
+
+
+class TestVariantDedup(unittest.TestCase):
+    """Test cases for variant dedup in image collection and content merging"""
+
+    def test_collect_keeps_one_variant_per_asset(self):
+        """src, srcset and <picture> variants of one asset give a single image"""
+        html = f'''
+        <article>
+          <p>a</p><p>b</p>
+          <figure><picture>
+            <source srcset="{ASSET}?w=480 480w, {ASSET}?w=1200 1200w">
+            <img src="{ASSET}?q=50&fit=crop&w=825&dpr=1.5" srcset="{ASSET}?w=825 825w, {ASSET}?w=2400 2400w">
+          </picture></figure>
+        </article>'''
+        images = collect_images_from_article(BeautifulSoup(html, 'lxml'), 'https://screenrant.com/x/')
+        self.assertEqual(images, [f'{ASSET}?q=50&fit=crop&w=825&dpr=1.5'])
+
+    def test_merge_and_rewrite_match_other_variants(self):
+        """A variant already in the content is not injected again and gets the uploaded URL"""
+        content = f'<p>a</p><figure><img src="{ASSET}?w=825"></figure>'
+        merged = merge_images_into_content(content, [f'{ASSET}?w=1200'])
+        self.assertEqual(merged.count('<img'), 1)
+        rewritten = rewrite_img_srcs_with_wp(merged, {f'{ASSET}?w=1200': 'https://wp.example/hero.jpg'})
+        self.assertIn('https://wp.example/hero.jpg', rewritten)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Unit tests for the json_repair module
+"""
+
+import unittest
+
+from app.json_repair import repair_json
+
+
+class TestRepairJson(unittest.TestCase):
+    """Test cases for repair_json"""
+
+    def test_valid_json_untouched(self):
+        """Valid JSON decodes with no repairs"""
+        self.assertEqual(repair_json(' {"a": [1, 2]} '), ({'a': [1, 2]}, []))
+
+    def test_fence_and_prose(self):
+        """Code fences and text around the object are dropped"""
+        value, repairs = repair_json('Claro! Aqui está:\n```json\n{"a": 1}\n```\nBoa leitura.')
+        self.assertEqual(value, {'a': 1})
+        self.assertIn('fence', repairs)
+        value, repairs = repair_json('Resultado: {"a": 1} fim')
+        self.assertEqual((value, repairs), ({'a': 1}, ['prose']))
+
+    def test_trailing_commas_and_raw_newlines(self):
+        """Trailing commas go away; raw newlines inside strings are accepted"""
+        value, repairs = repair_json('{"a": "<p>x</p>\n<p>y</p>", "b": [1, 2,],}')
+        self.assertEqual(value, {'a': '<p>x</p>\n<p>y</p>', 'b': [1, 2]})
+        self.assertEqual(repairs, ['trailing_comma', 'control_chars'])
+
+    def test_truncated_tail_keeps_complete_fields(self):
+        """A cut-off response keeps the fields that were complete; the one being written is dropped"""
+        text = '{"titulo_final": "T", "conteudo_final": "<p>a, b}</p>", "tags": ["x", "y"], "yoast_meta": {"_yoast'
+        value, repairs = repair_json(text)
+        self.assertEqual(value, {'titulo_final': 'T', 'conteudo_final': '<p>a, b}</p>', 'tags': ['x', 'y']})
+        self.assertEqual(repairs[-1], 'partial')
+
+    def test_unrecoverable(self):
+        """Text without any complete field raises ValueError"""
+        for text in ('Desculpe, não posso ajudar.', '{"titulo_final": "meio', ''):
+            with self.assertRaises(ValueError, msg=text):
+                repair_json(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
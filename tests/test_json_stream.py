@@ -0,0 +1,71 @@
+"""
+Unit tests for the json_stream module
+"""
+
+import json
+import unittest
+
+from app.json_stream import JsonFieldStream, JsonStreamError
+
+
+class TestJsonFieldStream(unittest.TestCase):
+    """Test cases for the JsonFieldStream class"""
+
+    def _feed(self, text, size=7):
+        seen = []
+        stream = JsonFieldStream(lambda name, value: seen.append((name, value)))
+        for i in range(0, len(text), size):
+            stream.feed(text[i:i + size])
+        return stream, seen
+
+    def test_fields_reported_as_they_close(self):
+        """Each top-level field is decoded once its value is complete, whatever the chunking"""
+        data = {
+            'titulo_final': 'Título com "aspas" e \\ barra',
+            'conteudo_final': '<p>{não é json}</p>',
+            'tags': ['a', 'b'],
+            'yoast_meta': {'x': [1, {'y': None}]},
+            'nota': 4.5,
+            'ok': True,
+        }
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        for size in (1, 5, len(text)):
+            stream, seen = self._feed(text, size)
+            self.assertEqual(seen, list(data.items()))
+            self.assertTrue(stream.done)
+
+    def test_tags_before_end(self):
+        """A field is available before the rest of the object arrives"""
+        seen = []
+        stream = JsonFieldStream(lambda name, value: seen.append(name))
+        stream.feed('{"tags": ["a"], "conteudo_final": "<p>come')
+        self.assertEqual(seen, ['tags'])
+        self.assertFalse(stream.done)
+
+    def test_code_fence(self):
+        """A ```json fence around the object is accepted"""
+        stream, seen = self._feed('```json\n{"a": 1}\n```')
+        self.assertEqual(seen, [('a', 1)])
+        self.assertTrue(stream.done)
+
+    def test_prose_aborts_immediately(self):
+        """Text that does not open an object fails on the first character"""
+        stream = JsonFieldStream()
+        with self.assertRaises(JsonStreamError):
+            stream.feed('Desculpe, não posso')
+
+    def test_structural_errors(self):
+        """Mismatched brackets and garbage between fields fail as soon as they appear"""
+        for text in ('{"a": [1, 2}', '{"a": 1 "b": 2}', '{"a": tru }', '{"a" 1}', '{"a": }'):
+            with self.assertRaises(JsonStreamError, msg=text):
+                JsonFieldStream().feed(text)
+
+    def test_trailing_comma_is_not_fatal(self):
+        """A comma before the closing brace is left for the final parse"""
+        stream, seen = self._feed('{"a": 1,}')
+        self.assertEqual(seen, [('a', 1)])
+        self.assertTrue(stream.done)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Unit tests for the keys module
+"""
+
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from app.keys import KeyManager, key_hash
+from app.store import migrate_api_key_status
+
+
+class TestKeyManager(unittest.TestCase):
+    """Test cases for the KeyManager class"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmp.name) / 'app.db')
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.close()
+        self.tmp.cleanup()
+
+    def _manager(self, keys=('key-aaaa', 'key-bbbb'), **kwargs):
+        kwargs.setdefault('requests_per_minute', 10)
+        kwargs.setdefault('requests_per_day', 100)
+        manager = KeyManager('movies', list(keys), db_path=self.db_path, **kwargs)
+        self.managers.append(manager)
+        return manager
+
+    def test_rotates_least_recently_used(self):
+        """Keys are handed out in turn"""
+        manager = self._manager()
+        self.assertEqual(manager.acquire(), 'key-aaaa')
+        self.assertEqual(manager.acquire(), 'key-bbbb')
+        self.assertEqual(manager.acquire(), 'key-aaaa')
+
+    def test_per_minute_limit(self):
+        """A key over its RPM is skipped until the minute window ends"""
+        manager = self._manager(keys=('key-aaaa',), requests_per_minute=2)
+        self.assertEqual(manager.acquire(), 'key-aaaa')
+        self.assertEqual(manager.acquire(), 'key-aaaa')
+        self.assertIsNone(manager.acquire())
+        self.assertGreater(manager.next_available_in(), 0)
+
+    def test_tokens_per_minute(self):
+        """Requests are charged against the TPM budget and corrected with billed usage"""
+        manager = self._manager(keys=('key-aaaa',), tokens_per_minute=1000)
+        self.assertEqual(manager.acquire(600), 'key-aaaa')
+        self.assertIsNone(manager.acquire(600))
+        self.assertGreater(manager.next_available_in(600), 0)
+        manager.record_usage('key-aaaa', 600, 300)
+        self.assertEqual(manager.acquire(600), 'key-aaaa')
+        self.assertEqual(manager.status()[0]['minute_tokens'], 900)
+
+    def test_release_refunds_reservation(self):
+        """Releasing a key gives back its request and tokens without touching its failures"""
+        manager = self._manager(keys=('key-aaaa',), requests_per_minute=1, tokens_per_minute=1000)
+        manager.report_failure('key-aaaa', 'timeout', retry_after=0.01)
+        time.sleep(0.02)
+        self.assertEqual(manager.acquire(600), 'key-aaaa')
+        self.assertIsNone(manager.acquire(600))
+        manager.release('key-aaaa', 600)
+        row = manager.status()[0]
+        self.assertEqual((row['minute_count'], row['minute_tokens'], row['day_count']), (0, 0, 0))
+        self.assertEqual(row['failures'], 1)
+        self.assertEqual(manager.acquire(600), 'key-aaaa')
+
+    def test_oversized_request_in_empty_window(self):
+        """A prompt larger than the whole TPM still goes out in a fresh minute"""
+        manager = self._manager(keys=('key-aaaa',), tokens_per_minute=1000)
+        self.assertEqual(manager.acquire(5000), 'key-aaaa')
+        self.assertIsNone(manager.acquire(10))
+
+    def test_cooldown_shared_across_instances(self):
+        """A key cooling down in one process is skipped by another"""
+        first = self._manager()
+        first.report_failure('key-aaaa', '429 Resource exhausted', retry_after=120)
+        second = self._manager()
+        self.assertEqual([second.acquire() for _ in range(3)], ['key-bbbb'] * 3)
+        second.report_success('key-aaaa')
+        self.assertEqual(first.acquire(), 'key-aaaa')
+
+    def test_exponential_backoff(self):
+        """Repeated failures double the cooldown up to the cap"""
+        manager = self._manager(base_cooldown_seconds=10, max_cooldown_seconds=25)
+        cooldowns = []
+        for _ in range(3):
+            manager.report_failure('key-aaaa', 'timeout')
+            row = next(r for r in manager.status() if r['key_hash'] == key_hash('key-aaaa'))
+            cooldowns.append(round(row['cooldown_until'] - time.time()))
+        self.assertEqual(cooldowns, [10, 20, 25])
+
+    def test_concurrent_failures_all_counted(self):
+        """Failures reported at the same time from several threads and instances are all counted"""
+        managers = [self._manager(base_cooldown_seconds=1, max_cooldown_seconds=10) for _ in range(4)]
+        threads = [threading.Thread(target=lambda m=m: [m.report_failure('key-aaaa', 'timeout') for _ in range(10)])
+                   for m in managers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        row = next(r for r in managers[0].status() if r['key_hash'] == key_hash('key-aaaa'))
+        self.assertEqual(row['failures'], 40)
+
+    def test_invalid_and_exhausted_keys(self):
+        """Invalid keys and keys out of daily quota are not handed out"""
+        manager = self._manager(keys=('key-aaaa', 'key-bbbb', 'key-cccc'))
+        manager.report_invalid('key-aaaa', 'API key not valid')
+        manager.report_quota_exhausted('key-bbbb', 'Quota exceeded per day')
+        self.assertEqual(manager.acquire(), 'key-cccc')
+        status = {r['key_hash']: r for r in manager.status()}
+        self.assertEqual(status[key_hash('key-aaaa')]['is_valid'], 0)
+        self.assertEqual(status[key_hash('key-bbbb')]['day_count'], 100)
+
+    def test_keys_are_not_stored(self):
+        """Only the hash and a masked suffix of each key reach the database"""
+        self._manager(keys=('secret-key-1234',))
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT key_hash, api_key FROM api_key_status").fetchall()
+        conn.close()
+        self.assertEqual(rows, [(key_hash('secret-key-1234'), '...1234')])
+
+    def test_migrates_old_table(self):
+        """The original api_key_status schema gains the usage columns"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "CREATE TABLE api_key_status (key_hash TEXT PRIMARY KEY, api_key TEXT NOT NULL, "
+            "category TEXT NOT NULL, is_valid BOOLEAN DEFAULT 1, cooldown_until DATETIME)"
+        )
+        conn.execute("INSERT INTO api_key_status VALUES ('h', '...abcd', 'movies', 1, NULL)")
+        migrate_api_key_status(conn)
+        migrate_api_key_status(conn)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(api_key_status)")}
+        conn.close()
+        self.assertTrue({'failures', 'minute_count', 'day_count', 'last_used'} <= columns)
+        self.assertEqual(self._manager().acquire(), 'key-aaaa')
+
+
+if __name__ == '__main__':
+    unittest.main()
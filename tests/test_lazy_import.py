@@ -0,0 +1,50 @@
+"""
+Unit tests for the lazy_import module
+"""
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.lazy_import import lazy_import
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestLazyImport(unittest.TestCase):
+    """Test cases for lazy_import"""
+
+    def test_imports_on_first_attribute(self):
+        """The module is only imported when an attribute is read"""
+        sys.modules.pop('colorsys', None)
+        module = lazy_import('colorsys')
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn('colorsys', sys.modules)
+
+    def test_loaded_module_returned_as_is(self):
+        """An already imported module is returned directly"""
+        import json
+        self.assertIs(lazy_import('json'), json)
+
+    def test_patch_and_restore(self):
+        """mock.patch on an attribute shadows the real one and is undone on exit"""
+        sys.modules.pop('colorsys', None)
+        module = lazy_import('colorsys')
+        with patch.object(module, 'rgb_to_hsv', return_value='patched'):
+            self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), 'patched')
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+
+    def test_once_startup_skips_heavy_imports(self):
+        """Importing app.main loads neither the scheduler nor the parsers and HTTP client"""
+        heavy = ('apscheduler', 'trafilatura', 'bs4', 'lxml', 'httpx', 'soupsieve', 'feedparser')
+        code = f"import sys, app.main; print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+        proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Unit tests for the model_router module
+"""
+
+import unittest
+from unittest.mock import patch
+
+from app.model_router import ModelRouter
+
+
+class TestModelRouter(unittest.TestCase):
+    """Test cases for the ModelRouter class"""
+
+    def _router(self, **kwargs):
+        kwargs.setdefault('light_model', 'flash-8b')
+        kwargs.setdefault('light_max_tokens', 1000)
+        return ModelRouter(['pro', 'flash', 'flash'], **kwargs)
+
+    def test_base_model_by_size_and_category(self):
+        """Short articles go to the light model; a category override wins over size"""
+        router = self._router(category_models={'games': 'flash'})
+        self.assertEqual(router.base_model(500, 'movies'), 'flash-8b')
+        self.assertEqual(router.base_model(5000, 'movies'), 'pro')
+        self.assertEqual(router.base_model(500, 'games'), 'flash')
+        self.assertEqual(self._router(light_model='').base_model(500, 'movies'), 'pro')
+
+    def test_route_follows_the_chain(self):
+        """The chosen model comes first, then the rest of the chain without duplicates"""
+        router = self._router()
+        self.assertEqual(router.route('flash-8b'), ['flash-8b', 'pro', 'flash'])
+        self.assertEqual(router.route('pro'), ['pro', 'flash'])
+
+    def test_unhealthy_models_move_last(self):
+        """Errors or latency over the target demote a model until its samples age out"""
+        router = self._router(latency_target_seconds=10, max_error_rate=0.5, min_samples=3, window_seconds=60)
+        for _ in range(3):
+            router.record('pro', 2.0, False)
+        self.assertEqual(router.stats('pro')['error_rate'], 1.0)
+        self.assertEqual(router.route('pro'), ['flash', 'pro'])
+        for _ in range(3):
+            router.record('flash', 25.0, True)
+        self.assertEqual(router.route('flash-8b'), ['flash-8b', 'pro', 'flash'])
+        with patch('app.model_router.time.time', return_value=10 ** 10):
+            self.assertEqual(router.stats('pro')['samples'], 0)
+            self.assertEqual(router.route('pro'), ['pro', 'flash'])
+
+    def test_few_samples_do_not_demote(self):
+        """A single failure is not enough to reorder the chain"""
+        router = self._router(min_samples=3)
+        router.record('pro', 1.0, False)
+        self.assertEqual(router.route('pro'), ['pro', 'flash'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Unit tests for the page_archive module
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from app import page_archive
+from app.extractor import ContentExtractor
+from app.page_archive import PageArchive, prune_segments
+from tests.test_site_profiles import load_page
+
+
+class TestPageArchive(unittest.TestCase):
+    """Test cases for the PageArchive class"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _archive(self, **kwargs):
+        archive = PageArchive(directory=self.tmp_dir, **kwargs)
+        self.addCleanup(archive.close)
+        return archive
+
+    def test_roundtrip_open_and_sealed_segments(self):
+        """Pages are readable from the open segment and after sealing"""
+        archive = self._archive()
+        archive.put('https://a.com/x', b'<html>x</html>')
+        self.assertEqual(archive.get('https://a.com/x#top'), b'<html>x</html>')
+        archive.rotate()
+        archive.put('https://a.com/y', b'<html>y</html>')
+        self.assertEqual(archive.get('https://a.com/x'), b'<html>x</html>')
+        self.assertEqual(archive.get('https://a.com/y'), b'<html>y</html>')
+        self.assertIsNone(archive.get('https://a.com/z'))
+
+    def test_newest_copy_wins(self):
+        """A page stored again returns its latest body, across segments too"""
+        archive = self._archive()
+        archive.put('https://a.com/x', b'v1')
+        archive.rotate()
+        archive.put('https://a.com/x', b'v2')
+        self.assertEqual(archive.get('https://a.com/x'), b'v2')
+        archive.rotate()
+        self.assertEqual(archive.get('https://a.com/x'), b'v2')
+
+    def test_reopen_continues_open_segment(self):
+        """A new instance finds existing pages and keeps appending to the open segment"""
+        archive = PageArchive(directory=self.tmp_dir)
+        archive.put('https://a.com/x', b'x')
+        archive.close()
+        archive = self._archive()
+        archive.put('https://a.com/y', b'y')
+        self.assertEqual(archive.get('https://a.com/x'), b'x')
+        self.assertEqual(len(list(Path(self.tmp_dir).glob('*.seg'))), 1)
+        self.assertEqual([url for url, _, _ in archive.iter_pages()], ['https://a.com/x', 'https://a.com/y'])
+
+    def test_reads_without_pread(self):
+        """Open and sealed segments are read without os.pread (not available on Windows)"""
+        archive = self._archive()
+        archive.put('https://a.com/old', b'old')
+        archive.rotate()
+        archive.put('https://a.com/new', b'new')
+        with patch.object(page_archive.os, 'pread', side_effect=AttributeError('pread'), create=True):
+            self.assertEqual(archive.get('https://a.com/old'), b'old')
+            self.assertEqual(archive.get('https://a.com/new'), b'new')
+
+    def test_rotates_by_size(self):
+        """The open segment is sealed once it reaches the size limit"""
+        archive = self._archive(segment_max_bytes=200)
+        for i in range(5):
+            archive.put(f'https://a.com/{i}', os.urandom(150))
+        self.assertGreaterEqual(len(list(Path(self.tmp_dir).glob('*.idx'))), 4)
+        self.assertEqual(len(archive.get('https://a.com/0')), 150)
+
+    def test_zlib_fallback(self):
+        """Without zstandard the archive still works with zlib"""
+        with patch.object(page_archive, 'zstandard', None):
+            archive = self._archive()
+            archive.put('https://a.com/x', b'<p>zlib</p>' * 100)
+            archive.rotate()
+            self.assertEqual(archive.get('https://a.com/x'), b'<p>zlib</p>' * 100)
+
+    def test_prune_keeps_open_segment(self):
+        """Pruning deletes old sealed segments only"""
+        archive = self._archive()
+        archive.put('https://a.com/old', b'old')
+        archive.rotate()
+        archive.put('https://a.com/new', b'new')
+        old_seg = next(Path(self.tmp_dir).glob('*.idx')).with_suffix('.seg')
+        past = time.time() - 7200
+        os.utime(old_seg, (past, past))
+        self.assertEqual(prune_segments(self.tmp_dir, datetime.now() - timedelta(hours=1)), 1)
+        self.assertFalse(old_seg.exists())
+        self.assertEqual(archive.prune(datetime.now() - timedelta(hours=1)), 0)
+        self.assertIsNone(archive.get('https://a.com/old'))
+        self.assertEqual(archive.get('https://a.com/new'), b'new')
+
+
+class TestExtractorArchive(unittest.TestCase):
+    """Test cases for ContentExtractor with a page archive"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive = PageArchive(directory=self.tmp_dir)
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_extract_archived_matches_live_extraction(self):
+        """Reprocessing an archived page gives the same result without the network"""
+        url, html = load_page('collider_andor.html')
+        self.archive.put(url, html.encode('utf-8'))
+        extractor = ContentExtractor(page_archive=self.archive)
+        with patch.object(extractor, '_fetch_page', return_value=(html.encode('utf-8'), None)):
+            live = extractor.extract(url)
+        self.assertEqual(extractor.extract_archived(url), live)
+        self.assertIsNone(extractor.extract_archived('https://collider.com/missing/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Unit tests for the pipeline module
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from app import pipeline
+from app.store import Database
+
+
+class TestPipelineCycle(unittest.TestCase):
+    """Test cases for run_pipeline_cycle"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = str(Path(self.tmp.name) / 'app.db')
+        db = Database(self.db_path)
+        db.initialize()
+        db.close()
+        feed_reader = MagicMock()
+        feed_reader.read_feeds.return_value = [
+            {'id': f'item-{i}', 'link': f'https://a.example/{i}', 'title': f'Artigo {i}', 'published_at': None}
+            for i in range(2)
+        ]
+        patches = [
+            patch.object(pipeline, 'PIPELINE_ORDER', ['fonte']),
+            patch.dict(pipeline.RSS_FEEDS, {'fonte': {'urls': ['https://a.example/feed'], 'category': 'movies'}}),
+            patch.dict(pipeline.EXTRACTION_CONFIG, {'workers': 1, 'image_probe': False, 'http_cache_enabled': False,
+                                                    'page_archive_enabled': False, 'result_cache_enabled': False}),
+            patch.dict(pipeline.AI_REWRITE_CONFIG, {'response_cache_enabled': False, 'streaming': False}),
+            patch.dict(pipeline.WORDPRESS_TAG_CONFIG, {'cache_enabled': False}),
+            patch.object(pipeline, 'Database', lambda: Database(self.db_path)),
+            patch.object(pipeline, 'FeedReader', return_value=feed_reader),
+            patch.object(pipeline, 'WordPressClient'),
+            patch.object(pipeline, 'AIProcessor'),
+            patch.object(pipeline.time, 'sleep'),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _statuses(self):
+        db = Database(self.db_path)
+        try:
+            return [row['status'] for row in db.conn.execute("SELECT status FROM seen_articles ORDER BY id")]
+        finally:
+            db.close()
+
+    def test_batch_failure_leaves_no_article_processing(self):
+        """An extraction error for the whole batch does not strand its articles in PROCESSING"""
+        with patch.object(pipeline.ContentExtractor, 'extract_many', side_effect=RuntimeError('pool died')):
+            pipeline.run_pipeline_cycle()
+        statuses = self._statuses()
+        self.assertEqual(len(statuses), 2)
+        self.assertNotIn('PROCESSING', statuses)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for the prompt_compaction module
+"""
+
+import unittest
+from pathlib import Path
+
+from app.extractor import ContentExtractor
+from app.prompt_compaction import (
+    compact_article_html,
+    restore_alt_text_keys,
+    restore_image_ids,
+    section_headings,
+    split_sections,
+)
+
+CORPUS_DIR = Path(__file__).parent / 'fixtures' / 'valnet'
+
+IMG = 'https://static1.srcdn.com/wordpress/wp-content/uploads/2025/01/cena.jpg?q=50&fit=crop&w=825&dpr=1.5'
+
+
+class TestCompaction(unittest.TestCase):
+    """Test cases for compact_article_html"""
+
+    def test_markup_is_reduced(self):
+        """Attributes, wrappers, scripts and inline tags go away; structure and text stay"""
+        html = (
+            '<div class="article-body"><!-- ad --><p class="intro" data-x="1">Um <a href="https://a.com/x">link</a>'
+            ' e <strong>negrito</strong>.</p><div class="ad-zone"><script>ads()</script></div>'
+            '<h2 id="sec">Seção</h2><ul class="list"><li>um</li><li>dois</li></ul>'
+            f'<figure class="wide"><picture><source srcset="{IMG} 1x"><img src="{IMG}" srcset="{IMG} 825w"'
+            ' alt="Cena" loading="lazy" class="img"></picture><figcaption><span></span></figcaption></figure>'
+            '<iframe src="https://www.youtube.com/embed/abc" width="640"></iframe>'
+            '<iframe src="https://ads.example.com/frame"></iframe></div>'
+        )
+        compact, image_ids = compact_article_html(html)
+        self.assertEqual(
+            compact,
+            '<p>Um link e negrito.</p><h2>Seção</h2><ul><li>um</li><li>dois</li></ul>'
+            '<figure><img alt="Cena" src="IMG_1"/></figure>'
+            '<iframe src="https://www.youtube.com/embed/abc"></iframe>',
+        )
+        self.assertEqual(image_ids, {'IMG_1': IMG})
+
+    def test_repeated_image_shares_id(self):
+        """The same URL gets one id; lazy-loaded images use data-src"""
+        html = f'<p>a</p><img src="{IMG}"><img data-src="https://x.com/b.jpg" src="data:image/gif;base64,R0"><img src="{IMG}">'
+        compact, image_ids = compact_article_html(html)
+        self.assertEqual(compact.count('src="IMG_1"'), 2)
+        self.assertEqual(image_ids['IMG_2'], 'https://x.com/b.jpg')
+
+    def test_corpus_pages_shrink(self):
+        """Extracted content of the real pages gets smaller without losing text"""
+        extractor = ContentExtractor()
+        for path in sorted(CORPUS_DIR.glob('*.html')):
+            with self.subTest(page=path.name):
+                content = extractor.parse(path.read_bytes(), 'https://screenrant.com/post/')['content']
+                compact, _ = compact_article_html(content)
+                self.assertLess(len(compact), len(content))
+                self.assertEqual(len(compact.split('<p>')), len(content.split('<p')))
+
+
+class TestSplitSections(unittest.TestCase):
+    """Test cases for splitting long articles into parts"""
+
+    HTML = '<p>Intro &amp; abertura</p>' + ''.join(
+        f'<h2>Filme {i}</h2><p>{"a" * 60}</p><figure><img src="IMG_{i}"/></figure>' for i in range(1, 5))
+
+    def test_cuts_before_headings(self):
+        """Parts start at <h2> (except the first), keep every block and respect the size"""
+        chunks = split_sections(self.HTML, 200)
+        self.assertEqual(''.join(chunks), self.HTML)
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(chunk.startswith('<h2>') for chunk in chunks[1:]))
+        self.assertEqual(section_headings(self.HTML), ['Filme 1', 'Filme 2', 'Filme 3', 'Filme 4'])
+
+    def test_long_section_cut_between_blocks(self):
+        """A section larger than the limit is cut between its paragraphs, never inside one"""
+        html = '<h2>Lista</h2>' + ''.join(f'<p>{i}{"b" * 80}</p>' for i in range(5))
+        chunks = split_sections(html, 200)
+        self.assertEqual(''.join(chunks), html)
+        self.assertTrue(all(chunk.endswith('</p>') for chunk in chunks))
+        self.assertEqual(split_sections('<p>só um bloco</p>', 5), ['<p>só um bloco</p>'])
+
+
+class TestRestore(unittest.TestCase):
+    """Test cases for mapping ids back to URLs"""
+
+    def test_restore_image_ids(self):
+        """Known ids become URLs again and invented ones are dropped"""
+        html = '<figure><img src="IMG_1" alt="x"></figure><p>IMG_1 no texto</p><img src=\'IMG_7\'>'
+        self.assertEqual(
+            restore_image_ids(html, {'IMG_1': IMG}),
+            f'<figure><img src="{IMG}" alt="x"></figure><p>IMG_1 no texto</p>',
+        )
+
+    def test_restore_alt_text_keys(self):
+        """Alt texts keyed by id are keyed by file name"""
+        self.assertEqual(
+            restore_alt_text_keys({'IMG_1': 'Cena do filme', 'outra.jpg': 'Outra'}, {'IMG_1': IMG}),
+            {'cena.jpg': 'Cena do filme', 'outra.jpg': 'Outra'},
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
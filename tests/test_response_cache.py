@@ -0,0 +1,63 @@
+"""
+Unit tests for the response_cache module
+"""
+
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.response_cache import ResponseCache, response_key
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the ResponseCache class"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(db_path=str(Path(self.tmp_dir) / 'ai.db'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_key_depends_on_text_prompt_model_and_config(self):
+        """Whitespace does not matter; text, prompt version, model, config and context do"""
+        base = response_key('<p>Texto  do\nartigo</p>', 'v1', 'flash', {'t': 1}, 'site')
+        self.assertEqual(base, response_key('<p>Texto do artigo</p>', 'v1', 'flash', {'t': 1}, 'site'))
+        for other in (response_key('<p>Outro texto</p>', 'v1', 'flash', {'t': 1}, 'site'),
+                      response_key('<p>Texto do artigo</p>', 'v2', 'flash', {'t': 1}, 'site'),
+                      response_key('<p>Texto do artigo</p>', 'v1', 'pro', {'t': 1}, 'site'),
+                      response_key('<p>Texto do artigo</p>', 'v1', 'flash', {'t': 2}, 'site'),
+                      response_key('<p>Texto do artigo</p>', 'v1', 'flash', {'t': 1}, 'outro')):
+            self.assertNotEqual(base, other)
+
+    def test_roundtrip_and_counters(self):
+        """Responses survive a put/get and hits/misses are counted"""
+        response = {'titulo_final': 'Título', 'tags': ['a']}
+        self.assertIsNone(self.cache.get('k'))
+        self.cache.put('k', 'flash', response)
+        self.assertEqual(self.cache.get('k'), response)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_ttl(self):
+        """Expired entries are not returned and are purged on the next put"""
+        self.cache.put('old', 'flash', {'a': 1})
+        with patch('app.response_cache.time.time', return_value=time.time() + self.cache.ttl_seconds + 1):
+            self.assertIsNone(self.cache.get('old'))
+            self.cache.put('new', 'flash', {'b': 2})
+        count = self.cache.conn.execute("SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_lru_eviction_by_size(self):
+        """The least recently used responses are evicted first"""
+        self.cache.max_bytes = 1
+        self.cache.put('a', 'flash', {'conteudo_final': 'a'})
+        self.cache.put('b', 'flash', {'conteudo_final': 'b'})
+        self.assertIsNone(self.cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the site_profiles module, run against the saved page corpus
+"""
+
+import re
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
+
+from app.extractor import ContentExtractor
+from app.site_profiles import VALNET_PROFILE, get_site_profile
+
+CORPUS_DIR = Path(__file__).parent / 'fixtures' / 'valnet'
+
+
+def load_page(name):
+    """Returns (url, html) for a page of the corpus."""
+    html = (CORPUS_DIR / name).read_text(encoding='utf-8')
+    url = re.search(r'rel="canonical" href="([^"]+)"', html).group(1)
+    return url, html
+
+
+def extract_page(name, use_site_profiles=True):
+    """Runs ContentExtractor.extract on a corpus page without touching the network."""
+    url, html = load_page(name)
+    extractor = ContentExtractor(use_site_profiles=use_site_profiles)
+    with patch.object(extractor, '_fetch_page', return_value=(html, None)):
+        return extractor.extract(url)
+
+
+FULL_PAGES = [
+    'screenrant_superman.html',
+    'collider_andor.html',
+    'movieweb_nolan.html',
+    'gamerant_zelda.html',
+    'thegamer_switch2.html',
+]
+
+
+class TestSiteProfileRegistry(unittest.TestCase):
+    """Test cases for the profile lookup"""
+
+    def test_valnet_domains(self):
+        """All Valnet hosts map to the Valnet profile, with or without www"""
+        for url in ('https://screenrant.com/a/', 'https://www.thegamer.com/b/',
+                    'https://collider.com/c/', 'https://www.cbr.com/d/'):
+            with self.subTest(url=url):
+                self.assertIs(get_site_profile(url), VALNET_PROFILE)
+
+    def test_unknown_domain(self):
+        """Hosts without a profile use the generic path"""
+        self.assertIsNone(get_site_profile('https://comicbook.com/movies/news/x/'))
+        self.assertIsNone(get_site_profile('not a url'))
+
+
+class TestValnetProfileCorpus(unittest.TestCase):
+    """Test cases for the Valnet fast path over the saved corpus"""
+
+    def test_fast_path_skips_trafilatura(self):
+        """Full articles are extracted without calling trafilatura"""
+        for name in FULL_PAGES:
+            with self.subTest(page=name), patch('app.extractor.trafilatura.extract') as mock_traf:
+                result = extract_page(name)
+                self.assertIsNotNone(result)
+                mock_traf.assert_not_called()
+
+    def test_fast_path_content(self):
+        """Body keeps paragraphs and headings and drops widgets, ads and sidebars"""
+        for name in FULL_PAGES:
+            with self.subTest(page=name):
+                result = extract_page(name)
+                soup = BeautifulSoup(result['content'], 'lxml')
+                self.assertGreaterEqual(len(soup.find_all('p')), 4)
+                self.assertIsNotNone(soup.find('h2'))
+                text = soup.get_text()
+                for junk in ('Powered by SRDB', 'Trending', 'Related:', 'Jump to section', 'Copyright'):
+                    self.assertNotIn(junk, text)
+
+    def test_fast_path_images(self):
+        """Images come from the body, at full size, without card thumbnails"""
+        for name in FULL_PAGES:
+            with self.subTest(page=name):
+                result = extract_page(name)
+                self.assertEqual(len(result['images']), 1)
+                self.assertTrue(result['images'][0].endswith('-still.jpg'))
+                self.assertIn('<figure><img', result['content'])
+                self.assertIn('<figcaption>', result['content'])
+
+    def test_image_only_paragraph_is_kept(self):
+        """An image wrapped in a paragraph without text stays in the content and the image list"""
+        url, html = load_page('screenrant_superman.html')
+        image = 'https://static1.srcdn.com/wordpress/wp-content/uploads/2025/07/superman-inline-photo.jpg'
+        html = html.replace('itemprop="articleBody">', f'itemprop="articleBody"><p><img src="{image}"></p>', 1)
+        extractor = ContentExtractor()
+        with patch.object(extractor, '_fetch_page', return_value=(html, None)), \
+                patch('app.extractor.trafilatura.extract') as mock_traf:
+            result = extractor.extract(url)
+        mock_traf.assert_not_called()
+        self.assertIn(f'<img src="{image}"/>', result['content'])
+        self.assertIn(image, result['images'])
+
+    def test_fast_path_matches_generic_metadata(self):
+        """Title, excerpt, featured image and videos agree with the generic path"""
+        for name in FULL_PAGES:
+            with self.subTest(page=name):
+                fast = extract_page(name)
+                generic = extract_page(name, use_site_profiles=False)
+                for key in ('title', 'excerpt', 'featured_image_url', 'videos', 'images'):
+                    self.assertEqual(fast[key], generic[key], key)
+
+    def test_short_page_falls_back_to_generic(self):
+        """A body below the quality thresholds runs the generic path"""
+        with patch('app.extractor.trafilatura.extract', return_value='<p>fallback</p>') as mock_traf:
+            result = extract_page('screenrant_short.html')
+        mock_traf.assert_called_once()
+        self.assertEqual(result['content'], '<p>fallback</p>')
+
+
+if __name__ == '__main__':
+    unittest.main()
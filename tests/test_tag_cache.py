@@ -0,0 +1,69 @@
+"""
+Unit tests for the tag_cache module
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.tag_cache import TagCache
+
+
+class TestTagCache(unittest.TestCase):
+    """Test cases for the TagCache class"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = str(Path(self.tmp_dir) / 'tags.db')
+        self.cache = TagCache(db_path=self.db_path, site='https://a.example/wp-json/wp/v2')
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_roundtrip_per_site(self):
+        """IDs are returned only for cached slugs of the same site"""
+        self.cache.put_many({'marvel': 10, 'dc': 11})
+        self.assertEqual(self.cache.get_many(['marvel', 'dc', 'outra']), {'marvel': 10, 'dc': 11})
+        self.cache.put_many({'marvel': 12})
+        self.assertEqual(self.cache.get_many(['marvel']), {'marvel': 12})
+        other = TagCache(db_path=self.db_path, site='https://b.example/wp-json/wp/v2')
+        try:
+            self.assertEqual(other.get_many(['marvel']), {})
+        finally:
+            other.close()
+
+    def test_many_slugs(self):
+        """Lookups with more slugs than SQLite's variable limit work"""
+        self.cache.put_many({f'tag-{i}': i for i in range(1200)})
+        self.assertEqual(len(self.cache.get_many(f'tag-{i}' for i in range(1500))), 1200)
+        self.assertEqual(self.cache.count(), 1200)
+
+    def test_sync_and_invalidate(self):
+        """A full sync is recorded and forgotten on invalidate, keeping the cached IDs"""
+        self.assertIsNone(self.cache.synced_at())
+        self.cache.put_many({'marvel': 10})
+        self.cache.mark_synced()
+        self.assertIsNotNone(self.cache.synced_at())
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.synced_at())
+        self.assertEqual(self.cache.get_many(['marvel']), {'marvel': 10})
+
+    def test_replace_all_drops_missing_tags(self):
+        """A full listing replaces the site's tags and records the sync"""
+        self.cache.put_many({'marvel': 10, 'apagada': 11})
+        self.cache.replace_all({'marvel': 10, 'dc': 12})
+        self.assertEqual(self.cache.get_many(['marvel', 'apagada', 'dc']), {'marvel': 10, 'dc': 12})
+        self.assertIsNotNone(self.cache.synced_at())
+
+    def test_persistence(self):
+        """Entries survive reopening the database"""
+        self.cache.put_many({'marvel': 10})
+        self.cache.close()
+        self.cache = TagCache(db_path=self.db_path, site='https://a.example/wp-json/wp/v2')
+        self.assertEqual(self.cache.get_many(['marvel']), {'marvel': 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
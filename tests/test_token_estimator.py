@@ -0,0 +1,47 @@
+"""
+Unit tests for the token_estimator module
+"""
+
+import unittest
+
+from app.token_estimator import TokenEstimator
+
+
+class TestTokenEstimator(unittest.TestCase):
+    """Test cases for the TokenEstimator class"""
+
+    def test_estimate_from_length(self):
+        """Input tokens follow the characters-per-token ratio; output is capped"""
+        estimator = TokenEstimator(chars_per_token=4, output_tokens=4000, max_output_tokens=4096)
+        self.assertEqual(estimator.estimate('x' * 4000), (1000, 4096))
+
+    def test_calibrates_from_usage(self):
+        """Billed counts pull the estimates towards reality"""
+        estimator = TokenEstimator(chars_per_token=4, output_tokens=1000, alpha=0.5)
+        prompt = 'x' * 3000
+        billed = estimator.observe(prompt, {'promptTokenCount': 1500, 'candidatesTokenCount': 2000,
+                                            'totalTokenCount': 3500})
+        self.assertEqual(billed, 3500)
+        self.assertAlmostEqual(estimator.chars_per_token, 3.0)
+        self.assertAlmostEqual(estimator.output_tokens, 1500)
+        for _ in range(20):
+            estimator.observe(prompt, {'promptTokenCount': 1500, 'candidatesTokenCount': 2000})
+        input_tokens, _ = estimator.estimate(prompt)
+        self.assertAlmostEqual(input_tokens, 1500, delta=5)
+
+    def test_batch_usage_keeps_output_average(self):
+        """Multi-article responses recalibrate only the input ratio"""
+        estimator = TokenEstimator(chars_per_token=4, output_tokens=1000, alpha=0.5)
+        estimator.observe('x' * 3000, {'promptTokenCount': 1500, 'candidatesTokenCount': 6000}, track_output=False)
+        self.assertAlmostEqual(estimator.chars_per_token, 3.0)
+        self.assertEqual(estimator.output_tokens, 1000)
+
+    def test_missing_usage(self):
+        """Responses without usageMetadata leave the estimator unchanged"""
+        estimator = TokenEstimator()
+        self.assertIsNone(estimator.observe('abc', None))
+        self.assertEqual(estimator.samples, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
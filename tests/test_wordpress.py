@@ -6,6 +6,14 @@ import unittest
 from unittest.mock import Mock, patch, MagicMock
 import json
 import base64
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+
+from app.tag_cache import TagCache
 from app.wordpress import WordPressClient
 
 
@@ -329,5 +337,149 @@ class TestWordPressClient(unittest.TestCase):
         self.assertFalse(result)
 
 
+class TestTagResolution(unittest.TestCase):
+    """Test cases for the tag ID resolution of WordPressClient"""
+
+    BASE = 'https://example.com/wp-json/wp/v2'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tag_cache = TagCache(db_path=str(Path(self.tmp_dir) / 'tags.db'), site=self.BASE)
+        self.site_tags = {'marvel': 10, 'dc': 11}
+        self.calls = []
+        self.lock = threading.Lock()
+        http = Mock()
+        http.request.side_effect = self._handle
+        with patch('app.wordpress.get_http_client', return_value=http):
+            self.client = WordPressClient(
+                {'url': self.BASE, 'user': 'u', 'password': 'p'}, {}, tag_cache=self.tag_cache,
+            )
+        self.calls.clear()
+
+    def tearDown(self):
+        self.tag_cache.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _handle(self, method, url, **kwargs):
+        """Fake WordPress: /tags listing (paged or by slug[]) and creation."""
+        with self.lock:
+            self.calls.append((method, kwargs.get('params') or kwargs.get('json')))
+        request = httpx.Request(method, url)
+        if method == 'HEAD':
+            return httpx.Response(200, request=request)
+        if method == 'GET':
+            params = kwargs['params']
+            if 'slug[]' in params:
+                tags = [{'id': i, 'slug': s} for s, i in self.site_tags.items() if s in params['slug[]']]
+                return httpx.Response(200, json=tags, request=request)
+            items = sorted(self.site_tags.items())
+            page = items[(params['page'] - 1) * 100:params['page'] * 100]
+            pages = max(1, -(-len(items) // 100))
+            return httpx.Response(200, json=[{'id': i, 'slug': s} for s, i in page],
+                                  headers={'X-WP-TotalPages': str(pages)}, request=request)
+        body = kwargs['json']
+        if body['slug'] in self.site_tags:
+            return httpx.Response(400, json={'code': 'term_exists',
+                                             'data': {'term_id': self.site_tags[body['slug']]}}, request=request)
+        with self.lock:
+            self.site_tags[body['slug']] = 100 + len(self.site_tags)
+            return httpx.Response(201, json={'id': self.site_tags[body['slug']]}, request=request)
+
+    def test_lookup_then_create_then_cache(self):
+        """Existing tags are found in one request, missing ones created, and the next call is free"""
+        ids = self.client.get_tag_ids(['Marvel', 'Nova Tag', 'marvel', 'DC', 'Outra Tag', '!!'])
+        self.assertEqual(ids[:1] + ids[2:3], [10, 11])
+        self.assertEqual(len(ids), 4)
+        gets = [c for c in self.calls if c[0] == 'GET']
+        posts = [c for c in self.calls if c[0] == 'POST']
+        self.assertEqual(len(gets), 1)
+        self.assertEqual(gets[0][1]['slug[]'], ['marvel', 'nova-tag', 'dc', 'outra-tag'])
+        self.assertEqual(sorted(p[1]['slug'] for p in posts), ['nova-tag', 'outra-tag'])
+
+        self.calls.clear()
+        self.assertEqual(self.client.get_tag_ids(['DC', 'Nova Tag', 'Marvel']), [ids[2], ids[1], ids[0]])
+        self.assertEqual(self.calls, [])
+
+    def test_warm_pages_all_tags_once(self):
+        """Warm-up pages /tags until the last page and is skipped while fresh"""
+        self.site_tags = {f'tag-{i}': i for i in range(250)}
+        self.assertEqual(self.client.warm_tag_cache(), 250)
+        self.assertEqual([c[1]['page'] for c in self.calls], [1, 2, 3])
+        self.assertEqual(self.tag_cache.count(), 250)
+        self.calls.clear()
+        self.assertEqual(self.client.warm_tag_cache(), 0)
+        self.assertEqual(self.client.get_tag_ids(['Tag 7']), [7])
+        self.assertEqual(self.calls, [])
+
+    def test_full_warm_drops_deleted_tags(self):
+        """A tag deleted on the site leaves the cache on the next full warm-up"""
+        self.client.warm_tag_cache()
+        del self.site_tags['dc']
+        self.tag_cache.invalidate()
+        self.assertEqual(self.client.warm_tag_cache(), 1)
+        self.assertEqual(self.tag_cache.get_many(['marvel', 'dc']), {'marvel': 10})
+        self.calls.clear()
+        self.assertEqual(len(self.client.get_tag_ids(['DC'])), 1)
+        self.assertNotEqual(self.client.get_tag_ids(['DC']), [11])
+        self.assertEqual([c[0] for c in self.calls], ['GET', 'POST'])
+
+    def test_failed_warm_keeps_cache(self):
+        """A page that fails to load leaves the cache and the sync time untouched"""
+        self.tag_cache.put_many({'marvel': 10})
+        self.site_tags = {f'tag-{i}': i for i in range(150)}
+        handle = self._handle
+
+        def failing(method, url, **kwargs):
+            if method == 'GET' and kwargs['params'].get('page') == 2:
+                return httpx.Response(500, request=httpx.Request(method, url))
+            return handle(method, url, **kwargs)
+
+        self.client.http.request.side_effect = failing
+        self.assertEqual(self.client.warm_tag_cache(), 0)
+        self.assertIsNone(self.tag_cache.synced_at())
+        self.assertEqual(self.tag_cache.get_many(['marvel']), {'marvel': 10})
+
+    def test_term_exists_invalidates_sync(self):
+        """A tag the lookup missed is taken from term_exists and forces a full reload next time"""
+        self.tag_cache.mark_synced()
+        self.client._lookup_tags = Mock(return_value=({}, []))
+        self.assertEqual(self.client.get_tag_ids(['DC']), [11])
+        self.assertIsNone(self.tag_cache.synced_at())
+        self.assertEqual(self.tag_cache.get_many(['dc']), {'dc': 11})
+
+    def test_failed_lookup_creates_nothing(self):
+        """If the slug lookup fails, only cached IDs are returned and no tag is created"""
+        self.tag_cache.put_many({'marvel': 10})
+        self.tag_cache.mark_synced()
+        handle = self._handle
+
+        def failing(method, url, **kwargs):
+            if method == 'GET':
+                self.calls.append((method, kwargs['params']))
+                return httpx.Response(503, request=httpx.Request(method, url))
+            return handle(method, url, **kwargs)
+
+        self.client.http.request.side_effect = failing
+        self.assertEqual(self.client.get_tag_ids(['Marvel', 'DC', 'Nova']), [10])
+        self.assertEqual([c[0] for c in self.calls], ['GET'])
+        self.assertIsNotNone(self.tag_cache.synced_at())
+
+    def test_find_is_read_only(self):
+        """find_tag_ids only looks tags up; get_tag_ids with those IDs creates just the missing ones"""
+        known = self.client.find_tag_ids(['Marvel', 'Nova Tag'])
+        self.assertEqual(known, {'marvel': 10})
+        self.assertEqual([c[0] for c in self.calls], ['GET'])
+        self.calls.clear()
+        ids = self.client.get_tag_ids(['Marvel', 'Nova Tag'], known=known)
+        self.assertEqual(ids[0], 10)
+        self.assertEqual([(c[0], c[1].get('slug')) for c in self.calls if c[0] == 'POST'], [('POST', 'nova-tag')])
+
+    def test_without_cache(self):
+        """Without a tag cache, tags are still resolved (lookup and creation)"""
+        self.client.tag_cache = None
+        self.assertEqual(self.client.get_tag_ids(['Marvel', 'Nova']), [10, 102])
+        self.assertEqual(self.client.warm_tag_cache(), 0)
+
+
 if __name__ == '__main__':
     unittest.main()